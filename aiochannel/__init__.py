@@ -1,10 +1,33 @@
-from .channel import Channel
-from .errors import ChannelClosed, ChannelFull, ChannelEmpty
+from .channel import Channel, CoalescingChannel, LifoChannel, PriorityChannel
+from .threadsafe import ThreadSafeChannel
+from .shared import SharedMemoryChannel
+from .bytechannel import ByteChannel
+from .typed import TypedChannel
+from .weighted import WeightedChannel
+from .ratelimit import RateLimitedChannel
+from .rendezvous import RendezvousChannel
+from .spilling import SpillingChannel
+from .ack import AckChannel, Lease
+from .selector import Selector, select
+from .broadcast import BroadcastChannel
+from .partitioned import PartitionedChannel, Claim
+from .group import ChannelGroup, GroupChannel
+from .pipeline import Pipeline
+from .batcher import AdaptiveBatcher
+from .metrics import InstrumentedChannel, ChannelStats, Histogram
+from .errors import ChannelClosed, ChannelFull, ChannelEmpty, ChannelTimeout, LeaseExpired
 
 import importlib.metadata
 __version__ = importlib.metadata.version("aiochannel")
 
 
 __all__ = [
-    "Channel", "ChannelClosed", "ChannelFull", "ChannelEmpty", "__version__"
+    "Channel", "CoalescingChannel", "LifoChannel", "PriorityChannel", "ThreadSafeChannel",
+    "SharedMemoryChannel", "ByteChannel", "TypedChannel", "WeightedChannel",
+    "RateLimitedChannel", "RendezvousChannel", "SpillingChannel", "AckChannel", "Lease",
+    "BroadcastChannel", "PartitionedChannel", "Claim", "ChannelGroup", "GroupChannel",
+    "InstrumentedChannel", "ChannelStats", "Histogram",
+    "Selector", "select", "Pipeline", "AdaptiveBatcher",
+    "ChannelClosed", "ChannelFull", "ChannelEmpty", "ChannelTimeout", "LeaseExpired",
+    "__version__"
 ]
@@ -0,0 +1,304 @@
+from .channel import Channel, T, _earliest
+from .errors import ChannelClosed, ChannelEmpty, ChannelTimeout, LeaseExpired
+from asyncio import AbstractEventLoop, TimerHandle
+from collections import OrderedDict
+from typing import AsyncIterator, Generic, List, Optional
+
+_NEVER = float("inf")
+
+
+class Lease(Generic[T]):
+    """
+        An item taken out of an AckChannel. The item is held (in flight)
+        until it is acked, or nacked (or its lease runs out), which puts
+        it back at the head of the channel.
+    """
+
+    __slots__ = ("_channel", "_item", "_deadline")
+
+    _channel: "AckChannel[T]"
+    _item: T
+    _deadline: float
+
+    def __init__(self, channel: "AckChannel[T]", item: T, deadline: float) -> None:
+        self._channel = channel
+        self._item = item
+        self._deadline = deadline
+
+    def __repr__(self) -> str:
+        return '<{} at {:#x} item={!r}>'.format(type(self).__name__, id(self), self._item)
+
+    @property
+    def item(self) -> T:
+        """The item."""
+        return self._item
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """When the lease runs out (in event loop time), or None if it
+        doesn't."""
+        return None if self._deadline == _NEVER else self._deadline
+
+    def active(self) -> bool:
+        """Return True if the lease is still held (not acked, nacked or
+        run out)."""
+        return self in self._channel._leases
+
+    def ack(self) -> None:
+        """Same as AckChannel.ack(lease)."""
+        self._channel.ack(self)
+
+    def nack(self) -> None:
+        """Same as AckChannel.nack(lease)."""
+        self._channel.nack(self)
+
+    def extend(self) -> None:
+        """Same as AckChannel.extend(lease)."""
+        self._channel.extend(self)
+
+
+class AckChannel(Channel[T]):
+    """
+        A Channel with acknowledged delivery: the get_lease methods (and
+        leases()) return a Lease for each item instead of the item, and the
+        item stays in flight until the lease is acked. If it is nacked, or
+        not acked within lease_timeout seconds (if given), the item goes
+        back to the head of the channel, to be delivered again. So an item
+        taken by a consumer that crashes (or hangs) isn't lost. The plain
+        get methods return items, done with as soon as they are taken.
+
+        The channel is finished (see join()) once it is closed, drained
+        and every lease has been acked. Until then, getters keep waiting
+        on a closed channel, as nacked items may still come back.
+
+        Items in flight don't count towards maxsize. Leases are kept in
+        order of their deadline, with a single timer for the earliest
+        one, so getting, acking, nacking and extending are all O(1).
+    """
+
+    _lease_timeout: Optional[float]
+    _leases: "OrderedDict[Lease[T], None]"
+    _timer: Optional[TimerHandle]
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        *,
+        lease_timeout: Optional[float] = None,
+        overflow: str = "block",
+        loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        if lease_timeout is not None and not lease_timeout > 0:
+            raise ValueError("lease_timeout must be > 0")
+        self._lease_timeout = lease_timeout
+        self._leases = OrderedDict()
+        self._timer = None
+        super().__init__(maxsize, overflow=overflow, loop=loop)
+
+    def __repr__(self) -> str:
+        return '<{} at {:#x} maxsize={!r} qsize={!r} leased={!r}>'.format(
+            type(self).__name__, id(self), self._maxsize, self.qsize(), len(self._leases))
+
+    def leased(self) -> int:
+        """Number of items in flight (taken out, and not acked yet)."""
+        return len(self._leases)
+
+    def _requeue(self, items: List[T]) -> None:
+        # Put items back at the head, in order.
+        self._queue.extendleft(reversed(items))
+        self._wakeup_many(self._getters, len(items))
+
+    def _lease(self, item: T) -> Lease[T]:
+        if self._lease_timeout is None:
+            lease = Lease(self, item, _NEVER)
+        else:
+            lease = Lease(self, item, self._loop.time() + self._lease_timeout)
+            if self._timer is None:
+                self._timer = self._loop.call_at(lease._deadline, self._expire)
+        self._leases[lease] = None
+        return lease
+
+    def _expire(self) -> None:
+        # Timer callback: put back the items whose lease ran out, and set
+        # the timer for the next lease to run out.
+        self._timer = None
+        now = self._loop.time()
+        leases = self._leases
+        items = []
+        for lease in leases:
+            if lease._deadline > now:
+                self._timer = self._loop.call_at(lease._deadline, self._expire)
+                break
+            items.append(lease._item)
+        for _ in items:
+            leases.popitem(last=False)
+        self._requeue(items)
+
+    def _release(self, lease: Lease[T]) -> None:
+        try:
+            del self._leases[lease]
+        except KeyError:
+            raise LeaseExpired from None
+
+    def _nack_many(self, leases: List[Lease[T]]) -> None:
+        # Nack the leases still held (some may have run out meanwhile).
+        items = []
+        for lease in leases:
+            if lease in self._leases:
+                del self._leases[lease]
+                items.append(lease._item)
+        self._requeue(items)
+
+    def _spent(self) -> bool:
+        # Items in flight may still come back.
+        return self._closed and not self._leases
+
+    def _check_finished(self) -> None:
+        # Not finished while there are leases: their items may come back.
+        if not self._leases:
+            super()._check_finished()
+
+    def ack(self, lease: Lease[T]) -> None:
+        """Mark the item of lease as done with.
+        If the lease isn't held anymore (it was acked or nacked, or ran
+        out), raise LeaseExpired.
+        """
+        self._release(lease)
+        if self._spent() and self.empty():
+            for getter in self._getters:
+                if not getter.done():
+                    getter.set_exception(ChannelClosed())
+            self._getters.clear()
+            self._check_finished()
+
+    def nack(self, lease: Lease[T]) -> None:
+        """Put the item of lease back at the head of the channel, to be
+        delivered again (even if the channel is closed or full).
+        If the lease isn't held anymore, raise LeaseExpired.
+        """
+        self._release(lease)
+        self._requeue([lease._item])
+
+    def extend(self, lease: Lease[T]) -> None:
+        """Renew lease for another lease_timeout seconds from now.
+        If the lease isn't held anymore, raise LeaseExpired.
+        """
+        if lease not in self._leases:
+            raise LeaseExpired
+        if self._lease_timeout is not None:
+            lease._deadline = self._loop.time() + self._lease_timeout
+            self._leases.move_to_end(lease)
+
+    async def get_lease(
+        self, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> Lease[T]:
+        """Remove an item from the channel and return a lease for it.
+        If channel is empty, wait until an item is available.
+        If the channel is closed, drained and every lease has been acked,
+        raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time) is given
+        and passes first, raise ChannelTimeout.
+        This method is a coroutine.
+        """
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        while self.empty():
+            if self._spent():
+                raise ChannelClosed
+            await self._wait_get(deadline)
+        lease = self._lease(self._get())
+        if self._putters:
+            self._wakeup_next(self._putters)
+        return lease
+
+    def get_lease_nowait(self) -> Lease[T]:
+        """Remove an item from the channel and return a lease for it.
+        If no item is immediately available, raise ChannelEmpty.
+        """
+        if self.empty():
+            if self._spent():
+                raise ChannelClosed
+            raise ChannelEmpty
+        lease = self._lease(self._get())
+        if self._putters:
+            self._wakeup_next(self._putters)
+        return lease
+
+    async def get_lease_many(self, max_items: int) -> List[Lease[T]]:
+        """Remove up to max_items items from the channel and return a lease
+        for each (see Channel.get_many()).
+        This method is a coroutine.
+        """
+        while self.empty() and not self._spent():
+            await self._wait_get()
+        return self._lease_nowait_many(max_items)
+
+    def get_lease_nowait_many(self, max_items: int) -> List[Lease[T]]:
+        """Remove up to max_items items from the channel and return a lease
+        for each (see Channel.get_nowait_many()).
+        """
+        return self._lease_nowait_many(max_items)
+
+    def _lease_nowait_many(self, max_items: int) -> List[Lease[T]]:
+        if max_items < 1:
+            raise ValueError("max_items must be >= 1")
+        if self.empty():
+            if self._spent():
+                raise ChannelClosed
+            raise ChannelEmpty
+        leases = [self._lease(item) for item in self._get_many(max_items)]
+        self._wakeup_many(self._putters, len(leases))
+        return leases
+
+    async def get_lease_batch(self, max_items: int, timeout: float) -> List[Lease[T]]:
+        """Remove up to max_items items from the channel and return a lease
+        for each, waiting at most timeout seconds for the batch to fill up
+        (see Channel.get_batch()).
+        This method is a coroutine.
+        """
+        if max_items < 1:
+            raise ValueError("max_items must be >= 1")
+        deadline = self._loop.time() + timeout
+        batch: List[Lease[T]] = []
+        while True:
+            if not self.empty():
+                batch.extend(self._lease_nowait_many(max_items - len(batch)))
+                if len(batch) >= max_items:
+                    return batch
+            if self._spent() or self._loop.time() >= deadline:
+                break
+            try:
+                await self._wait_get(deadline)
+            except (ChannelClosed, ChannelTimeout):
+                continue
+            except BaseException:
+                # cancelled: the items leased so far go back
+                self._nack_many(batch)
+                raise
+        if not batch and self._spent():
+            raise ChannelClosed
+        return batch
+
+    async def leases(self) -> AsyncIterator[Lease[T]]:
+        """Iterate over leases for the items, as get_lease() returns them,
+        until the channel is finished."""
+        while True:
+            try:
+                lease = await self.get_lease()
+            except ChannelClosed:
+                return
+            yield lease
+
+    def close(self, drain: bool = True) -> None:
+        """Marks the channel as closed (see Channel.close()). While there
+        are leases, getters keep waiting, for items nacked (or run out)."""
+        if not drain:
+            self.drain_nowait()
+        if not self._leases:
+            super().close()
+            return
+        self._closed = True
+        for putter in self._putters:
+            if not putter.done():
+                putter.set_exception(ChannelClosed())
+        self._putters.clear()
@@ -0,0 +1,97 @@
+from .channel import Channel, T
+from .errors import ChannelClosed
+from typing import Generic, List
+
+
+class AdaptiveBatcher(Generic[T]):
+    """
+        Takes items out of a channel in batches whose size follows the load:
+        single items while the channel is near empty (for low latency), and
+        up to max_size items at once while it stays full (for throughput).
+
+        After each batch, the batch size doubles if at least another full
+        batch is waiting in the channel, and halves if the batch couldn't be
+        filled, staying between min_size and max_size.
+
+        If linger is given (in seconds), a batch that isn't full yet waits
+        up to linger seconds after its first item for more items to come in.
+
+        Each batch is taken out of the channel at once (see
+        Channel.get_many()), not with a get() per item.
+    """
+
+    _channel: Channel[T]
+    _min_size: int
+    _max_size: int
+    _linger: float
+    _size: int
+    _batches: int
+
+    def __init__(
+        self, channel: Channel[T], *, min_size: int = 1, max_size: int = 1024,
+        linger: float = 0.0
+    ) -> None:
+        if min_size < 1 or max_size < min_size:
+            raise ValueError("need 1 <= min_size <= max_size")
+        if linger < 0:
+            raise ValueError("linger must be >= 0")
+        self._channel = channel
+        self._min_size = min_size
+        self._max_size = max_size
+        self._linger = linger
+        self._size = min_size
+        self._batches = 0
+
+    def __repr__(self) -> str:
+        return '<{} at {:#x} batch_size={!r}>'.format(type(self).__name__, id(self), self._size)
+
+    @property
+    def channel(self) -> Channel[T]:
+        """The channel to take batches from."""
+        return self._channel
+
+    @property
+    def batch_size(self) -> int:
+        """The size the next batch can grow to."""
+        return self._size
+
+    @property
+    def batches(self) -> int:
+        """Number of batches returned so far."""
+        return self._batches
+
+    async def get(self) -> List[T]:
+        """Remove and return a batch of up to batch_size items from the
+        channel. If the channel is empty, wait until an item is available.
+        If the channel is closed and drained, raise ChannelClosed.
+        This method is a coroutine.
+        """
+        channel = self._channel
+        size = self._size
+        batch = await channel.get_many(size)
+        if len(batch) < size and self._linger:
+            try:
+                batch.extend(await channel.get_batch(size - len(batch), self._linger))
+            except ChannelClosed:
+                pass
+            except BaseException:
+                # cancelled: the items taken so far go back
+                channel._put_back(batch)
+                raise
+        if channel.qsize() >= size:
+            self._size = min(size * 2, self._max_size)
+        elif len(batch) < size:
+            self._size = max(size // 2, self._min_size)
+        self._batches += 1
+        return batch
+
+    def __aiter__(self) -> "AdaptiveBatcher[T]":
+        """Returns an async iterator (self) of batches, until the channel is
+        closed and drained."""
+        return self
+
+    async def __anext__(self) -> List[T]:
+        try:
+            return await self.get()
+        except ChannelClosed:
+            raise StopAsyncIteration
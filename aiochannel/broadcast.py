@@ -0,0 +1,375 @@
+from .channel import OVERFLOW_POLICIES, _Waiters, _earliest, _wait_on
+from .errors import ChannelClosed, ChannelFull, ChannelEmpty
+from asyncio import AbstractEventLoop, Event, Future, get_event_loop
+from collections import deque
+from typing import Any, Deque, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T", bound=Any)
+
+
+class BroadcastChannel(Generic[T]):
+    """
+        A closable channel where every item is delivered to every
+        subscriber.
+
+        Each item is stored once, in a buffer shared by all subscribers,
+        and each subscriber reads from it at its own pace. An item is
+        removed from the buffer once every subscriber has read it (or
+        unsubscribed). Subscribers only get the items put after they
+        subscribed; an item put while there are no subscribers is dropped.
+
+        maxsize bounds the buffer, so the slowest subscriber applies
+        backpressure: put() waits while it is maxsize items behind. With
+        overflow="drop_oldest", the oldest item is dropped instead, and
+        subscribers that hadn't read it yet skip it (see
+        Subscription.lagged). With overflow="drop_newest", the new item is
+        dropped.
+    """
+
+    _buffer: Deque[T]
+    # number of subscribers yet to read each item in _buffer
+    _readers: Deque[int]
+    # sequence number of _buffer[0]
+    _offset: int
+    _subscriptions: Dict["Subscription[T]", None]
+    _putters: _Waiters
+    _maxsize: int
+    _overflow: str
+    _dropped: int
+    _loop: AbstractEventLoop
+    _finished: Event
+    _closed: bool
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        *,
+        overflow: str = "block",
+        loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        self._loop = loop or get_event_loop()
+        if not isinstance(maxsize, int) or maxsize < 0:
+            raise TypeError("maxsize must be an integer >= 0 (default is 0)")
+        self._maxsize = maxsize
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("overflow must be one of {}".format(", ".join(OVERFLOW_POLICIES)))
+        self._overflow = overflow
+        self._dropped = 0
+        self._buffer = deque()
+        self._readers = deque()
+        self._offset = 0
+        self._subscriptions = {}
+        self._putters = _Waiters()
+        self._finished = Event()
+        self._closed = False
+
+    def __repr__(self) -> str:
+        return '<{} at {:#x} maxsize={!r} qsize={!r} subscribers={!r}>'.format(
+            type(self).__name__, id(self), self._maxsize, self.qsize(), self.subscribers)
+
+    def __str__(self) -> str:
+        return '<{} maxsize={!r} qsize={!r} subscribers={!r}>'.format(
+            type(self).__name__, self._maxsize, self.qsize(), self.subscribers)
+
+    def subscribe(self) -> "Subscription[T]":
+        """Return a new subscription, which gets every item put into the
+        channel from now on.
+        If the channel is closed, raise ChannelClosed.
+        """
+        if self._closed:
+            raise ChannelClosed
+        subscription = Subscription(self, self._offset + len(self._buffer))
+        self._subscriptions[subscription] = None
+        return subscription
+
+    @property
+    def subscribers(self) -> int:
+        """Number of subscriptions."""
+        return len(self._subscriptions)
+
+    @property
+    def maxsize(self) -> int:
+        """Number of items allowed in the channel buffer."""
+        return self._maxsize
+
+    @property
+    def dropped(self) -> int:
+        """Number of items dropped because the channel was full."""
+        return self._dropped
+
+    def qsize(self) -> int:
+        """Number of items in the channel buffer, that is, how far behind
+        the slowest subscriber is."""
+        return len(self._buffer)
+
+    def empty(self) -> bool:
+        """Return True if every subscriber has read every item."""
+        return not self._buffer
+
+    def full(self) -> bool:
+        """Return True if the slowest subscriber is maxsize items behind.
+        Note: if the channel was initialized with maxsize=0 (the default),
+        then full() is never True.
+        """
+        return 0 < self._maxsize <= len(self._buffer)
+
+    def closed(self) -> bool:
+        """Returns True if the channel is marked as closed"""
+        return self._closed
+
+    def _put(self, item: T) -> None:
+        if not self._subscriptions:
+            self._offset += 1
+            return
+        self._buffer.append(item)
+        self._readers.append(len(self._subscriptions))
+        for subscription in self._subscriptions:
+            if subscription._getters:
+                subscription._getters.wakeup_next()
+
+    def _overflow_put(self, item: T) -> None:
+        self._dropped += 1
+        if self._overflow == "drop_oldest":
+            self._buffer.popleft()
+            self._readers.popleft()
+            self._offset += 1
+            self._put(item)
+
+    def _read(self, subscription: "Subscription[T]") -> T:
+        # Return the next item for subscription (which must have one).
+        if subscription._cursor < self._offset:
+            # the items it hadn't read yet were dropped
+            subscription._lagged += self._offset - subscription._cursor
+            subscription._cursor = self._offset
+        index = subscription._cursor - self._offset
+        subscription._cursor += 1
+        item = self._buffer[index]
+        self._readers[index] -= 1
+        if index == 0:
+            self._trim()
+        return item
+
+    def _unsubscribe(self, subscription: "Subscription[T]") -> None:
+        del self._subscriptions[subscription]
+        readers = self._readers
+        for index in range(max(subscription._cursor - self._offset, 0), len(readers)):
+            readers[index] -= 1
+        self._trim()
+
+    def _trim(self) -> None:
+        # Remove the items at the head of the buffer that every subscriber
+        # has read, and let putters fill the room.
+        buffer = self._buffer
+        readers = self._readers
+        count = 0
+        while readers and not readers[0]:
+            buffer.popleft()
+            readers.popleft()
+            count += 1
+        if not count:
+            return
+        self._offset += count
+        self._putters.wakeup_many(count)
+        if self._closed and not buffer:
+            self._finished.set()
+
+    async def _wait_put(self, deadline: Optional[float]) -> None:
+        await _wait_on(self._loop, self._putters, deadline, None, self._putter_gave_up)
+
+    def _putter_gave_up(self, putter: Future) -> None:
+        # woken up, but can't take the call: pass it on
+        if not self.full():
+            self._putters.wakeup_next()
+
+    async def put(
+        self, item: T, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> None:
+        """Put an item into the channel, for every subscriber.
+        If the channel is full, wait until the slowest subscriber has read
+        an item (unless the channel has an overflow policy other than
+        "block", in which case an item is dropped instead).
+        If the channel is closed, raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time, see
+        loop.time()) is given and passes before there is room, raise
+        ChannelTimeout. If both are given, the earliest one applies.
+        This method is a coroutine.
+        """
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        while self.full():
+            if self._closed:
+                raise ChannelClosed
+            if self._overflow != "block":
+                self._overflow_put(item)
+                return
+            await self._wait_put(deadline)
+        if self._closed:
+            raise ChannelClosed
+        self._put(item)
+
+    def put_nowait(self, item: T) -> None:
+        """Put an item into the channel, for every subscriber, without
+        blocking.
+        If the channel is full, raise ChannelFull (or drop an item, if the
+        channel has an overflow policy other than "block").
+        """
+        if self.full():
+            if self._overflow == "block":
+                raise ChannelFull
+            if self._closed:
+                raise ChannelClosed
+            self._overflow_put(item)
+            return
+        if self._closed:
+            raise ChannelClosed
+        self._put(item)
+
+    def close(self) -> None:
+        """Marks the channel as closed. Waiting putters get a ChannelClosed,
+        and every subscription ends once it has read the items already
+        in the channel."""
+        self._closed = True
+        self._putters.fail()
+        for subscription in self._subscriptions:
+            subscription._channel_closed()
+        if not self._buffer:
+            self._finished.set()
+
+    async def join(self) -> None:
+        """Block until the channel is closed and every subscriber has read
+        every item (or unsubscribed).
+        """
+        await self._finished.wait()
+
+
+class Subscription(Generic[T]):
+    """
+        The receiving end of a BroadcastChannel, for one subscriber.
+        Works like the get side of a Channel: it is finished once the
+        channel is closed and the subscriber has read every item.
+    """
+
+    _channel: BroadcastChannel[T]
+    # sequence number of the next item to read
+    _cursor: int
+    _lagged: int
+    _getters: _Waiters
+    _finished: Event
+    _closed: bool
+
+    def __init__(self, channel: BroadcastChannel[T], cursor: int) -> None:
+        self._channel = channel
+        self._cursor = cursor
+        self._lagged = 0
+        self._getters = _Waiters()
+        self._finished = Event()
+        self._closed = False
+
+    def __repr__(self) -> str:
+        return '<{} at {:#x} qsize={!r}>'.format(type(self).__name__, id(self), self.qsize())
+
+    @property
+    def channel(self) -> BroadcastChannel[T]:
+        """The channel of this subscription."""
+        return self._channel
+
+    @property
+    def lagged(self) -> int:
+        """Number of items this subscriber missed, because they were dropped
+        before it read them (with overflow="drop_oldest")."""
+        return self._lagged
+
+    def qsize(self) -> int:
+        """Number of items this subscriber has yet to read."""
+        if self._closed:
+            return 0
+        channel = self._channel
+        return channel._offset + len(channel._buffer) - max(self._cursor, channel._offset)
+
+    def empty(self) -> bool:
+        """Return True if this subscriber has read every item."""
+        return not self.qsize()
+
+    def _done(self) -> bool:
+        # no more items will come
+        return self._closed or self._channel._closed
+
+    def _channel_closed(self) -> None:
+        # cancel getters that can't ever return, wake up the others
+        while len(self._getters) > self.qsize():
+            getter = self._getters.popright()
+            if not getter.done():
+                getter.set_exception(ChannelClosed())
+        self._getters.wakeup_many(len(self._getters))
+        if self.empty():
+            self._finished.set()
+
+    async def _wait_get(self, deadline: Optional[float]) -> None:
+        await _wait_on(self._channel._loop, self._getters, deadline, None, self._getter_gave_up)
+
+    def _getter_gave_up(self, getter: Future) -> None:
+        # woken up, but can't take the call: pass it on
+        if not self.empty():
+            self._getters.wakeup_next()
+
+    def get_nowait(self) -> T:
+        """Return the next item for this subscriber.
+        If there is none, raise ChannelEmpty, or ChannelClosed if the
+        channel is closed (or the subscription is).
+        """
+        if self.empty():
+            if self._done():
+                raise ChannelClosed
+            raise ChannelEmpty
+        item = self._channel._read(self)
+        if self._channel._closed and self.empty():
+            self._finished.set()
+        return item
+
+    async def get(
+        self, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> T:
+        """Return the next item for this subscriber.
+        If there is none, wait until one is put into the channel.
+        If the channel is closed (or the subscription is) and this
+        subscriber has read every item, raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time) is given
+        and passes before an item is available, raise ChannelTimeout.
+        This method is a coroutine.
+        """
+        if timeout is not None:
+            deadline = _earliest(self._channel._loop.time() + timeout, deadline)
+        while self.empty():
+            if self._done():
+                raise ChannelClosed
+            await self._wait_get(deadline)
+        return self.get_nowait()
+
+    def close(self) -> None:
+        """Unsubscribe. Items this subscriber didn't read yet no longer wait
+        for it, and get() raises ChannelClosed from now on."""
+        if self._closed:
+            return
+        self._channel._unsubscribe(self)
+        self._closed = True
+        self._channel_closed()
+
+    def closed(self) -> bool:
+        """Returns True if the subscription was closed (unsubscribed)"""
+        return self._closed
+
+    async def join(self) -> None:
+        """Block until the channel is closed and this subscriber has read
+        every item (or the subscription is closed).
+        """
+        await self._finished.wait()
+
+    def __aiter__(self) -> "Subscription[T]":
+        """Returns an async iterator (self)"""
+        return self
+
+    async def __anext__(self) -> T:
+        try:
+            return await self.get()
+        except ChannelClosed:
+            raise StopAsyncIteration
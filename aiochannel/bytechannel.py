@@ -0,0 +1,194 @@
+from .channel import Buffer, Channel
+from .errors import ChannelClosed, ChannelFull
+from asyncio import IncompleteReadError
+from collections import deque
+from typing import Deque, Iterable, List, cast
+
+
+class ByteChannel(Channel[Buffer]):
+    """
+        A Channel of bytes-like items, bounded by bytes instead of items.
+
+        maxsize is the number of bytes allowed in the channel buffer. put()
+        waits while the buffer holds maxsize bytes or more, so the buffer
+        can go over maxsize by (at most) the size of the last item put.
+
+        Items are kept as memoryviews of the objects that were put, so
+        putting and getting items doesn't copy them. On top of the item based
+        get(), the buffered bytes can be read across item boundaries with
+        read(), readexactly() and get_into().
+    """
+
+    # every item goes through _put() (to be counted, and made a memoryview)
+    _direct_handoff = False
+
+    _queue: Deque[memoryview]  # type: ignore
+    _nbytes: int
+
+    def _init(self) -> None:
+        self._queue = deque()
+        self._nbytes = 0
+
+    def _get(self) -> memoryview:
+        view = self._queue.popleft()
+        self._nbytes -= view.nbytes
+        return view
+
+    def _put(self, item: Buffer) -> None:
+        view = memoryview(item).cast("B")
+        self._queue.append(view)
+        self._nbytes += view.nbytes
+        if self._putters and not self.full():
+            # there might be room for more than this item
+            self._wakeup_next(self._putters)
+
+    def _put_front(self, item: Buffer) -> None:
+        view = memoryview(item).cast("B")
+        self._queue.appendleft(view)
+        self._nbytes += view.nbytes
+
+    def _get_many(self, count: int) -> List[Buffer]:
+        views = cast(List[memoryview], super()._get_many(count))
+        self._nbytes -= sum(view.nbytes for view in views)
+        return cast(List[Buffer], views)
+
+    def _put_many(self, items: Iterable[Buffer]) -> None:
+        for item in items:
+            self._put(item)
+
+    def nbytes(self) -> int:
+        """Number of bytes in the channel buffer."""
+        return self._nbytes
+
+    def full(self) -> bool:
+        """Return True if there are maxsize bytes (or more) in the channel.
+        Note: if the Channel was initialized with maxsize=0 (the default),
+        then full() is never True.
+        """
+        return 0 < self._maxsize <= self._nbytes
+
+    async def put_many(self, items: Iterable[Buffer]) -> None:
+        """Put all items into the channel, in order.
+        Items are moved into the channel in chunks, as long as the buffer
+        holds less than maxsize bytes. When it fills up partway through,
+        wait for room before adding the rest.
+        If the channel is closed or closing, raise ChannelClosed. Items
+        added before that point stay in the channel.
+        This method is a coroutine.
+        """
+        count = 0
+        for item in items:
+            if self.full() or self._closed:
+                self._wakeup_many(self._getters, count)
+                count = 0
+                while self.full() and not self._closed:
+                    await self._wait_put()
+                if self._closed:
+                    raise ChannelClosed
+            self._put(item)
+            count += 1
+        self._wakeup_many(self._getters, count)
+
+    def put_nowait_many(self, items: Iterable[Buffer]) -> None:
+        """Put all items into the channel without blocking.
+        If the channel would fill up before the last item (that is, if
+        put_many() would have to wait), raise ChannelFull and add none of them.
+        """
+        views = [memoryview(item).cast("B") for item in items]
+        if self._maxsize > 0 and views:
+            if self._nbytes + sum(view.nbytes for view in views[:-1]) >= self._maxsize:
+                raise ChannelFull
+        if self._closed:
+            raise ChannelClosed
+        self._put_many(views)
+        self._wakeup_many(self._getters, len(views))
+
+    def _take(self, size: int) -> List[memoryview]:
+        # Remove up to size bytes from the buffer, as memoryviews into the
+        # buffered items.
+        queue = self._queue
+        views = []
+        remaining = size
+        while queue and remaining:
+            head = queue[0]
+            if head.nbytes <= remaining:
+                views.append(queue.popleft())
+                remaining -= head.nbytes
+            else:
+                views.append(head[:remaining])
+                queue[0] = head[remaining:]
+                remaining = 0
+        self._nbytes -= size - remaining
+        if self._closed and not queue:
+            self._finished.set()
+        if self._putters and not self.full():
+            self._wakeup_next(self._putters)
+        if queue and self._getters:
+            # we only took part of it, leave the rest to the next getter
+            self._wakeup_next(self._getters)
+        return views
+
+    async def _wait_bytes(self) -> bool:
+        # Wait until there is something to read. Returns False if
+        # the channel is closed and drained instead.
+        while self.empty():
+            if self._closed:
+                return False
+            try:
+                await self._wait_get()
+            except ChannelClosed:
+                return False
+        return True
+
+    async def read(self, n: int = -1) -> bytes:
+        """Read up to n bytes from the channel, across item boundaries.
+        If n is not given or -1, read until the channel is closed and drained.
+        Otherwise, wait until at least one byte is available, and return the
+        available bytes, but no more than n.
+        Return b"" if the channel is closed and drained.
+        This method is a coroutine.
+        """
+        if n < 0:
+            views: List[memoryview] = []
+            while await self._wait_bytes():
+                views.extend(self._take(self._nbytes))
+            return b"".join(views)
+        if n == 0 or not await self._wait_bytes():
+            return b""
+        return b"".join(self._take(n))
+
+    async def readexactly(self, n: int) -> bytes:
+        """Read exactly n bytes from the channel, across item boundaries.
+        Bytes are taken out of the channel as they arrive, so n may be
+        larger than maxsize.
+        If the channel is closed and drained before n bytes were read, raise
+        asyncio.IncompleteReadError, with the bytes read so far as `partial`.
+        This method is a coroutine.
+        """
+        views: List[memoryview] = []
+        remaining = n
+        while remaining > 0 and await self._wait_bytes():
+            taken = self._take(remaining)
+            remaining -= sum(view.nbytes for view in taken)
+            views.extend(taken)
+        data = b"".join(views)
+        if remaining > 0:
+            raise IncompleteReadError(data, n)
+        return data
+
+    async def get_into(self, buffer: Buffer) -> int:
+        """Read bytes from the channel straight into buffer (a writable
+        bytes-like object), across item boundaries.
+        Wait until at least one byte is available, then copy as many bytes
+        as are available and fit in buffer. Return the number of bytes
+        copied, which is 0 if the channel is closed and drained.
+        This method is a coroutine.
+        """
+        target = memoryview(buffer).cast("B")
+        if not target.nbytes or not await self._wait_bytes():
+            return 0
+        position = 0
+        for view in self._take(target.nbytes):
+            target[position:position + view.nbytes] = view
+            position += view.nbytes
+        return position
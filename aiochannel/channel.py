@@ -1,10 +1,68 @@
-from .errors import ChannelClosed, ChannelFull, ChannelEmpty
-from collections import deque
-from asyncio import AbstractEventLoop, Event, Future, get_event_loop
-from typing import Any, Deque, Generic, Iterator, TypeVar, Optional
+from .errors import ChannelClosed, ChannelFull, ChannelEmpty, ChannelTimeout
+from collections import OrderedDict, deque
+from asyncio import (
+    AbstractEventLoop, Event, Future, TimeoutError, get_event_loop, get_running_loop, wait_for
+)
+from heapq import heappop, heappush
+from itertools import islice
+from typing import (
+    Any, Callable, Deque, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+)
 
 T = TypeVar("T", bound=Any)
 
+# bytes-like items (of ByteChannel and SharedMemoryChannel)
+Buffer = Union[bytes, bytearray, memoryview]
+
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+# Value of the getters (in Channel._getters) waiting in get(), which can be
+# handed an item directly.
+_RECEIVE = object()
+
+
+class _Waiters(OrderedDict[Future, Any]):
+    """
+        FIFO of waiter futures. Unlike a deque, any waiter can be removed
+        in O(1), so waiters that give up (cancellation, timeouts) take
+        themselves out right away instead of piling up until woken.
+    """
+
+    def append(self, waiter: Future, value: Any = None) -> None:
+        self[waiter] = value
+
+    def discard(self, waiter: Future) -> None:
+        self.pop(waiter, None)
+
+    def popleft(self) -> Future:
+        return self.popitem(last=False)[0]
+
+    def popright(self) -> Future:
+        return self.popitem()[0]
+
+    def wakeup_next(self) -> None:
+        # Wake up the next waiter (if any) that isn't cancelled.
+        while self:
+            waiter = self.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    def wakeup_many(self, count: int) -> None:
+        # Wake up the next `count` waiters (if any) that aren't cancelled.
+        while self and count > 0:
+            waiter = self.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                count -= 1
+
+    def fail(self) -> None:
+        # Make every waiter raise ChannelClosed.
+        for waiter in self:
+            if not waiter.done():
+                waiter.set_exception(ChannelClosed())
+        self.clear()
+
 
 #
 # Most of the Channel implementation is taken directly from the asyncio.Queue implementation.
@@ -16,32 +74,59 @@ class Channel(Generic[T]):
         A Channel is a closable queue. A Channel is considered "finished" when
         it is closed and drained (unlike a queue which is "finished" when the queue
         is empty)
+
+        overflow decides what putting into a full channel does:
+        "block" (the default) waits for room (or raises ChannelFull, for
+        the _nowait methods), "drop_newest" drops the item being put, and
+        "drop_oldest" drops the oldest item (the one put first) to make
+        room, keeping a sliding window of the latest maxsize items.
+        Dropped items are counted in dropped.
     """
 
-    _getters: Deque[Future]
-    _putters: Deque[Future]
+    # Whether put() may hand an item straight to a getter waiting in get(),
+    # bypassing _put() and _get(). Subclasses whose storage hooks must see
+    # every item turn it off.
+    _direct_handoff = True
+
+    _getters: _Waiters
+    _putters: _Waiters
     _maxsize: int
     _loop: AbstractEventLoop
     _finished: Event
-    _close: Event
+    _closed: bool
+    _overflow: str
+    _dropped: int
     _queue: Deque[T]
+    # items handed over to getters in get() that haven't taken them yet;
+    # they still hold their slot in the channel
+    _handed: int
 
     def __init__(
-        self, maxsize: int = 0, *, loop: Optional[AbstractEventLoop] = None
+        self,
+        maxsize: int = 0,
+        *,
+        overflow: str = "block",
+        loop: Optional[AbstractEventLoop] = None
     ) -> None:
         self._loop = loop or get_event_loop()
 
         if not isinstance(maxsize, int) or maxsize < 0:
             raise TypeError("maxsize must be an integer >= 0 (default is 0)")
         self._maxsize = maxsize
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("overflow must be one of {}".format(", ".join(OVERFLOW_POLICIES)))
+        # What put() does when the channel is full (see _overflow_put())
+        self._overflow = overflow
+        self._dropped = 0
 
         # Futures.
-        self._getters = deque()
-        self._putters = deque()
+        self._getters = _Waiters()
+        self._putters = _Waiters()
 
         # "finished" means channel is closed and drained
         self._finished = Event()
-        self._close = Event()
+        self._closed = False
+        self._handed = 0
 
         self._init()
 
@@ -54,13 +139,136 @@ class Channel(Generic[T]):
     def _put(self, item: T) -> None:
         self._queue.append(item)
 
-    def _wakeup_next(self, waiters: Deque[Future]) -> None:
-        # Wake up the next waiter (if any) that isn't cancelled.
-        while waiters:
-            waiter = waiters.popleft()
-            if not waiter.done():
-                waiter.set_result(None)
-                break
+    def _put_front(self, item: T) -> None:
+        # Put item back, to be the next one out (an item handed over to a
+        # getter that gave up, or taken by a batch that was cancelled).
+        self._queue.appendleft(item)
+
+    def _evict_oldest(self) -> None:
+        # Drop the item that was put first, to make room (drop_oldest).
+        self._get()
+
+    def _get_many(self, count: int) -> List[T]:
+        queue = self._queue
+        if count >= len(queue):
+            items = list(queue)
+            queue.clear()
+            return items
+        return [queue.popleft() for _ in range(count)]
+
+    def _put_many(self, items: Iterable[T]) -> None:
+        self._queue.extend(items)
+
+    def _overflow_put(self, item: T) -> None:
+        # Put into a full channel, according to the overflow policy
+        # (other than "block").
+        if self._overflow == "drop_oldest":
+            if self.empty():
+                # the channel is full of items handed over to getters,
+                # which can't be taken back: nothing to drop, and there may
+                # be more getters waiting for the item
+                if not self._hand_over(item):
+                    self._put(item)
+                    self._wakeup_next(self._getters)
+                return
+            self._evict_oldest()
+            self._put(item)
+        self._dropped += 1
+
+    def _wakeup_next(self, waiters: _Waiters) -> None:
+        waiters.wakeup_next()
+
+    def _wakeup_many(self, waiters: _Waiters, count: int) -> None:
+        waiters.wakeup_many(count)
+
+    async def _wait_put(self, deadline: Optional[float] = None, value: Any = None) -> None:
+        # Wait until a putter slot frees up (or the channel closes).
+        # If a deadline (in loop time) is given, raise ChannelTimeout at that point.
+        # value is kept with the waiter in self._putters, for subclasses.
+        await _wait_on(self._loop, self._putters, deadline, value, self._putter_gave_up)
+
+    def _putter_gave_up(self, putter: Future) -> None:
+        # We were woken up by get_nowait(), but can't take the call.
+        # Wake up the next in line.
+        if not self.full():
+            self._wakeup_next(self._putters)
+
+    async def _wait_get(self, deadline: Optional[float] = None, receive: bool = False) -> Any:
+        # Wait until an item is available (or the channel closes).
+        # If a deadline (in loop time) is given, raise ChannelTimeout at that point.
+        # With receive=True, a putter may hand over its item directly, in
+        # which case it is returned as (item,); otherwise return None.
+        return await _wait_on(
+            self._loop, self._getters, deadline, _RECEIVE if receive else None,
+            self._getter_gave_up)
+
+    def _getter_gave_up(self, getter: Future) -> None:
+        if getter.exception() is None and getter.result() is not None:
+            # We were handed an item, but can't take the call: pass it
+            # on to the next in line.
+            self._handed -= 1
+            self._pass_on(getter.result()[0])
+        elif not self.empty():
+            # We were woken up by put_nowait(), but can't take
+            # the call.  Wake up the next in line.
+            self._wakeup_next(self._getters)
+
+    def _hand_over(self, item: T) -> bool:
+        # Hand item straight to the first waiting getter, if it is waiting
+        # in get(); return False if it isn't (it then needs waking up, to
+        # come and take the item out of the buffer).
+        getters = self._getters
+        while getters:
+            getter, receive = next(iter(getters.items()))
+            if not getter.done():
+                if receive is not _RECEIVE:
+                    return False
+                getters.popleft()
+                self._hand_to(getter, item)
+                return True
+            getters.popleft()
+        return False
+
+    def _hand_to(self, getter: Future, item: T) -> None:
+        # Hand item to getter, waiting in get() (and taken out of the
+        # waiters): it holds its slot until the getter takes it.
+        getter.set_result((item,))
+        self._handed += 1
+
+    def _pass_on(self, item: T) -> None:
+        # Hand an item over to the next getter waiting in get(), or else
+        # put it back in front, and wake up the next getter to take it.
+        if not self._hand_over(item):
+            self._put_front(item)
+            self._wakeup_next(self._getters)
+
+    def _handed_taken(self) -> None:
+        # A getter took the item handed over to it: its slot frees up.
+        self._handed -= 1
+        self._check_finished()
+        if self._putters:
+            self._wakeup_next(self._putters)
+
+    def _put_back(self, items: Iterable[T]) -> None:
+        # Put items taken out by a getter that gave up back in front, in
+        # order (even if the channel is full, or closed meanwhile).
+        pending = list(items)
+        for item in reversed(pending):
+            self._put_front(item)
+        if pending:
+            self._finished.clear()
+            self._wakeup_many(self._getters, len(pending))
+
+    def _check_finished(self) -> None:
+        # Mark the channel finished if it is closed and drained, with no
+        # item on its way to a getter.
+        if self._closed and self.empty() and not self._handed:
+            self._finished.set()
+
+    def _spent(self) -> bool:
+        # True if no item can come in anymore, so getters of an empty
+        # channel give up instead of waiting.
+        return self._closed
 
     def __repr__(self) -> str:
         return '<{} at {:#x} maxsize={!r} qsize={!r}>'.format(
@@ -79,6 +287,17 @@ class Channel(Generic[T]):
         """Number of items allowed in the channel buffer."""
         return self._maxsize
 
+    @property
+    def overflow(self) -> str:
+        """What putting into a full channel does: "block", "drop_newest"
+        or "drop_oldest"."""
+        return self._overflow
+
+    @property
+    def dropped(self) -> int:
+        """Number of items dropped because the channel was full."""
+        return self._dropped
+
     def empty(self) -> bool:
         """Return True if the channel is empty, False otherwise."""
         return not self._queue
@@ -88,113 +307,303 @@ class Channel(Generic[T]):
         Note: if the Channel was initialized with maxsize=0 (the default),
         then full() is never True.
         """
-        if self._maxsize <= 0:
-            return False
-        else:
-            return self.qsize() >= self._maxsize
+        return 0 < self._maxsize <= len(self._queue) + self._handed
 
-    async def put(self, item: T) -> None:
+    async def put(
+        self, item: T, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> None:
         """Put an item into the channel.
         If the channel is full, wait until a free
         slot is available before adding item.
+        (Unless the channel has an overflow policy other than "block", in
+        which case an item is dropped instead, see Channel.)
         If the channel is closed or closing, raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time, see
+        loop.time()) is given and passes before a slot frees up, raise
+        ChannelTimeout. If both are given, the earliest one applies.
         This method is a coroutine.
         """
-        while self.full() and not self._close.is_set():
-            putter: Future = self._loop.create_future()
-            self._putters.append(putter)
-            try:
-                await putter
-            except ChannelClosed:
-                raise
-            except BaseException:
-                putter.cancel()  # Just in case putter is not done yet.
-                if not self.full() and not putter.cancelled():
-                    # We were woken up by get_nowait(), but can't take
-                    # the call.  Wake up the next in line.
-                    self._wakeup_next(self._putters)
-                raise
-        return self.put_nowait(item)
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        # Same as put_nowait(), but with the checks folded into the wait
+        # loop, so the common case (room in the buffer) does no extra work.
+        while self.full():
+            if self._closed:
+                raise ChannelClosed
+            if self._overflow != "block":
+                self._overflow_put(item)
+                return
+            await self._wait_put(deadline)
+        if self._closed:
+            raise ChannelClosed
+        if self._getters:
+            if self._direct_handoff and self._hand_over(item):
+                return
+            self._put(item)
+            self._wakeup_next(self._getters)
+        else:
+            self._put(item)
 
     def put_nowait(self, item: T) -> None:
         """Put an item into the channel without blocking.
-        If no free slot is immediately available, raise ChannelFull.
+        If no free slot is immediately available, raise ChannelFull
+        (or drop an item, if the channel has an overflow policy other than
+        "block").
         """
         if self.full():
-            raise ChannelFull
-        if self._close.is_set():
+            if self._overflow == "block":
+                raise ChannelFull
+            if self._closed:
+                raise ChannelClosed
+            self._overflow_put(item)
+            return
+        if self._closed:
+            raise ChannelClosed
+        if self._getters:
+            if self._direct_handoff and self._hand_over(item):
+                return
+            self._put(item)
+            self._wakeup_next(self._getters)
+        else:
+            self._put(item)
+
+    async def put_many(self, items: Iterable[T]) -> None:
+        """Put all items into the channel, in order.
+        Items are moved into the channel in chunks as large as the free
+        space allows. If the channel fills up partway through, wait for
+        free slots before adding the rest.
+        (If the channel has an overflow policy other than "block", this
+        never waits, see put_nowait_many().)
+        If the channel is closed or closing, raise ChannelClosed. Items
+        added before that point stay in the channel.
+        This method is a coroutine.
+        """
+        if self._overflow != "block":
+            self.put_nowait_many(items)
+            return
+        pending = list(items)
+        start = 0
+        while start < len(pending):
+            while self.full() and not self._closed:
+                await self._wait_put()
+            if self._closed:
+                raise ChannelClosed
+            if self._maxsize > 0:
+                end = min(len(pending), start + self._maxsize - self.qsize() - self._handed)
+            else:
+                end = len(pending)
+            self._put_many(islice(pending, start, end))
+            self._wakeup_many(self._getters, end - start)
+            start = end
+
+    def put_nowait_many(self, items: Iterable[T]) -> None:
+        """Put all items into the channel without blocking.
+        If there is not room for every item, raise ChannelFull
+        and add none of them. If the channel has an overflow policy other
+        than "block", add them all instead, dropping items as the channel
+        fills up.
+        """
+        pending = list(items)
+        if self._maxsize > 0 and self.qsize() + self._handed + len(pending) > self._maxsize:
+            if self._overflow == "block":
+                raise ChannelFull
+            if self._closed:
+                raise ChannelClosed
+            for item in pending:
+                if self.full():
+                    self._overflow_put(item)
+                else:
+                    self._put(item)
+            self._wakeup_many(self._getters, self.qsize())
+            return
+        if self._closed:
             raise ChannelClosed
-        self._put(item)
-        self._wakeup_next(self._getters)
+        self._put_many(pending)
+        self._wakeup_many(self._getters, len(pending))
 
-    async def get(self) -> T:
+    async def get(
+        self, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> T:
         """Remove and return an item from the channel.
         If channel is empty, wait until an item is available.
+        If timeout (in seconds) or deadline (in event loop time, see
+        loop.time()) is given and passes before an item is available,
+        raise ChannelTimeout. If both are given, the earliest one applies.
         This method is a coroutine.
         """
-        while self.empty() and not self._close.is_set():
-            getter: Future = self._loop.create_future()
-            self._getters.append(getter)
-            try:
-                await getter
-            except ChannelClosed:
-                raise
-            except BaseException:
-                getter.cancel()  # Just in case getter is not done yet.
-                if not self.empty() and not getter.cancelled():
-                    # We were woken up by put_nowait(), but can't take
-                    # the call.  Wake up the next in line.
-                    self._wakeup_next(self._getters)
-                raise
-        return self.get_nowait()
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        # Same as get_nowait(), but with the checks folded into the wait
+        # loop, so the common case (buffered items) does no extra work.
+        while self.empty():
+            if self._spent():
+                raise ChannelClosed
+            handed = await self._wait_get(deadline, self._direct_handoff)
+            if handed is not None:
+                # put() handed its item over directly (in FIFO order of
+                # the getters), so no one else could take it first
+                self._handed_taken()
+                return handed[0]
+        item = self._get()
+        # if empty _after_ we retrieved an item AND marked for closing,
+        # set the finished flag
+        self._check_finished()
+        if self._putters:
+            self._wakeup_next(self._putters)
+        return item
 
     def get_nowait(self) -> T:
         """Remove and return an item from the channel.
         Return an item if one is immediately available, else raise ChannelEmpty.
         """
         if self.empty():
-            if self._close.is_set():
+            if self._spent():
                 raise ChannelClosed
             else:
                 raise ChannelEmpty
         item = self._get()
-        if self.empty() and self._close.is_set():
-            # if empty _after_ we retrieved an item AND marked for closing,
-            # set the finished flag
-            self._finished.set()
-        self._wakeup_next(self._putters)
+        # if empty _after_ we retrieved an item AND marked for closing,
+        # set the finished flag
+        self._check_finished()
+        if self._putters:
+            self._wakeup_next(self._putters)
         return item
 
+    async def get_many(self, max_items: int) -> List[T]:
+        """Remove and return up to max_items items from the channel.
+        If channel is empty, wait until an item is available, then return
+        every item that is immediately available (but no more than max_items).
+        This method is a coroutine.
+        """
+        while self.empty() and not self._spent():
+            await self._wait_get()
+        return self._get_nowait_many(max_items)
+
+    def get_nowait_many(self, max_items: int) -> List[T]:
+        """Remove and return up to max_items items from the channel.
+        Return the items that are immediately available, else raise ChannelEmpty.
+        """
+        return self._get_nowait_many(max_items)
+
+    def _get_nowait_many(self, max_items: int) -> List[T]:
+        # get_nowait_many(), for the blocking batch methods to build on
+        # (subclasses may put conditions on the public one)
+        if max_items < 1:
+            raise ValueError("max_items must be >= 1")
+        if self.empty():
+            if self._spent():
+                raise ChannelClosed
+            else:
+                raise ChannelEmpty
+        items = self._get_many(max_items)
+        self._check_finished()
+        self._wakeup_many(self._putters, len(items))
+        return items
+
+    async def get_batch(self, max_items: int, timeout: float) -> List[T]:
+        """Remove and return up to max_items items from the channel,
+        waiting at most timeout seconds for the batch to fill up.
+        Return as soon as max_items items have been collected, or when the
+        timeout expires with whatever was collected (possibly nothing).
+        If the channel is closed and drained before any item was collected,
+        raise ChannelClosed.
+        This method is a coroutine.
+        """
+        if max_items < 1:
+            raise ValueError("max_items must be >= 1")
+        deadline = self._loop.time() + timeout
+        batch: List[T] = []
+        while True:
+            if not self.empty():
+                items = self._get_nowait_many(max_items - len(batch))
+                # keep the type _get_many() returns (subclasses may not use lists)
+                if batch:
+                    batch += items
+                else:
+                    batch = items
+                if len(batch) >= max_items:
+                    return batch
+            if self._spent() or self._loop.time() >= deadline:
+                break
+            await self._wait_batch(deadline, batch)
+        if not batch and self._spent():
+            raise ChannelClosed
+        return batch
+
+    async def _wait_batch(self, deadline: float, batch: Iterable[T]) -> None:
+        # Wait for more items for get_batch(). If cancelled, put the items
+        # collected so far back, so they aren't lost.
+        try:
+            await self._wait_get(deadline)
+        except (ChannelClosed, ChannelTimeout):
+            # look again: items may have come in after the timer went off,
+            # but before we got to run
+            pass
+        except BaseException:
+            self._put_back(batch)
+            raise
+
     async def join(self) -> None:
         """Block until channel is closed and channel is drained
         """
         await self._finished.wait()
 
-    def close(self) -> None:
-        """Marks the channel is closed and throw a ChannelClosed in all pending putters"""
-        self._close.set()
+    async def aclose(self, timeout: Optional[float] = None, *, drain: bool = True) -> None:
+        """Close the channel (see close()) and wait until it is drained.
+        If timeout (in seconds) is given and passes first, raise
+        ChannelTimeout (the channel stays closed).
+        This method is a coroutine.
+        """
+        self.close(drain)
+        if timeout is None:
+            await self.join()
+            return
+        try:
+            await wait_for(self.join(), timeout)
+        except TimeoutError:
+            raise ChannelTimeout from None
+
+    def close(self, drain: bool = True) -> None:
+        """Marks the channel is closed and throw a ChannelClosed in all pending putters.
+        With drain=False, the items in the channel are discarded (see
+        drain_nowait()), instead of being left for the getters to drain.
+        """
+        if not drain:
+            self.drain_nowait()
+        self._closed = True
         # cancel putters
-        for putter in self._putters:
-            if not putter.cancelled():
-                putter.set_exception(ChannelClosed())
-        # cancel getters that can't ever return (as no more items can be added)
-        while len(self._getters) > self.qsize():
-            getter = self._getters.pop()
-            if not getter.cancelled():
+        self._putters.fail()
+        # in one pass over the getters: wake up as many as there are items,
+        # and cancel the others, as no more items can be added
+        available = self.qsize()
+        for getter in self._getters:
+            if getter.done():
+                continue
+            if available:
+                getter.set_result(None)
+                available -= 1
+            else:
                 getter.set_exception(ChannelClosed())
+        self._getters.clear()
 
-        # the remaining getters can now be woken up:
-        while self._getters:
-            self._wakeup_next(self._getters)
+        # if channel is already empty (and no item is on its way to a
+        # getter), mark finished:
+        self._check_finished()
 
-        # if channel is already empty, mark finished:
+    def drain_nowait(self) -> List[T]:
+        """Remove and return all the items in the channel at once (an empty
+        list if there are none), making room for every waiting putter.
+        """
         if self.empty():
-            # already empty, mark as finished
-            self._finished.set()
+            return []
+        items = self._get_many(self.qsize())
+        self._check_finished()
+        self._wakeup_many(self._putters, len(items))
+        return items
 
     def closed(self) -> bool:
         """Returns True if the Channel is marked as closed"""
-        return self._close.is_set()
+        return self._closed
 
     def __aiter__(self) -> "Channel[T]":
         """Returns an async iterator (self)"""
@@ -210,3 +619,380 @@ class Channel(Generic[T]):
 
     def __iter__(self) -> Iterator[T]:
         return iter(self._queue)
+
+
+class LifoChannel(Channel[T]):
+    """
+        A Channel that returns the most recently put items first.
+    """
+
+    def _get(self) -> T:
+        return self._queue.pop()
+
+    def _put_front(self, item: T) -> None:
+        self._queue.append(item)
+
+    def _evict_oldest(self) -> None:
+        # the oldest item is the last one out
+        self._queue.popleft()
+
+    def _get_many(self, count: int) -> List[T]:
+        queue = self._queue
+        return [queue.pop() for _ in range(min(count, len(queue)))]
+
+    def __iter__(self) -> Iterator[T]:
+        return reversed(self._queue)
+
+
+class PriorityChannel(Channel[T]):
+    """
+        A Channel that returns the items with the lowest priority value
+        first (like asyncio.PriorityQueue). Items with equal priorities
+        come out in the order they were put.
+
+        The priority of an item is key(item), or the item itself if no key
+        is given. Only priorities are compared, never the items.
+
+        With drop_lowest=True, a bounded channel never blocks putters:
+        putting into a full channel drops the item with the highest priority
+        value instead (the new item itself, if nothing in the channel ranks
+        below it), and counts it in dropped. The items are then kept in a
+        min-max heap, so both ends are found in O(1) and updated in O(log n).
+    """
+
+    _queue: List[Tuple[Any, int, T]]  # type: ignore
+    _key: Optional[Callable[[T], Any]]
+    _drop_lowest: bool
+    _count: int
+    # tie breaker of the items put back in front (counting down)
+    _front: int
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        *,
+        key: Optional[Callable[[T], Any]] = None,
+        drop_lowest: bool = False,
+        loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        self._key = key
+        self._drop_lowest = drop_lowest
+        super().__init__(maxsize, loop=loop)
+
+    def _init(self) -> None:
+        self._queue = []
+        # tie breaker, so equal priorities keep their order
+        self._count = 0
+        self._front = 0
+
+    def _get(self) -> T:
+        if self._drop_lowest:
+            return _minmax_pop(self._queue)[2]
+        return heappop(self._queue)[2]
+
+    def _put(self, item: T) -> None:
+        entry = (item if self._key is None else self._key(item), self._count, item)
+        self._count += 1
+        queue = self._queue
+        if not self._drop_lowest:
+            heappush(queue, entry)
+        elif 0 < self._maxsize <= len(queue):
+            self._dropped += 1
+            _minmax_replace_max(queue, entry)
+        else:
+            _minmax_push(queue, entry)
+
+    def _put_front(self, item: T) -> None:
+        # ahead of the items of equal priority, without dropping any
+        self._front -= 1
+        entry = (item if self._key is None else self._key(item), self._front, item)
+        if self._drop_lowest:
+            _minmax_push(self._queue, entry)
+        else:
+            heappush(self._queue, entry)
+
+    def _get_many(self, count: int) -> List[T]:
+        queue = self._queue
+        pop = _minmax_pop if self._drop_lowest else heappop
+        return [pop(queue)[2] for _ in range(min(count, len(queue)))]
+
+    def _put_many(self, items: Iterable[T]) -> None:
+        for item in items:
+            self._put(item)
+
+    def full(self) -> bool:
+        """Return True if there are maxsize items in the channel.
+        Note: if the Channel was initialized with maxsize=0 (the default),
+        or with drop_lowest=True, then full() is never True.
+        """
+        return not self._drop_lowest and 0 < self._maxsize <= len(self._queue) + self._handed
+
+    async def put_many(self, items: Iterable[T]) -> None:
+        """Put all items into the channel, in order.
+        See Channel.put_many(); with drop_lowest=True this never waits.
+        This method is a coroutine.
+        """
+        if self._drop_lowest:
+            self.put_nowait_many(items)
+        else:
+            await super().put_many(items)
+
+    def put_nowait_many(self, items: Iterable[T]) -> None:
+        """Put all items into the channel without blocking.
+        See Channel.put_nowait_many(); with drop_lowest=True this never
+        raises ChannelFull.
+        """
+        if not self._drop_lowest:
+            return super().put_nowait_many(items)
+        if self._closed:
+            raise ChannelClosed
+        pending = list(items)
+        self._put_many(pending)
+        self._wakeup_many(self._getters, len(pending))
+
+    def __iter__(self) -> Iterator[T]:
+        return (entry[2] for entry in sorted(self._queue))
+
+
+class CoalescingChannel(Channel[T]):
+    """
+        A Channel that keeps at most one item per key(item): putting an
+        item whose key is already in the channel replaces the queued item
+        in place (and counts it in dropped), without needing a free slot.
+
+        Combined with overflow="drop_oldest", producers never wait, and
+        the channel holds the latest item for (up to) maxsize keys.
+    """
+
+    _queue: "OrderedDict[Any, T]"  # type: ignore
+    _key: Callable[[T], Any]
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        *,
+        key: Callable[[T], Any],
+        overflow: str = "block",
+        loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        self._key = key
+        super().__init__(maxsize, overflow=overflow, loop=loop)
+
+    def _init(self) -> None:
+        self._queue = OrderedDict()
+
+    def _get(self) -> T:
+        return self._queue.popitem(last=False)[1]
+
+    def _put(self, item: T) -> None:
+        key = self._key(item)
+        if key in self._queue:
+            self._dropped += 1
+        self._queue[key] = item
+
+    def _put_front(self, item: T) -> None:
+        key = self._key(item)
+        if key in self._queue:
+            # superseded by an item put since
+            self._dropped += 1
+            return
+        self._queue[key] = item
+        self._queue.move_to_end(key, last=False)
+
+    def _get_many(self, count: int) -> List[T]:
+        queue = self._queue
+        return [queue.popitem(last=False)[1] for _ in range(min(count, len(queue)))]
+
+    def _put_many(self, items: Iterable[T]) -> None:
+        for item in items:
+            self._put(item)
+
+    def _replace(self, item: T) -> bool:
+        # Replace the queued item with the same key, if there is one.
+        key = self._key(item)
+        if self._closed or key not in self._queue:
+            return False
+        self._queue[key] = item
+        self._dropped += 1
+        return True
+
+    async def put(
+        self, item: T, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> None:
+        """Put an item into the channel, replacing the queued item with
+        the same key if there is one. See Channel.put().
+        This method is a coroutine.
+        """
+        if not self._replace(item):
+            await super().put(item, timeout=timeout, deadline=deadline)
+
+    def put_nowait(self, item: T) -> None:
+        """Put an item into the channel without blocking, replacing the
+        queued item with the same key if there is one. See Channel.put_nowait().
+        """
+        if not self._replace(item):
+            super().put_nowait(item)
+
+    async def put_many(self, items: Iterable[T]) -> None:
+        """Put all items into the channel, in order, one at a time.
+        See put().
+        This method is a coroutine.
+        """
+        for item in items:
+            await self.put(item)
+
+    def put_nowait_many(self, items: Iterable[T]) -> None:
+        """Put all items into the channel without blocking.
+        If there is not room for every new key, raise ChannelFull and add
+        none of them (unless the channel has an overflow policy other than
+        "block", see Channel).
+        """
+        pending = list(items)
+        if self._overflow == "block" and self._maxsize > 0:
+            keys = {self._key(item) for item in pending}.difference(self._queue)
+            if self.qsize() + self._handed + len(keys) > self._maxsize:
+                raise ChannelFull
+        if self._closed:
+            raise ChannelClosed
+        for item in pending:
+            if self._replace(item):
+                continue
+            if self.full():
+                self._overflow_put(item)
+            else:
+                self._put(item)
+        self._wakeup_many(self._getters, self.qsize())
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._queue.values())
+
+
+# A min-max heap is a list where the entries on even levels of the tree
+# (the root's) are no greater than any entry below them, and the entries
+# on odd levels no smaller. The smallest entry is the root, the largest
+# one of its children. Entries are compared with < only.
+
+def _minmax_push(heap: List[Any], entry: Any) -> None:
+    heap.append(entry)
+    index = len(heap) - 1
+    if not index:
+        return
+    parent = (index - 1) // 2
+    if _minmax_min_level(index) == (heap[parent] < entry):
+        # on the wrong side of its parent: swap, and carry on from there
+        heap[index], heap[parent] = heap[parent], entry
+        index = parent
+    _minmax_bubble_up(heap, index, _minmax_min_level(index))
+
+
+def _minmax_pop(heap: List[Any]) -> Any:
+    # Remove and return the smallest entry.
+    last = heap.pop()
+    if not heap:
+        return last
+    smallest = heap[0]
+    heap[0] = last
+    _minmax_trickle_down(heap, 0, True)
+    return smallest
+
+
+def _minmax_replace_max(heap: List[Any], entry: Any) -> None:
+    # Replace the largest entry with entry, if entry is smaller; drop entry
+    # otherwise.
+    index = 0 if len(heap) == 1 else 1 if len(heap) == 2 or heap[2] < heap[1] else 2
+    if not entry < heap[index]:
+        return
+    heap[index] = entry
+    if index and entry < heap[0]:
+        heap[index], heap[0] = heap[0], entry
+    _minmax_trickle_down(heap, index, not index)
+
+
+def _minmax_min_level(index: int) -> bool:
+    return (index + 1).bit_length() % 2 == 1
+
+
+def _minmax_bubble_up(heap: List[Any], index: int, smallest: bool) -> None:
+    # Move the entry at index up through its grandparents, while it is
+    # smaller (larger, on odd levels) than them.
+    entry = heap[index]
+    while index > 2:
+        grandparent = (index - 3) // 4
+        if (entry < heap[grandparent]) != smallest:
+            break
+        heap[index] = heap[grandparent]
+        index = grandparent
+    heap[index] = entry
+
+
+def _minmax_trickle_down(heap: List[Any], index: int, smallest: bool) -> None:
+    # Move the entry at index down, swapping it with the smallest (largest,
+    # on odd levels) of its children and grandchildren while that one
+    # should come before it.
+    size = len(heap)
+    while 2 * index + 1 < size:
+        first = 4 * index + 3
+        candidates = [2 * index + 1, 2 * index + 2] + list(range(first, first + 4))
+        best = 2 * index + 1
+        for candidate in candidates[1:]:
+            if candidate < size and (heap[candidate] < heap[best]) == smallest:
+                best = candidate
+        if not (heap[best] < heap[index]) == smallest:
+            return
+        heap[index], heap[best] = heap[best], heap[index]
+        if best < first:
+            return
+        parent = (best - 1) // 2
+        if (heap[parent] < heap[best]) == smallest:
+            heap[best], heap[parent] = heap[parent], heap[best]
+        index = best
+
+
+def _earliest(deadline: float, other: Optional[float]) -> float:
+    return deadline if other is None or deadline < other else other
+
+
+def _expire_waiter(waiter: Future) -> None:
+    # Timer callback: stop waiting, if nothing else woke up the waiter first.
+    if not waiter.done():
+        waiter.set_exception(ChannelTimeout())
+
+
+async def _wait_on(
+    loop: AbstractEventLoop, waiters: _Waiters, deadline: Optional[float] = None,
+    value: Any = None, gave_up: Optional[Callable[[Future], None]] = None
+) -> Any:
+    # Wait on a new waiter in waiters (kept with value) until it is woken
+    # up, and return its result. If a deadline (in loop time) is given,
+    # raise ChannelTimeout at that point. If cancelled after it was woken
+    # up, call gave_up(waiter) to pass the wakeup on (by default, to the
+    # next waiter).
+    waiter: Future = loop.create_future()
+    waiters.append(waiter, value)
+    timer = None
+    if deadline is not None:
+        timer = loop.call_at(deadline, _expire_waiter, waiter)
+    try:
+        return await waiter
+    except (ChannelClosed, ChannelTimeout):
+        raise
+    except BaseException:
+        waiter.cancel()  # Just in case waiter is not done yet.
+        if not waiter.cancelled():
+            if gave_up is None:
+                waiters.wakeup_next()
+            else:
+                gave_up(waiter)
+        raise
+    finally:
+        waiters.discard(waiter)
+        if timer is not None:
+            timer.cancel()
+
+
+def _running_loop() -> Optional[AbstractEventLoop]:
+    # The event loop running in this thread, or None (in a thread without one).
+    try:
+        return get_running_loop()
+    except RuntimeError:
+        return None
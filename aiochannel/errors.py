@@ -1,3 +1,6 @@
+from asyncio import TimeoutError
+
+
 class ChannelError(Exception):
     pass
 
@@ -12,3 +15,11 @@ class ChannelFull(ChannelError):
 
 class ChannelEmpty(ChannelError):
     pass
+
+
+class ChannelTimeout(ChannelError, TimeoutError):
+    pass
+
+
+class LeaseExpired(ChannelError):
+    pass
@@ -0,0 +1,246 @@
+from .channel import Channel, T, _earliest, _expire_waiter, _running_loop
+from .errors import ChannelClosed
+from asyncio import AbstractEventLoop, Future, run_coroutine_threadsafe, wrap_future
+from typing import Dict, Generic, Iterable, List, Optional
+
+
+class GroupChannel(Channel[T]):
+    """
+        A Channel of a ChannelGroup, bound to one event loop. It is used
+        like any Channel (from its own loop), but when get() finds it
+        empty, it steals a batch of items from the most loaded channel of
+        the group first (see ChannelGroup).
+    """
+
+    _group: "ChannelGroup[T]"
+    _steals: int
+    _stolen: int
+
+    def __init__(
+        self, group: "ChannelGroup[T]", maxsize: int = 0, *,
+        loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        super().__init__(maxsize, loop=loop)
+        self._group = group
+        self._steals = 0
+        self._stolen = 0
+
+    @property
+    def group(self) -> "ChannelGroup[T]":
+        """The group of this channel."""
+        return self._group
+
+    @property
+    def steals(self) -> int:
+        """Number of times get() stole items from another channel."""
+        return self._steals
+
+    @property
+    def stolen(self) -> int:
+        """Number of items get() stole from other channels."""
+        return self._stolen
+
+    def _put(self, item: T) -> None:
+        self._queue.append(item)
+        if self._group._idle and len(self._queue) >= self._group._steal_threshold:
+            self._group._poke()
+
+    def _put_many(self, items: Iterable[T]) -> None:
+        self._queue.extend(items)
+        if self._group._idle and len(self._queue) >= self._group._steal_threshold:
+            self._group._poke()
+
+    def _poke(self) -> None:
+        # Runs on this channel's loop: another channel has items to spare,
+        # wake up a getter to come and steal them.
+        if self._getters and self.empty():
+            self._wakeup_next(self._getters)
+
+    async def _steal(self, deadline: Optional[float] = None) -> List[T]:
+        # Take a batch of items from the most loaded other channel (a
+        # single item, once closed, so that this channel stays finished).
+        # If deadline passes first, raise ChannelTimeout.
+        victim = self._group._most_loaded(self)
+        if victim is None:
+            return []
+        count = 1 if self._closed else min(
+            self._group._steal_batch, (victim.qsize() + 1) // 2)
+        reply: Future = self._loop.create_future()
+        victim._loop.call_soon_threadsafe(victim._give, count, self, reply)
+        timer = None
+        if deadline is not None:
+            timer = self._loop.call_at(deadline, _expire_waiter, reply)
+        try:
+            items: List[T] = await reply
+        finally:
+            if timer is not None:
+                timer.cancel()
+        if items:
+            self._steals += 1
+            self._stolen += len(items)
+        return items
+
+    def _give(self, count: int, thief: "GroupChannel[T]", reply: Future) -> None:
+        # Runs on this channel's loop.
+        items = [] if self.empty() else self._get_nowait_many(count)
+        thief._loop.call_soon_threadsafe(thief._received, reply, items)
+
+    def _received(self, reply: Future, items: List[T]) -> None:
+        # Runs on this channel's loop.
+        if not reply.done():
+            reply.set_result(items)
+        elif items:
+            # the thief gave up (or timed out): keep them here
+            self._keep(items)
+
+    def _keep(self, items: List[T]) -> None:
+        # Put stolen items into this channel (even if it closed meanwhile).
+        self._put_many(items)
+        self._finished.clear()
+        self._wakeup_many(self._getters, len(items))
+
+    async def get(
+        self, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> T:
+        """Remove and return an item from the channel. If the channel is
+        empty, steal items from the most loaded channel of the group, or
+        wait until an item is available (here or there).
+        If the channel is closed and drained, and so is the rest of the
+        group, raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time) is given
+        and passes before an item is available, raise ChannelTimeout.
+        This method is a coroutine.
+        """
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        idle = self._group._idle
+        while self.empty():
+            items = await self._steal(deadline)
+            if items:
+                if len(items) > 1:
+                    self._keep(items[1:])
+                return items[0]
+            if self._closed:
+                raise ChannelClosed
+            idle[self] = None
+            try:
+                handed = await self._wait_get(deadline, self._direct_handoff)
+            finally:
+                if not self._getters:
+                    idle.pop(self, None)
+            if handed is not None:
+                self._handed_taken()
+                return handed[0]
+        return self.get_nowait()
+
+
+class ChannelGroup(Generic[T]):
+    """
+        A group of channels, one per consumer event loop (each in its own
+        thread), that balance their load by work stealing: when a
+        channel's get() finds it empty, it steals half the items (up to
+        steal_batch) of the most loaded channel in the group, by asking
+        that channel's loop to hand them over.
+
+        Getters that find the whole group empty wait on their own channel.
+        A channel that gets at least steal_threshold items while one of
+        them waits wakes it up, to come and steal.
+
+        Items are only ever taken out of a channel on its own loop, and
+        stolen items move between loops with call_soon_threadsafe(), so
+        the channels need no locks. Stealing changes the order in which
+        items are handled, across channels.
+    """
+
+    _channels: List[GroupChannel[T]]
+    # channels with getters waiting, because the whole group was empty
+    _idle: Dict[GroupChannel[T], None]
+    _steal_batch: int
+    _steal_threshold: int
+
+    def __init__(self, *, steal_batch: int = 64, steal_threshold: int = 2) -> None:
+        if steal_batch < 1:
+            raise ValueError("steal_batch must be >= 1")
+        if steal_threshold < 1:
+            raise ValueError("steal_threshold must be >= 1")
+        self._channels = []
+        self._idle = {}
+        self._steal_batch = steal_batch
+        self._steal_threshold = steal_threshold
+
+    def __repr__(self) -> str:
+        return '<{} at {:#x} channels={!r}>'.format(
+            type(self).__name__, id(self), len(self._channels))
+
+    def channel(
+        self, maxsize: int = 0, *, loop: Optional[AbstractEventLoop] = None
+    ) -> GroupChannel[T]:
+        """Add a channel for loop (by default, the current event loop) to the
+        group, and return it."""
+        channel = GroupChannel(self, maxsize, loop=loop)
+        self._channels.append(channel)
+        return channel
+
+    @property
+    def channels(self) -> List[GroupChannel[T]]:
+        """The channels of this group."""
+        return list(self._channels)
+
+    @property
+    def steals(self) -> int:
+        """Number of times a channel stole items from another."""
+        return sum(channel._steals for channel in self._channels)
+
+    @property
+    def stolen(self) -> int:
+        """Number of items stolen."""
+        return sum(channel._stolen for channel in self._channels)
+
+    def qsize(self) -> int:
+        """Number of items in all channels."""
+        return sum(channel.qsize() for channel in self._channels)
+
+    def _most_loaded(self, thief: GroupChannel[T]) -> Optional[GroupChannel[T]]:
+        # Channels whose loop isn't running (anymore) can't hand items over.
+        victim = None
+        most = self._steal_threshold - 1 if not thief._closed else 0
+        for channel in self._channels:
+            size = channel.qsize()
+            if size > most and channel is not thief and _serving(channel._loop):
+                victim = channel
+                most = size
+        return victim
+
+    def _poke(self) -> None:
+        # Wake up a getter of an idle channel, to come and steal.
+        try:
+            channel, _ = self._idle.popitem()
+        except KeyError:
+            return
+        channel._loop.call_soon_threadsafe(channel._poke)
+
+    def close(self, drain: bool = True) -> None:
+        """Close every channel of the group (from its own loop: channels of
+        other loops are closed as soon as their loop gets to it). See
+        Channel.close() for drain."""
+        current = _running_loop()
+        for channel in self._channels:
+            if channel._loop is current:
+                channel.close(drain)
+            else:
+                channel._loop.call_soon_threadsafe(channel.close, drain)
+
+    async def join(self) -> None:
+        """Block until every channel of the group is closed and drained.
+        This method is a coroutine.
+        """
+        current = _running_loop()
+        for channel in self._channels:
+            if channel._loop is current:
+                await channel.join()
+            else:
+                await wrap_future(run_coroutine_threadsafe(channel.join(), channel._loop))
+
+
+def _serving(loop: AbstractEventLoop) -> bool:
+    return loop.is_running() and not loop.is_closed()
@@ -0,0 +1,257 @@
+from .channel import Channel, T
+from asyncio import AbstractEventLoop
+from bisect import bisect_left
+from collections import deque
+from itertools import repeat
+from time import monotonic
+from typing import Any, Callable, Deque, Iterable, List, NamedTuple, Optional, Sequence
+
+# Bucket upper bounds (in seconds) of the wait time and residency histograms.
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """
+        Counts of observed durations (in seconds), in buckets with the given
+        upper bounds, plus one last bucket for everything above them.
+        A value equal to a bound goes in that bound's bucket, like the
+        "le" buckets of Prometheus (which are cumulative, though: see
+        cumulative()).
+    """
+
+    _bounds: Sequence[float]
+    _counts: List[int]
+    _sum: float
+    _count: int
+
+    def __init__(self, bounds: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self._bounds = tuple(sorted(bounds))
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def __repr__(self) -> str:
+        return '<{} count={!r} sum={!r}>'.format(type(self).__name__, self._count, self._sum)
+
+    def observe(self, value: float) -> None:
+        """Add a value."""
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self._sum += value
+        self._count += 1
+
+    @property
+    def bounds(self) -> Sequence[float]:
+        """Upper bounds of the buckets (but the last one)."""
+        return self._bounds
+
+    @property
+    def counts(self) -> List[int]:
+        """Number of values in each bucket (one more than there are bounds)."""
+        return list(self._counts)
+
+    @property
+    def sum(self) -> float:
+        """Sum of all values."""
+        return self._sum
+
+    @property
+    def count(self) -> int:
+        """Number of values."""
+        return self._count
+
+    def cumulative(self) -> List[int]:
+        """Number of values up to each bound (and in total, last)."""
+        total = 0
+        counts = []
+        for count in self._counts:
+            total += count
+            counts.append(total)
+        return counts
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (0 <= q <= 1),
+        or infinity if that is the last bucket. Return 0.0 if there are no
+        values."""
+        if not self._count:
+            return 0.0
+        rank = q * self._count
+        for bound, count in zip(self._bounds, self.cumulative()):
+            if count >= rank:
+                return bound
+        return float("inf")
+
+    def copy(self) -> "Histogram":
+        """Return a copy of this histogram."""
+        histogram = Histogram(())
+        histogram._bounds = self._bounds
+        histogram._counts = list(self._counts)
+        histogram._sum = self._sum
+        histogram._count = self._count
+        return histogram
+
+
+class ChannelStats(NamedTuple):
+    """A snapshot of the metrics of an InstrumentedChannel."""
+
+    #: number of items put into the channel
+    puts: int
+    #: number of items taken out of the channel (or dropped to make room)
+    gets: int
+    qsize: int
+    #: largest qsize so far
+    high_water: int
+    #: number of coroutines waiting for an item
+    blocked_getters: int
+    #: number of coroutines waiting for room
+    blocked_putters: int
+    #: seconds put() (or put_many()) spent waiting for room, per wait
+    put_wait: Histogram
+    #: seconds get() (or get_many(), ...) spent waiting for an item, per wait
+    get_wait: Histogram
+    #: seconds between an item being put and taken out, per item
+    residency: Histogram
+
+
+#: A hook is called as hook(channel, event, seconds), where event is one of
+#: "put_wait", "get_wait" or "residency" (see ChannelStats).
+Hook = Callable[["InstrumentedChannel", str, float], None]
+
+
+class InstrumentedChannel(Channel[T]):
+    """
+        A Channel that keeps metrics of its use: totals, high-water mark,
+        blocked getters and putters, and histograms of the time put() and
+        get() spend blocked and of the time items spend in the channel.
+        Calls that don't have to wait aren't timed.
+
+        stats() returns a snapshot of them. Hooks (see add_hook()) are
+        called with every wait time and residency as it is observed, to
+        export them elsewhere (to Prometheus, OpenTelemetry, ...).
+
+        Metrics cost time on every put and get, so they are opt-in: a plain
+        Channel keeps none, and pays nothing for them.
+    """
+
+    # every item goes through _put() and _get(), to be counted
+    _direct_handoff = False
+
+    _times: Deque[float]
+    _puts: int
+    _gets: int
+    _high_water: int
+    _put_wait: Histogram
+    _get_wait: Histogram
+    _residency: Histogram
+    _hooks: List[Hook]
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        *,
+        overflow: str = "block",
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+        loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        super().__init__(maxsize, overflow=overflow, loop=loop)
+        self._puts = 0
+        self._gets = 0
+        self._high_water = 0
+        buckets = tuple(buckets)
+        self._put_wait = Histogram(buckets)
+        self._get_wait = Histogram(buckets)
+        self._residency = Histogram(buckets)
+        self._hooks = []
+
+    def _init(self) -> None:
+        super()._init()
+        # when each item in the channel was put (time.monotonic())
+        self._times = deque()
+
+    def _put(self, item: T) -> None:
+        self._queue.append(item)
+        times = self._times
+        times.append(monotonic())
+        self._puts += 1
+        if len(times) > self._high_water:
+            self._high_water = len(times)
+
+    def _put_front(self, item: T) -> None:
+        # (its residency starts over)
+        self._queue.appendleft(item)
+        self._times.appendleft(monotonic())
+
+    def _put_many(self, items: Iterable[T]) -> None:
+        size = len(self._queue)
+        super()._put_many(items)
+        count = len(self._queue) - size
+        self._times.extend(repeat(monotonic(), count))
+        self._puts += count
+        if len(self._times) > self._high_water:
+            self._high_water = len(self._times)
+
+    def _get(self) -> T:
+        self._gets += 1
+        seconds = monotonic() - self._times.popleft()
+        self._residency.observe(seconds)
+        if self._hooks:
+            self._call_hooks("residency", seconds)
+        return self._queue.popleft()
+
+    def _get_many(self, count: int) -> List[T]:
+        items = super()._get_many(count)
+        self._gets += len(items)
+        now = monotonic()
+        times = self._times
+        for _ in items:
+            self._observe("residency", self._residency, now - times.popleft())
+        return items
+
+    def _observe(self, event: str, histogram: Histogram, seconds: float) -> None:
+        histogram.observe(seconds)
+        if self._hooks:
+            self._call_hooks(event, seconds)
+
+    def _call_hooks(self, event: str, seconds: float) -> None:
+        for hook in self._hooks:
+            hook(self, event, seconds)
+
+    def add_hook(self, hook: Hook) -> None:
+        """Call hook(channel, event, seconds) with every wait time and
+        residency observed from now on. event is one of "put_wait",
+        "get_wait" or "residency"."""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        """Stop calling hook. If it isn't added, raise ValueError."""
+        self._hooks.remove(hook)
+
+    async def _wait_put(self, deadline: Optional[float] = None, value: Any = None) -> None:
+        start = monotonic()
+        try:
+            await super()._wait_put(deadline, value)
+        finally:
+            self._observe("put_wait", self._put_wait, monotonic() - start)
+
+    async def _wait_get(self, deadline: Optional[float] = None, receive: bool = False) -> Any:
+        start = monotonic()
+        try:
+            return await super()._wait_get(deadline, receive)
+        finally:
+            self._observe("get_wait", self._get_wait, monotonic() - start)
+
+    def stats(self) -> ChannelStats:
+        """Return a snapshot of the metrics of this channel."""
+        return ChannelStats(
+            puts=self._puts,
+            gets=self._gets,
+            qsize=self.qsize(),
+            high_water=self._high_water,
+            blocked_getters=sum(1 for getter in self._getters if not getter.done()),
+            blocked_putters=sum(1 for putter in self._putters if not putter.done()),
+            put_wait=self._put_wait.copy(),
+            get_wait=self._get_wait.copy(),
+            residency=self._residency.copy(),
+        )
@@ -0,0 +1,310 @@
+from .channel import _Waiters, _earliest, _wait_on
+from .errors import ChannelClosed, ChannelFull, ChannelEmpty
+from asyncio import AbstractEventLoop, Event, get_event_loop
+from collections import deque
+from typing import Any, Callable, Deque, Generic, Hashable, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T", bound=Any)
+
+# states of a partition
+_IDLE = 0  # empty, and not held
+_READY = 1  # has items, and waits in _ready for a consumer
+_HELD = 2  # held by a consumer, until it releases its claim
+
+
+class PartitionedChannel(Generic[T]):
+    """
+        A closable channel split into partitions by key: items with the
+        same key(item) go to the same partition, in order, and each
+        partition is held by at most one consumer at a time, so items with
+        the same key are handled one after the other, while items with
+        different keys can be handled in parallel.
+
+        get() returns a Claim on the next partition that has items and
+        isn't held, with the items taken from it. The partition is held
+        until the claim is released; then, if items came in meanwhile, it
+        waits for a consumer again, behind the partitions that were ready
+        before it.
+
+        maxsize bounds the number of items in all partitions together.
+        The channel is finished (see join()) once it is closed, drained and
+        every claim has been released.
+    """
+
+    _key: Callable[[T], Hashable]
+    _queues: List[Deque[T]]
+    _states: List[int]
+    # partitions with items that aren't held, in the order they got ready
+    _ready: Deque[int]
+    _size: int
+    _held: int
+    _getters: _Waiters
+    _putters: _Waiters
+    _maxsize: int
+    _loop: AbstractEventLoop
+    _finished: Event
+    _closed: bool
+
+    def __init__(
+        self,
+        partitions: int,
+        key: Callable[[T], Hashable],
+        maxsize: int = 0,
+        *,
+        loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        self._loop = loop or get_event_loop()
+        if partitions < 1:
+            raise ValueError("partitions must be >= 1")
+        if not isinstance(maxsize, int) or maxsize < 0:
+            raise TypeError("maxsize must be an integer >= 0 (default is 0)")
+        self._maxsize = maxsize
+        self._key = key
+        self._queues = [deque() for _ in range(partitions)]
+        self._states = [_IDLE] * partitions
+        self._ready = deque()
+        self._size = 0
+        self._held = 0
+        self._getters = _Waiters()
+        self._putters = _Waiters()
+        self._finished = Event()
+        self._closed = False
+
+    def __repr__(self) -> str:
+        return '<{} at {:#x} partitions={!r} maxsize={!r} qsize={!r}>'.format(
+            type(self).__name__, id(self), len(self._queues), self._maxsize, self._size)
+
+    @property
+    def partitions(self) -> int:
+        """Number of partitions."""
+        return len(self._queues)
+
+    @property
+    def maxsize(self) -> int:
+        """Number of items allowed in the channel."""
+        return self._maxsize
+
+    def partition(self, item: T) -> int:
+        """Return the partition item goes to."""
+        return hash(self._key(item)) % len(self._queues)
+
+    def qsize(self) -> int:
+        """Number of items in the channel (in all partitions)."""
+        return self._size
+
+    def empty(self) -> bool:
+        """Return True if the channel is empty, False otherwise."""
+        return not self._size
+
+    def full(self) -> bool:
+        """Return True if there are maxsize items in the channel.
+        Note: if the channel was initialized with maxsize=0 (the default),
+        then full() is never True.
+        """
+        return 0 < self._maxsize <= self._size
+
+    def held(self) -> int:
+        """Number of partitions held by a consumer."""
+        return self._held
+
+    def closed(self) -> bool:
+        """Returns True if the channel is marked as closed"""
+        return self._closed
+
+    def _put(self, item: T) -> None:
+        partition = hash(self._key(item)) % len(self._queues)
+        self._queues[partition].append(item)
+        self._size += 1
+        if self._states[partition] == _IDLE:
+            self._states[partition] = _READY
+            self._ready.append(partition)
+            if self._getters:
+                self._getters.wakeup_next()
+
+    async def put(
+        self, item: T, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> None:
+        """Put an item into its partition.
+        If the channel is full, wait until a free slot is available.
+        If the channel is closed, raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time) is given
+        and passes before a slot frees up, raise ChannelTimeout.
+        This method is a coroutine.
+        """
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        while self.full():
+            if self._closed:
+                raise ChannelClosed
+            await _wait_on(self._loop, self._putters, deadline)
+        if self._closed:
+            raise ChannelClosed
+        self._put(item)
+
+    def put_nowait(self, item: T) -> None:
+        """Put an item into its partition without blocking.
+        If no free slot is immediately available, raise ChannelFull.
+        """
+        if self.full():
+            raise ChannelFull
+        if self._closed:
+            raise ChannelClosed
+        self._put(item)
+
+    async def put_many(self, items: Iterable[T]) -> None:
+        """Put all items into their partitions, in order, waiting for free
+        slots as needed.
+        This method is a coroutine.
+        """
+        for item in items:
+            await self.put(item)
+
+    def _claim(self, max_items: int) -> "Claim[T]":
+        partition = self._ready.popleft()
+        self._states[partition] = _HELD
+        self._held += 1
+        queue = self._queues[partition]
+        if max_items >= len(queue):
+            items = list(queue)
+            queue.clear()
+        else:
+            items = [queue.popleft() for _ in range(max_items)]
+        self._size -= len(items)
+        self._putters.wakeup_many(len(items))
+        if self._closed and not self._size:
+            # no more items will come: the other getters can stop waiting
+            self._getters.fail()
+        return Claim(self, partition, items)
+
+    def _release(self, partition: int) -> None:
+        self._held -= 1
+        if self._queues[partition]:
+            self._states[partition] = _READY
+            self._ready.append(partition)
+            if self._getters:
+                self._getters.wakeup_next()
+        else:
+            self._states[partition] = _IDLE
+            if self._closed and not self._held and not self._size:
+                self._finished.set()
+
+    def get_nowait(self, max_items: int = 1) -> "Claim[T]":
+        """Claim the next ready partition and take up to max_items items
+        from it.
+        If no partition is ready, raise ChannelEmpty (or ChannelClosed, if
+        the channel is closed and drained).
+        """
+        if max_items < 1:
+            raise ValueError("max_items must be >= 1")
+        if not self._ready:
+            if self._closed and not self._size:
+                raise ChannelClosed
+            raise ChannelEmpty
+        return self._claim(max_items)
+
+    async def get(
+        self,
+        max_items: int = 1,
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None
+    ) -> "Claim[T]":
+        """Claim the next ready partition and take up to max_items items
+        from it. If no partition is ready, wait until one is.
+        If the channel is closed and drained, raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time) is given
+        and passes first, raise ChannelTimeout.
+        This method is a coroutine.
+        """
+        if max_items < 1:
+            raise ValueError("max_items must be >= 1")
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        while not self._ready:
+            if self._closed and not self._size:
+                raise ChannelClosed
+            await _wait_on(self._loop, self._getters, deadline)
+        return self._claim(max_items)
+
+    def close(self) -> None:
+        """Marks the channel as closed. Waiting putters get a ChannelClosed;
+        getters do too, once the channel is drained."""
+        self._closed = True
+        self._putters.fail()
+        if not self._size:
+            self._getters.fail()
+            if not self._held:
+                self._finished.set()
+
+    async def join(self) -> None:
+        """Block until the channel is closed and drained, and every claim
+        has been released.
+        """
+        await self._finished.wait()
+
+    def __aiter__(self) -> "PartitionedChannel[T]":
+        """Returns an async iterator (self) of claims (of one item each)"""
+        return self
+
+    async def __anext__(self) -> "Claim[T]":
+        try:
+            return await self.get()
+        except ChannelClosed:
+            raise StopAsyncIteration
+
+
+class Claim(Generic[T]):
+    """
+        Items taken from one partition of a PartitionedChannel, which is
+        held until the claim is released (by release(), or at the end of a
+        with block).
+    """
+
+    __slots__ = ("_channel", "_partition", "_items", "_released")
+
+    _channel: PartitionedChannel[T]
+    _partition: int
+    _items: List[T]
+    _released: bool
+
+    def __init__(self, channel: PartitionedChannel[T], partition: int, items: List[T]) -> None:
+        self._channel = channel
+        self._partition = partition
+        self._items = items
+        self._released = False
+
+    def __repr__(self) -> str:
+        return '<{} at {:#x} partition={!r} items={!r}>'.format(
+            type(self).__name__, id(self), self._partition, len(self._items))
+
+    @property
+    def partition(self) -> int:
+        """The partition the items were taken from."""
+        return self._partition
+
+    @property
+    def items(self) -> List[T]:
+        """The items, in order."""
+        return self._items
+
+    @property
+    def item(self) -> T:
+        """The first item (the only one, for a claim of get())."""
+        return self._items[0]
+
+    def released(self) -> bool:
+        """Return True if the claim was released."""
+        return self._released
+
+    def release(self) -> None:
+        """Let other consumers take items from the partition. Releasing a
+        claim again does nothing."""
+        if not self._released:
+            self._released = True
+            self._channel._release(self._partition)
+
+    def __enter__(self) -> "Claim[T]":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
@@ -0,0 +1,359 @@
+from .channel import Channel
+from .errors import ChannelClosed
+from .selector import Selector
+from asyncio import (
+    AbstractEventLoop, CancelledError, Condition, Future, Task, ensure_future, gather,
+    get_event_loop
+)
+from concurrent.futures import Executor
+from functools import partial
+from inspect import iscoroutinefunction
+from typing import (
+    Any, Awaitable, Callable, Coroutine, Iterable, List, Optional, Sequence, Set, TypeVar
+)
+
+T = TypeVar("T", bound=Any)
+R = TypeVar("R", bound=Any)
+
+# Number of items a stage moves from its input to its output at once.
+CHUNK_SIZE = 64
+
+
+class Pipeline:
+    """
+        Connects channels with stages, each of which reads items from its
+        input channel(s) and puts results into new, bounded output channels.
+
+        A stage closes its outputs once its inputs are closed and drained,
+        so closing the first channel of a pipeline lets every stage after
+        it finish in turn. As every output channel is bounded (by maxsize),
+        a slow consumer at the end of the pipeline makes the stages before
+        it wait, all the way back to the first channel.
+
+        Stages move items in chunks (up to CHUNK_SIZE items at once) where
+        they can, with one loop per stage rather than a task per item.
+
+        If a stage fails, every stage is cancelled and every channel of the
+        pipeline is closed (so producers putting into its first channel get
+        a ChannelClosed), and wait() raises the error. If a stage's output
+        channel is closed by its consumer, the stage closes its inputs.
+    """
+
+    _maxsize: int
+    _loop: AbstractEventLoop
+    _tasks: List["Task[None]"]
+    _channels: Set[Channel[Any]]
+    _error: Optional[BaseException]
+
+    def __init__(
+        self, *, maxsize: int = CHUNK_SIZE, loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        self._loop = loop or get_event_loop()
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise TypeError("maxsize must be an integer >= 1 (default is {})".format(CHUNK_SIZE))
+        self._maxsize = maxsize
+        self._tasks = []
+        self._channels = set()
+        self._error = None
+
+    def __repr__(self) -> str:
+        return '<{} at {:#x} stages={!r}>'.format(type(self).__name__, id(self), len(self._tasks))
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        """The error that stopped the pipeline, if any."""
+        return self._error
+
+    def _channel(self, maxsize: Optional[int]) -> Channel[Any]:
+        channel: Channel[Any] = Channel(
+            self._maxsize if maxsize is None else maxsize, loop=self._loop)
+        self._channels.add(channel)
+        return channel
+
+    def _start(
+        self, stage: Callable[[], Coroutine[Any, Any, None]], inputs: Sequence[Channel[Any]],
+        outputs: Sequence[Channel[Any]]
+    ) -> None:
+        # stage() is only called once the task runs, so that a stage
+        # cancelled before it starts leaves no coroutine behind
+        self._channels.update(inputs)
+        self._tasks.append(self._loop.create_task(self._run(stage, inputs, outputs)))
+
+    async def _run(
+        self, stage: Callable[[], Coroutine[Any, Any, None]], inputs: Sequence[Channel[Any]],
+        outputs: Sequence[Channel[Any]]
+    ) -> None:
+        try:
+            await stage()
+        except ChannelClosed:
+            # an output was closed downstream: stop reading the inputs
+            for channel in inputs:
+                channel.close()
+        except CancelledError:
+            raise
+        except BaseException as error:
+            self._fail(error)
+        finally:
+            for channel in outputs:
+                channel.close()
+
+    def _fail(self, error: BaseException) -> None:
+        if self._error is None:
+            self._error = error
+        self.cancel()
+
+    def cancel(self) -> None:
+        """Cancel every stage, and close every channel of the pipeline."""
+        for task in self._tasks:
+            task.cancel()
+        for channel in self._channels:
+            channel.close()
+
+    async def wait(self) -> None:
+        """Wait until every stage has finished. If a stage failed, raise
+        its error.
+        This method is a coroutine.
+        """
+        await gather(*self._tasks, return_exceptions=True)
+        if self._error is not None:
+            raise self._error
+
+    async def __aenter__(self) -> "Pipeline":
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc is not None:
+            self.cancel()
+        await self.wait()
+
+    def map(
+        self, source: Channel[T], func: Callable[[T], Any], *, concurrency: int = 1,
+        ordered: bool = True, maxsize: Optional[int] = None
+    ) -> Channel[Any]:
+        """Return a channel of func(item) for every item of source.
+        If func is a coroutine function, up to concurrency calls run at the
+        same time, and results come out in the order of source (or as soon
+        as they are ready, if ordered is False). Plain functions are called
+        on whole chunks of items, one after the other.
+        """
+        _check_concurrency(concurrency)
+        output = self._channel(maxsize)
+        if iscoroutinefunction(func):
+            stage = partial(_parallel, source, output, partial(_await_each, func),
+                            1, concurrency, ordered)
+        else:
+            stage = partial(_chunks, source, output, lambda items: [func(item) for item in items])
+        self._start(stage, [source], [output])
+        return output
+
+    def filter(
+        self, source: Channel[T], predicate: Callable[[T], Any], *,
+        maxsize: Optional[int] = None
+    ) -> Channel[T]:
+        """Return a channel of the items of source for which predicate(item)
+        is true."""
+        output = self._channel(maxsize)
+        stage = partial(_chunks, source, output,
+                        lambda items: [item for item in items if predicate(item)])
+        self._start(stage, [source], [output])
+        return output
+
+    def batch(
+        self, source: Channel[T], size: int, timeout: float, *,
+        maxsize: Optional[int] = None
+    ) -> Channel[List[T]]:
+        """Return a channel of lists of up to size items of source. A list
+        is put as soon as it is full, or once timeout seconds have passed
+        since its first item came in (see Channel.get_batch())."""
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        output = self._channel(maxsize)
+        self._start(partial(_batches, source, output, size, timeout), [source], [output])
+        return output
+
+    def flatten(
+        self, source: Channel[Iterable[T]], *, maxsize: Optional[int] = None
+    ) -> Channel[T]:
+        """Return a channel of every item of every iterable in source."""
+        output = self._channel(maxsize)
+        stage = partial(_chunks, source, output, lambda items: [i for item in items for i in item])
+        self._start(stage, [source], [output])
+        return output
+
+    def merge(self, sources: Iterable[Channel[T]], *, maxsize: Optional[int] = None) -> Channel[T]:
+        """Return a channel of the items of every channel in sources, as
+        they come (see Selector). It is closed once every source is closed
+        and drained."""
+        sources = list(sources)
+        output = self._channel(maxsize)
+        self._start(partial(_merge, Selector(sources), output), sources, [output])
+        return output
+
+    def tee(
+        self, source: Channel[T], count: int = 2, *, maxsize: Optional[int] = None
+    ) -> List[Channel[T]]:
+        """Return count channels, each of which gets every item of source.
+        The slowest of them holds back the others (by up to maxsize items).
+        """
+        if count < 1:
+            raise ValueError("count must be >= 1")
+        outputs = [self._channel(maxsize) for _ in range(count)]
+        self._start(partial(_tee, source, outputs), [source], outputs)
+        return outputs
+
+    def split(
+        self, source: Channel[T], key: Callable[[T], int], count: int, *,
+        maxsize: Optional[int] = None
+    ) -> List[Channel[T]]:
+        """Return count channels, and put every item of source into the
+        one at index key(item)."""
+        if count < 1:
+            raise ValueError("count must be >= 1")
+        outputs = [self._channel(maxsize) for _ in range(count)]
+        self._start(partial(_split, source, outputs, key), [source], outputs)
+        return outputs
+
+    def run_in_executor(
+        self, source: Channel[T], func: Callable[[T], R], *, executor: Optional[Executor] = None,
+        concurrency: int = 1, ordered: bool = True, maxsize: Optional[int] = None
+    ) -> Channel[R]:
+        """Return a channel of func(item) for every item of source, with
+        func called in executor (the loop's default executor if None).
+        Items are handed to the executor in chunks, one call per chunk, and
+        up to concurrency chunks are worked on at the same time. Results
+        come out in the order of source, unless ordered is False.
+        """
+        _check_concurrency(concurrency)
+        output = self._channel(maxsize)
+        loop = self._loop
+
+        def call(items: List[T]) -> "Future[List[R]]":
+            return loop.run_in_executor(executor, _apply, func, items)
+
+        stage = partial(_parallel, source, output, call, CHUNK_SIZE, concurrency, ordered)
+        self._start(stage, [source], [output])
+        return output
+
+
+def _check_concurrency(concurrency: int) -> None:
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+
+
+def _apply(func: Callable[[T], R], items: List[T]) -> List[R]:
+    return [func(item) for item in items]
+
+
+async def _await_each(func: Callable[[T], Awaitable[R]], items: List[T]) -> List[R]:
+    return [await func(item) for item in items]
+
+
+async def _chunks(
+    source: Channel[T], output: Channel[R], func: Callable[[List[T]], List[R]]
+) -> None:
+    while True:
+        try:
+            items = await source.get_many(CHUNK_SIZE)
+        except ChannelClosed:
+            return
+        results = func(items)
+        if results:
+            await output.put_many(results)
+
+
+async def _parallel(
+    source: Channel[T], output: Channel[R],
+    call: Callable[[List[T]], Awaitable[List[R]]],
+    chunk: int, concurrency: int, ordered: bool
+) -> None:
+    # concurrency workers, each taking a chunk, calling call() on it, and
+    # (if ordered) waiting for the chunks taken before it to be put first.
+    # A worker holds at most one chunk of results, so this buffers at most
+    # concurrency chunks.
+    turn = Condition()
+    taken = 0
+    put = 0
+
+    async def worker() -> None:
+        nonlocal taken, put
+        while True:
+            try:
+                items = await source.get_many(chunk)
+            except ChannelClosed:
+                return
+            number = taken
+            taken += 1
+            results = await call(items)
+            if not ordered:
+                await output.put_many(results)
+                continue
+            async with turn:
+                await turn.wait_for(lambda: put == number)
+                await output.put_many(results)
+                put += 1
+                turn.notify_all()
+
+    workers = [ensure_future(worker()) for _ in range(concurrency)]
+    try:
+        await gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+async def _batches(
+    source: Channel[T], output: Channel[List[T]], size: int, timeout: float
+) -> None:
+    while True:
+        # wait for a first item, then give the batch timeout seconds to fill up
+        try:
+            batch = await source.get_many(size)
+        except ChannelClosed:
+            return
+        if len(batch) < size:
+            try:
+                batch.extend(await source.get_batch(size - len(batch), timeout))
+            except ChannelClosed:
+                pass
+            except BaseException:
+                # cancelled: the items taken so far go back
+                source._put_back(batch)
+                raise
+        await output.put(batch)
+
+
+async def _merge(selector: Selector[T], output: Channel[T]) -> None:
+    while True:
+        try:
+            channel, item = await selector.get()
+        except ChannelClosed:
+            return
+        items = [item]
+        if not channel.empty():
+            # take what else is ready in the same channel along
+            items.extend(channel.get_nowait_many(CHUNK_SIZE - 1))
+        await output.put_many(items)
+
+
+async def _tee(source: Channel[T], outputs: List[Channel[T]]) -> None:
+    while True:
+        try:
+            items = await source.get_many(CHUNK_SIZE)
+        except ChannelClosed:
+            return
+        for output in outputs:
+            await output.put_many(items)
+
+
+async def _split(source: Channel[T], outputs: List[Channel[T]], key: Callable[[T], int]) -> None:
+    while True:
+        try:
+            items = await source.get_many(CHUNK_SIZE)
+        except ChannelClosed:
+            return
+        groups: List[List[T]] = [[] for _ in outputs]
+        for item in items:
+            groups[key(item)].append(item)
+        for output, group in zip(outputs, groups):
+            if group:
+                await output.put_many(group)
@@ -0,0 +1,327 @@
+from .channel import Channel, T, _Waiters, _earliest, _expire_waiter
+from .errors import ChannelClosed, ChannelEmpty, ChannelFull, ChannelTimeout
+from asyncio import AbstractEventLoop, Future, TimerHandle
+from typing import Iterable, List, Optional
+
+
+class _TokenBucket:
+    # rate tokens per second, up to burst tokens. acquire() takes a token
+    # as soon as there is one (callers wait for theirs, in order), and
+    # batches pay for the rest of their items after the fact with take(),
+    # which may make the count go negative. Waiters are given their token
+    # by a single timer, set for when the next token is due.
+
+    _rate: float
+    _burst: float
+    _tokens: float
+    _stamp: float
+    _waiters: _Waiters
+    _timer: Optional[TimerHandle]
+    _loop: AbstractEventLoop
+
+    def __init__(self, rate: float, burst: float, loop: AbstractEventLoop) -> None:
+        if not rate > 0:
+            raise ValueError("rate must be > 0")
+        if not burst >= 1:
+            raise ValueError("burst must be >= 1")
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._loop = loop
+        self._stamp = loop.time()
+        self._waiters = _Waiters()
+        self._timer = None
+
+    def _refill(self) -> float:
+        now = self._loop.time()
+        self._tokens = min(self._burst, self._tokens + (now - self._stamp) * self._rate)
+        self._stamp = now
+        return self._tokens
+
+    def ready(self) -> bool:
+        return self._refill() >= 1
+
+    def take(self, count: int) -> None:
+        self._refill()
+        self._tokens -= count
+
+    def settle(self, count: int, taken: int = 0) -> None:
+        # Pay for count items, taken tokens of which were taken up front.
+        if count < taken:
+            self.refund(taken - count)
+        else:
+            self.take(count - taken)
+
+    def refund(self, count: int) -> None:
+        # Give back tokens that were taken but not used, to the next waiters.
+        self._refill()
+        self._tokens = min(self._burst, self._tokens + count)
+        # (the timer is set while there are waiters)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._release()
+
+    async def acquire(self, deadline: Optional[float] = None) -> None:
+        # Take a token, waiting for it (behind the callers already waiting).
+        if not self._waiters and self.ready():
+            self._tokens -= 1
+            return
+        waiter: Future = self._loop.create_future()
+        self._waiters.append(waiter)
+        self._arm()
+        timer = None
+        if deadline is not None:
+            timer = self._loop.call_at(deadline, _expire_waiter, waiter)
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # given a token, but cancelled before we got to run
+                self.refund(1)
+            raise
+        finally:
+            self._waiters.discard(waiter)
+            if timer is not None:
+                timer.cancel()
+
+    def _arm(self) -> None:
+        # Set the timer for when the next token is due.
+        if self._timer is None:
+            due = self._stamp + (1 - self._tokens) / self._rate
+            self._timer = self._loop.call_at(due, self._release)
+
+    def _release(self) -> None:
+        # Give the next waiters a token each, for as many tokens as there are.
+        self._timer = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._tokens -= 1
+        if self._waiters:
+            self._arm()
+
+    def close(self) -> None:
+        # Make the waiters raise ChannelClosed.
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_exception(ChannelClosed())
+        self._waiters.clear()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+class RateLimitedChannel(Channel[T]):
+    """
+        A Channel that lets items out at most at rate items per second
+        (and optionally in at most at put_rate items per second), through
+        a token bucket holding up to burst (put_burst) tokens.
+
+        Getters take a token before they wait for an item (and putters
+        before they wait for room), so getters parked on an empty channel
+        still come away with items at rate, not all at once. A token is
+        given back if its getter (putter) is cancelled or times out. All
+        waiters of a bucket get their token from a single timer, set for
+        when the next token is due, in order.
+        get_nowait() raises ChannelEmpty while there is no token, and
+        put_nowait() raises ChannelFull.
+
+        The batch methods wait for one token, then take (or put) as many
+        items as they would anyway, and pay for all of them: the next
+        callers wait until the bucket has caught up.
+
+        Throttling carries on when the channel is closed: the remaining
+        items still come out at rate, and join() returns once they have.
+    """
+
+    _get_bucket: Optional[_TokenBucket]
+    _put_bucket: Optional[_TokenBucket]
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        *,
+        rate: Optional[float] = None,
+        burst: float = 1,
+        put_rate: Optional[float] = None,
+        put_burst: float = 1,
+        overflow: str = "block",
+        loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        super().__init__(maxsize, overflow=overflow, loop=loop)
+        self._get_bucket = None if rate is None else _TokenBucket(rate, burst, self._loop)
+        self._put_bucket = None if put_rate is None else _TokenBucket(
+            put_rate, put_burst, self._loop)
+
+    def _check_get(self) -> None:
+        bucket = self._get_bucket
+        if bucket is not None and not self.empty() and not bucket.ready():
+            raise ChannelEmpty
+
+    async def _take_get_token(self, deadline: Optional[float] = None) -> int:
+        # Take a token for the next get, if it may get anything; return
+        # the number of tokens taken, for _took() to settle.
+        if self._get_bucket is None or (self._closed and self.empty()):
+            return 0
+        await self._get_bucket.acquire(deadline)
+        return 1
+
+    def _took(self, count: int, taken: int = 0) -> None:
+        if self._get_bucket is not None:
+            self._get_bucket.settle(count, taken)
+
+    def _check_put(self) -> None:
+        bucket = self._put_bucket
+        if bucket is not None and not self._closed and not bucket.ready():
+            raise ChannelFull
+
+    async def _take_put_token(self, deadline: Optional[float] = None) -> int:
+        if self._put_bucket is None or self._closed:
+            return 0
+        await self._put_bucket.acquire(deadline)
+        return 1
+
+    def _put_done(self, count: int, taken: int = 0) -> None:
+        if self._put_bucket is not None:
+            self._put_bucket.settle(count, taken)
+
+    async def put(
+        self, item: T, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> None:
+        """Put an item into the channel, once there is a token for it (if
+        the put side is rate limited) and room.
+        If the channel is closed or closing, raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time) is given
+        and passes first, raise ChannelTimeout.
+        This method is a coroutine.
+        """
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        taken = await self._take_put_token(deadline)
+        try:
+            await super().put(item, deadline=deadline)
+        except BaseException:
+            self._put_done(0, taken)
+            raise
+        self._put_done(1, taken)
+
+    def put_nowait(self, item: T) -> None:
+        """Put an item into the channel without blocking.
+        If there is no token or no free slot, raise ChannelFull.
+        """
+        self._check_put()
+        super().put_nowait(item)
+        self._put_done(1)
+
+    async def put_many(self, items: Iterable[T]) -> None:
+        """Put all items into the channel, in order, once there is a token.
+        This uses up a token per item, possibly more than there are.
+        This method is a coroutine.
+        """
+        pending = list(items)
+        taken = await self._take_put_token()
+        try:
+            if self._overflow == "block":
+                await super().put_many(pending)
+            else:
+                super().put_nowait_many(pending)
+        except BaseException:
+            self._put_done(0, taken)
+            raise
+        self._put_done(len(pending), taken)
+
+    def put_nowait_many(self, items: Iterable[T]) -> None:
+        """Put all items into the channel without blocking.
+        If there is no token, or not room for every item, raise
+        ChannelFull and add none of them.
+        """
+        pending = list(items)
+        self._check_put()
+        super().put_nowait_many(pending)
+        self._put_done(len(pending))
+
+    async def get(
+        self, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> T:
+        """Remove and return an item from the channel, once there is a
+        token for it and an item.
+        If the channel is closed and drained, raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time) is given
+        and passes first, raise ChannelTimeout.
+        This method is a coroutine.
+        """
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        taken = await self._take_get_token(deadline)
+        try:
+            item = await super().get(deadline=deadline)
+        except BaseException:
+            self._took(0, taken)
+            raise
+        self._took(1, taken)
+        return item
+
+    def get_nowait(self) -> T:
+        """Remove and return an item from the channel.
+        If there is no item, or no token for it, raise ChannelEmpty.
+        """
+        self._check_get()
+        item = super().get_nowait()
+        self._took(1)
+        return item
+
+    async def get_many(self, max_items: int) -> List[T]:
+        """Remove and return up to max_items items from the channel, once
+        there is a token and an item (see Channel.get_many()).
+        This uses up a token per item, possibly more than there are.
+        This method is a coroutine.
+        """
+        taken = await self._take_get_token()
+        try:
+            items = await super().get_many(max_items)
+        except BaseException:
+            self._took(0, taken)
+            raise
+        self._took(len(items), taken)
+        return items
+
+    def get_nowait_many(self, max_items: int) -> List[T]:
+        """Remove and return up to max_items items from the channel.
+        If there is no item, or no token, raise ChannelEmpty.
+        """
+        self._check_get()
+        items = super().get_nowait_many(max_items)
+        self._took(len(items))
+        return items
+
+    async def get_batch(self, max_items: int, timeout: float) -> List[T]:
+        """Remove and return up to max_items items from the channel, waiting
+        at most timeout seconds for a token and for the batch to fill up
+        (see Channel.get_batch()).
+        This method is a coroutine.
+        """
+        deadline = self._loop.time() + timeout
+        try:
+            taken = await self._take_get_token(deadline)
+        except ChannelTimeout:
+            return []
+        try:
+            items = await super().get_batch(max_items, max(deadline - self._loop.time(), 0))
+        except BaseException:
+            self._took(0, taken)
+            raise
+        self._took(len(items), taken)
+        return items
+
+    def close(self, drain: bool = True) -> None:
+        """Marks the channel as closed (see Channel.close()). The items in
+        the channel still come out at rate."""
+        super().close(drain)
+        # putters waiting for a token can't ever put, and neither can
+        # getters get, if there is nothing left
+        if self._put_bucket is not None:
+            self._put_bucket.close()
+        if self._get_bucket is not None and self.empty():
+            self._get_bucket.close()
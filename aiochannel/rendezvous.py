@@ -0,0 +1,170 @@
+from .channel import Channel, T, _RECEIVE, _Waiters, _earliest, _expire_waiter
+from .errors import ChannelClosed, ChannelFull
+from asyncio import AbstractEventLoop, Future
+from itertools import chain
+from typing import Any, Iterable, Iterator, List, Optional
+
+
+class RendezvousChannel(Channel[T]):
+    """
+        An unbuffered Channel: put() returns once a getter has taken its
+        item (a synchronous handoff, like an unbuffered Go channel).
+
+        An item put while a get() is waiting goes straight into that
+        getter's future (see Channel), instead of going through the buffer
+        and waking up the getter to fetch it. Likewise, get() takes the
+        item of the first waiting putter. put_nowait() succeeds only if a
+        get() is waiting, and get_nowait() only if a put() is.
+
+        The batch methods take the items of as many waiting putters as
+        they can. Selector works too: it sees a RendezvousChannel as ready
+        while a putter (or getter) is waiting on the other end.
+    """
+
+    # put() calls waiting for their item (the value) to be taken
+    _senders: _Waiters
+
+    def __init__(self, *, loop: Optional[AbstractEventLoop] = None) -> None:
+        super().__init__(0, loop=loop)
+        self._senders = _Waiters()
+
+    def _hand_over(self, item: T) -> bool:
+        # Hand item to the first getter waiting in get(), if there is one.
+        # Unlike Channel, don't stop at a get_many() (or a Selector) waiting
+        # ahead of it: nothing waits in the buffer for those to take.
+        getters = self._getters
+        for getter, receive in getters.items():
+            if receive is _RECEIVE and not getter.done():
+                getters.discard(getter)
+                self._hand_to(getter, item)
+                return True
+        return False
+
+    async def _wait_get(self, deadline: Optional[float] = None, receive: bool = False) -> Any:
+        if receive and self._putters:
+            # a Selector can come and hand one over
+            self._wakeup_next(self._putters)
+        return await super()._wait_get(deadline, receive)
+
+    def _get(self) -> T:
+        # (only called if the channel isn't empty) an item put back by a
+        # getter that gave up comes first
+        if self._queue:
+            return self._queue.popleft()
+        senders = self._senders
+        while True:
+            sender, item = senders.popitem(last=False)
+            if not sender.done():
+                sender.set_result(None)
+                return item
+
+    def _get_many(self, count: int) -> List[T]:
+        items: List[T] = []
+        while len(items) < count and not self.empty():
+            items.append(self._get())
+        return items
+
+    def _receivers(self) -> int:
+        # Number of getters waiting in get(), to hand items to.
+        return sum(
+            1 for getter, receive in self._getters.items()
+            if receive is _RECEIVE and not getter.done())
+
+    def qsize(self) -> int:
+        """Number of items waiting to be taken (the items of waiting
+        putters)."""
+        return len(self._queue) + sum(1 for sender in self._senders if not sender.done())
+
+    def empty(self) -> bool:
+        """Return True if no putter is waiting (get_nowait() would raise
+        ChannelEmpty), False otherwise."""
+        return not self._queue and not _any_waiting(self._senders)
+
+    def full(self) -> bool:
+        """Return True if no getter is waiting (put_nowait() would raise
+        ChannelFull), False otherwise."""
+        return not self._receivers()
+
+    async def put(
+        self, item: T, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> None:
+        """Put an item into the channel, and wait until a getter takes it.
+        If the channel is closed (or closes before the item is taken),
+        raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time) is given
+        and passes before the item is taken, raise ChannelTimeout (and
+        the item isn't delivered).
+        This method is a coroutine.
+        """
+        if self._closed:
+            raise ChannelClosed
+        if self._hand_over(item):
+            return
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        sender: Future = self._loop.create_future()
+        self._senders.append(sender, item)
+        if self._getters:
+            # a get_many() (or a Selector) can come and take it
+            self._wakeup_next(self._getters)
+        timer = None
+        if deadline is not None:
+            timer = self._loop.call_at(deadline, _expire_waiter, sender)
+        try:
+            await sender
+        finally:
+            self._senders.discard(sender)
+            if timer is not None:
+                timer.cancel()
+
+    def put_nowait(self, item: T) -> None:
+        """Hand an item to a waiting getter.
+        If no getter is waiting, raise ChannelFull.
+        """
+        if self._closed:
+            raise ChannelClosed
+        if not self._hand_over(item):
+            raise ChannelFull
+
+    async def put_many(self, items: Iterable[T]) -> None:
+        """Put all items into the channel, in order, each once the
+        previous one has been taken.
+        This method is a coroutine.
+        """
+        for item in items:
+            await self.put(item)
+
+    def put_nowait_many(self, items: Iterable[T]) -> None:
+        """Hand all items to waiting getters, in order.
+        If there aren't as many getters waiting, raise ChannelFull and
+        hand over none of them.
+        """
+        pending = list(items)
+        if self._closed:
+            raise ChannelClosed
+        if self._receivers() < len(pending):
+            raise ChannelFull
+        for item in pending:
+            self._hand_over(item)
+
+    def close(self, drain: bool = True) -> None:
+        """Marks the channel as closed (see Channel.close()). Waiting
+        putters get a ChannelClosed (their items are not delivered), and
+        so do waiting getters."""
+        self._closed = True
+        for sender in self._senders:
+            if not sender.done():
+                sender.set_exception(ChannelClosed())
+        self._senders.clear()
+        super().close(drain)
+
+    def __iter__(self) -> Iterator[T]:
+        return chain(self._queue, (
+            item for sender, item in self._senders.items() if not sender.done()))
+
+
+def _any_waiting(waiters: _Waiters) -> bool:
+    for waiter in waiters:
+        if not waiter.done():
+            return True
+    return False
@@ -0,0 +1,229 @@
+from .channel import Channel, T, _Waiters, _earliest, _expire_waiter
+from .errors import ChannelClosed, ChannelEmpty, ChannelFull
+from .weighted import WeightedChannel
+from asyncio import AbstractEventLoop, Future
+from itertools import chain
+from typing import Callable, Generic, Iterable, List, Optional, Sequence, Tuple
+
+
+class Selector(Generic[T]):
+    """
+        Gets items from (or puts items into) whichever of a set of channels
+        is ready first, without a task per channel.
+
+        While nothing is ready, a single waiter future is registered with
+        every channel, and taken out of all of them again when it returns.
+
+        When several channels are ready, they take turns (round-robin). With
+        weights, ready channels are picked in proportion to their weight
+        instead (smooth weighted round-robin): a channel with weight 3 gets
+        three times the turns of a channel with weight 1, as long as both
+        have items.
+
+        put() and put_nowait() spread items over channels the same way.
+        put() doesn't support WeightedChannel (it raises TypeError), as
+        its waiting putters need to carry the cost of their item.
+    """
+
+    _channels: List[Channel[T]]
+    _weights: Optional[List[int]]
+    _current: List[int]
+    _next: int
+    _weighted: bool
+    _loop: AbstractEventLoop
+
+    def __init__(
+        self, channels: Iterable[Channel[T]], *, weights: Optional[Sequence[int]] = None
+    ) -> None:
+        self._channels = list(channels)
+        if not self._channels:
+            raise ValueError("a Selector needs at least one channel")
+        self._weights = None if weights is None else list(weights)
+        if self._weights is not None and (
+            len(self._weights) != len(self._channels) or min(self._weights) < 1
+        ):
+            raise ValueError("weights must be one integer >= 1 per channel")
+        # smooth weighted round-robin state
+        self._current = [0] * len(self._channels)
+        # round-robin: where the next scan starts
+        self._next = 0
+        self._weighted = any(isinstance(channel, WeightedChannel) for channel in self._channels)
+        self._loop = self._channels[0]._loop
+
+    @property
+    def channels(self) -> List[Channel[T]]:
+        """The channels of this selector."""
+        return list(self._channels)
+
+    def _pick(self, ready: Callable[[Channel[T]], bool]) -> Optional[Channel[T]]:
+        # The next ready channel in turn, or None if none are ready.
+        channels = self._channels
+        if self._weights is None:
+            count = len(channels)
+            for index in chain(range(self._next, count), range(self._next)):
+                if ready(channels[index]):
+                    self._next = index + 1 if index + 1 < count else 0
+                    return channels[index]
+            return None
+        current = self._current
+        best = -1
+        total = 0
+        for index, channel in enumerate(channels):
+            if ready(channel):
+                weight = self._weights[index]
+                current[index] += weight
+                total += weight
+                if best < 0 or current[index] > current[best]:
+                    best = index
+        if best < 0:
+            return None
+        current[best] -= total
+        return channels[best]
+
+    async def _wait(self, waiters: Callable[[Channel[T]], _Waiters],
+                    deadline: Optional[float]) -> List[Channel[T]]:
+        # Register one waiter with every open channel, and wait until one of
+        # them wakes it up. Return the channels it was registered with.
+        waiter: Future = self._loop.create_future()
+        channels = [channel for channel in self._channels if not channel.closed()]
+        for channel in channels:
+            waiters(channel).append(waiter)
+        timer = None
+        if deadline is not None:
+            timer = self._loop.call_at(deadline, _expire_waiter, waiter)
+        try:
+            await waiter
+        except ChannelClosed:
+            pass  # one of the channels closed, look again
+        except BaseException:
+            waiter.cancel()
+            _pass_on(channels, waiters)
+            raise
+        finally:
+            for channel in channels:
+                waiters(channel).discard(waiter)
+            if timer is not None:
+                timer.cancel()
+        return channels
+
+    def get_nowait(self) -> Tuple[Channel[T], T]:
+        """Remove and return an item from the next channel (in turn) that
+        has one, as a (channel, item) tuple.
+        If no channel has an item, raise ChannelEmpty, or ChannelClosed if
+        every channel is closed and drained.
+        """
+        channel = self._pick(_can_get)
+        if channel is None:
+            if all(channel.closed() for channel in self._channels):
+                raise ChannelClosed
+            raise ChannelEmpty
+        return channel, channel.get_nowait()
+
+    async def get(
+        self, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> Tuple[Channel[T], T]:
+        """Remove and return an item from the next channel (in turn) that
+        has one, as a (channel, item) tuple. If no channel has an item, wait
+        until one does.
+        If every channel is closed and drained, raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time) is given
+        and passes before an item is available, raise ChannelTimeout.
+        This method is a coroutine.
+        """
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        woken: List[Channel[T]] = []
+        try:
+            while True:
+                try:
+                    return self.get_nowait()
+                except ChannelEmpty:
+                    woken = await self._wait(_getters, deadline)
+        finally:
+            # the channel that woke us up may not be the one we got an
+            # item from, so wake up its next getter instead
+            _pass_on(woken, _getters)
+
+    def put_nowait(self, item: T) -> Channel[T]:
+        """Put an item into the next channel (in turn) that has room for it,
+        and return that channel.
+        If no channel has room, raise ChannelFull, or ChannelClosed if
+        every channel is closed.
+        """
+        channel = self._pick(_can_put)
+        if channel is None:
+            if all(channel.closed() for channel in self._channels):
+                raise ChannelClosed
+            raise ChannelFull
+        channel.put_nowait(item)
+        return channel
+
+    async def put(
+        self, item: T, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> Channel[T]:
+        """Put an item into the next channel (in turn) that has room for it,
+        and return that channel. If no channel has room, wait until one does.
+        If every channel is closed, raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time) is given
+        and passes before there is room, raise ChannelTimeout.
+        If any of the channels is a WeightedChannel, raise TypeError.
+        This method is a coroutine.
+        """
+        if self._weighted:
+            raise TypeError("Selector.put() doesn't support WeightedChannel")
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        woken: List[Channel[T]] = []
+        try:
+            while True:
+                try:
+                    return self.put_nowait(item)
+                except ChannelFull:
+                    woken = await self._wait(_putters, deadline)
+        finally:
+            _pass_on(woken, _putters)
+
+    def __aiter__(self) -> "Selector[T]":
+        """Returns an async iterator (self) of (channel, item) tuples,
+        until every channel is closed and drained."""
+        return self
+
+    async def __anext__(self) -> Tuple[Channel[T], T]:
+        try:
+            return await self.get()
+        except ChannelClosed:
+            raise StopAsyncIteration
+
+
+async def select(channels: Iterable[Channel[T]]) -> Tuple[Channel[T], T]:
+    """Remove and return an item from the first of channels to have one,
+    as a (channel, item) tuple. See Selector.get().
+    This function is a coroutine.
+    """
+    return await Selector(channels).get()
+
+
+def _getters(channel: Channel[T]) -> _Waiters:
+    return channel._getters
+
+
+def _putters(channel: Channel[T]) -> _Waiters:
+    return channel._putters
+
+
+def _can_get(channel: Channel[T]) -> bool:
+    return not channel.empty()
+
+
+def _can_put(channel: Channel[T]) -> bool:
+    return not channel.full() and not channel.closed()
+
+
+def _pass_on(channels: List[Channel[T]], waiters: Callable[[Channel[T]], _Waiters]) -> None:
+    # A shared waiter takes (at most) one wakeup from one of channels, which
+    # may have been meant for another waiter: wake up the next waiter of
+    # every channel that is still ready.
+    ready = _can_get if waiters is _getters else _can_put
+    for channel in channels:
+        if waiters(channel) and ready(channel):
+            channel._wakeup_next(waiters(channel))
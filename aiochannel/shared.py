@@ -0,0 +1,394 @@
+from .channel import Buffer, _Waiters
+from .errors import ChannelClosed, ChannelFull, ChannelEmpty
+from asyncio import AbstractEventLoop, Future, get_running_loop
+from multiprocessing import shared_memory
+from multiprocessing.context import BaseContext
+from typing import Any, Optional, Tuple, cast
+import multiprocessing
+import socket
+import struct
+
+# head, tail, count, getters waiting, putters waiting, closed, finished
+_HEADER = struct.Struct("<QQQQQBB")
+_HEADER_SIZE = 64
+# every item is stored as its length, followed by its bytes
+_LENGTH = struct.Struct("<I")
+
+
+class _Signal:
+    """
+        Cross-process wakeup, through a socket pair shared by all processes.
+
+        Every notify() writes a byte that wakes up a single waiter in one of
+        the processes. When level is True, waiters are woken up without
+        consuming the byte, and the signal stays set for everybody.
+    """
+
+    def __init__(self, level: bool = False) -> None:
+        self._recv, self._send = socket.socketpair()
+        self._recv.setblocking(False)
+        self._send.setblocking(False)
+        self._level = level
+        self._init_local()
+
+    def _init_local(self) -> None:
+        # per process state, never shared
+        self._waiters = _Waiters()
+        self._loop: Optional[AbstractEventLoop] = None
+
+    def __getstate__(self) -> Tuple[socket.socket, socket.socket, bool]:
+        return self._recv, self._send, self._level
+
+    def __setstate__(self, state: Tuple[socket.socket, socket.socket, bool]) -> None:
+        self._recv, self._send, self._level = state
+        self._init_local()
+
+    def notify(self) -> None:
+        try:
+            self._send.send(b"\0")
+        except BlockingIOError:
+            # the socket buffer is full of wakeups no one consumed yet,
+            # so the waiters are going to wake up regardless
+            pass
+
+    async def wait(self) -> None:
+        loop = get_running_loop()
+        fd = self._recv.fileno()
+        waiter: Future = loop.create_future()
+        if not self._waiters:
+            loop.add_reader(fd, self._on_readable)
+            self._loop = loop
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # We consumed a wakeup, but were cancelled before we could act
+                # on it. Pass it on.
+                self.notify()
+            raise
+        finally:
+            self._waiters.discard(waiter)
+            if not self._waiters:
+                loop.remove_reader(fd)
+                self._loop = None
+
+    def _on_readable(self) -> None:
+        if not self._level:
+            try:
+                self._recv.recv(1)
+            except BlockingIOError:
+                # another process got to it first
+                return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                if not self._level:
+                    return
+        if not self._level:
+            # everybody here gave up in the meantime
+            self.notify()
+
+    def close(self) -> None:
+        if self._loop is not None:
+            self._loop.remove_reader(self._recv.fileno())
+        self._recv.close()
+        self._send.close()
+
+
+class SharedMemoryChannel:
+    """
+        A Channel of bytes that works across processes.
+
+        Items are stored in a ring buffer in shared memory
+        (multiprocessing.shared_memory), so each item is copied once into the
+        buffer by put() and once out of it by get(), without pickling and
+        without a feeder thread. Processes waiting on the channel are woken up
+        through socket pairs, which integrate with the asyncio event loop.
+
+        The channel is passed to other processes by handing it to them when
+        they are started (as an argument to multiprocessing.Process, for
+        example). It has the same put/get/close/join API and errors as Channel,
+        but its capacity is in bytes: every item takes up its length plus 4 bytes.
+
+        The process that creates the channel owns the shared memory, and must
+        call unlink() once every process is done with it. Every process should
+        call release() when it no longer uses the channel.
+        Requires an event loop that supports add_reader() (not the Windows
+        ProactorEventLoop).
+    """
+
+    def __init__(self, capacity: int = 1 << 20, *, ctx: Optional[BaseContext] = None) -> None:
+        if not isinstance(capacity, int) or capacity <= _LENGTH.size:
+            raise TypeError("capacity must be an integer > {}".format(_LENGTH.size))
+        self._capacity = capacity
+        self._shm = shared_memory.SharedMemory(create=True, size=_HEADER_SIZE + capacity)
+        self._lock = (ctx or multiprocessing).Lock()
+        self._data = _Signal()
+        self._space = _Signal()
+        self._done = _Signal(level=True)
+        self._attach()
+        self._write_header(0, 0, 0, 0, 0, 0, 0)
+
+    def _attach(self) -> None:
+        buf = cast(memoryview, self._shm.buf)
+        self._header = buf[:_HEADER_SIZE]
+        self._buf = buf[_HEADER_SIZE:_HEADER_SIZE + self._capacity]
+
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return (self._shm.name, self._capacity, self._lock,
+                self._data, self._space, self._done)
+
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        name, self._capacity, self._lock, self._data, self._space, self._done = state
+        # Processes started by multiprocessing share the resource tracker
+        # of the creating process, so attaching doesn't change ownership.
+        self._shm = shared_memory.SharedMemory(name=name)
+        self._attach()
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory segment."""
+        return self._shm.name
+
+    @property
+    def capacity(self) -> int:
+        """Size of the buffer, in bytes."""
+        return self._capacity
+
+    def __repr__(self) -> str:
+        return '<{} at {:#x} name={!r} capacity={!r} qsize={!r}>'.format(
+            type(self).__name__, id(self), self.name, self._capacity, self.qsize())
+
+    def __str__(self) -> str:
+        return '<{} capacity={!r} qsize={!r}>'.format(
+            type(self).__name__, self._capacity, self.qsize())
+
+    def _read_header(self) -> Tuple[int, int, int, int, int, int, int]:
+        return _HEADER.unpack_from(self._header)
+
+    def _write_header(
+        self, head: int, tail: int, count: int, getters: int, putters: int,
+        closed: int, finished: int
+    ) -> None:
+        _HEADER.pack_into(self._header, 0, head, tail, count, getters, putters, closed, finished)
+
+    def _write_into(self, position: int, data: Any) -> None:
+        start = position % self._capacity
+        size = len(data)
+        first = min(size, self._capacity - start)
+        self._buf[start:start + first] = data[:first]
+        if first < size:
+            self._buf[:size - first] = data[first:]
+
+    def _read_from(self, position: int, size: int) -> bytes:
+        start = position % self._capacity
+        end = start + size
+        if end <= self._capacity:
+            return bytes(self._buf[start:end])
+        return bytes(self._buf[start:]) + bytes(self._buf[:end - self._capacity])
+
+    def qsize(self) -> int:
+        """Number of items in the channel buffer."""
+        return self._read_header()[2]
+
+    def nbytes(self) -> int:
+        """Number of bytes used in the channel buffer."""
+        head, tail = self._read_header()[:2]
+        return tail - head
+
+    def empty(self) -> bool:
+        """Return True if the channel is empty, False otherwise."""
+        return self.qsize() == 0
+
+    def full(self) -> bool:
+        """Return True if there is no room left for any item (not even an empty one)."""
+        return self._capacity - self.nbytes() < _LENGTH.size
+
+    def closed(self) -> bool:
+        """Returns True if the Channel is marked as closed"""
+        return bool(self._read_header()[5])
+
+    def _try_put(self, data: memoryview, was_waiting: bool, wait: bool) -> bool:
+        # Put data if there is room. If not, and wait is True, register as a
+        # waiting putter. Returns whether data was put.
+        size = _LENGTH.size + data.nbytes
+        with self._lock:
+            head, tail, count, getters, putters, closed, finished = self._read_header()
+            putters -= was_waiting
+            if closed:
+                self._write_header(head, tail, count, getters, putters, closed, finished)
+                raise ChannelClosed
+            if self._capacity - (tail - head) < size:
+                self._write_header(head, tail, count, getters, putters + wait, closed, finished)
+                return False
+            self._write_into(tail, _LENGTH.pack(data.nbytes))
+            self._write_into(tail + _LENGTH.size, data)
+            self._write_header(head, tail + size, count + 1, getters, putters, closed, finished)
+        if getters:
+            self._data.notify()
+        if putters:
+            # there may be room for the other putters too; make sure one is awake
+            self._space.notify()
+        return True
+
+    def _try_get(self, was_waiting: bool, wait: bool) -> Optional[bytes]:
+        # Get an item if there is one. If not, and wait is True, register as
+        # a waiting getter.
+        with self._lock:
+            head, tail, count, getters, putters, closed, finished = self._read_header()
+            getters -= was_waiting
+            if not count:
+                if closed:
+                    self._write_header(head, tail, count, getters, putters, closed, finished)
+                    raise ChannelClosed
+                self._write_header(head, tail, count, getters + wait, putters, closed, finished)
+                return None
+            (size,) = _LENGTH.unpack(self._read_from(head, _LENGTH.size))
+            item = self._read_from(head + _LENGTH.size, size)
+            count -= 1
+            finished = int(closed and not count)
+            self._write_header(head + _LENGTH.size + size, tail, count, getters, putters,
+                               closed, finished)
+        if putters:
+            self._space.notify()
+        if getters and (count or closed):
+            # there is more for the other getters (or they need to see the
+            # channel closed); make sure one of them is awake
+            self._data.notify()
+        if finished:
+            self._done.notify()
+        return item
+
+    def _unregister(self, putter: bool) -> None:
+        # A waiting putter or getter gave up.
+        with self._lock:
+            head, tail, count, getters, putters, closed, finished = self._read_header()
+            if putter:
+                putters -= 1
+            else:
+                getters -= 1
+            self._write_header(head, tail, count, getters, putters, closed, finished)
+
+    def _as_bytes(self, item: Buffer) -> memoryview:
+        data = memoryview(item).cast("B")
+        if _LENGTH.size + data.nbytes > self._capacity:
+            raise ValueError("item of {} bytes does not fit in a channel of {} bytes".format(
+                data.nbytes, self._capacity))
+        return data
+
+    def put_nowait(self, item: Buffer) -> None:
+        """Put an item into the channel without blocking.
+        If there isn't room for it, raise ChannelFull.
+        """
+        if not self._try_put(self._as_bytes(item), False, False):
+            raise ChannelFull
+
+    async def put(self, item: Buffer) -> None:
+        """Put an item into the channel.
+        If the channel is full, wait until there is room for the item.
+        If the channel is closed or closing, raise ChannelClosed.
+        This method is a coroutine.
+        """
+        data = self._as_bytes(item)
+        waiting = False
+        try:
+            while not self._try_put(data, waiting, True):
+                waiting = True
+                await self._space.wait()
+        except ChannelClosed:
+            # wake up the next one, so everybody gets to see the channel closed
+            self._space.notify()
+            raise
+        except BaseException:
+            # only the wait can be interrupted, and we're registered by then
+            self._unregister(putter=True)
+            raise
+
+    def get_nowait(self) -> bytes:
+        """Remove and return an item from the channel.
+        Return an item if one is immediately available, else raise ChannelEmpty.
+        """
+        item = self._try_get(False, False)
+        if item is None:
+            raise ChannelEmpty
+        return item
+
+    async def get(self) -> bytes:
+        """Remove and return an item from the channel.
+        If channel is empty, wait until an item is available.
+        This method is a coroutine.
+        """
+        waiting = False
+        try:
+            while True:
+                item = self._try_get(waiting, True)
+                if item is not None:
+                    return item
+                waiting = True
+                await self._data.wait()
+        except ChannelClosed:
+            # wake up the next one, so everybody gets to see the channel closed
+            self._data.notify()
+            raise
+        except BaseException:
+            # only the wait can be interrupted, and we're registered by then
+            self._unregister(putter=False)
+            raise
+
+    def close(self) -> None:
+        """Marks the channel is closed, in every process.
+        Pending and future putters raise ChannelClosed, getters can
+        keep getting items until the channel is drained.
+        """
+        with self._lock:
+            head, tail, count, getters, putters, closed, finished = self._read_header()
+            finished = int(not count)
+            self._write_header(head, tail, count, getters, putters, 1, finished)
+        self._space.notify()
+        self._data.notify()
+        if finished:
+            self._done.notify()
+
+    async def join(self) -> None:
+        """Block until channel is closed and channel is drained
+        """
+        while not self._read_header()[6]:
+            await self._done.wait()
+
+    def __aiter__(self) -> "SharedMemoryChannel":
+        """Returns an async iterator (self)"""
+        return self
+
+    async def __anext__(self) -> bytes:
+        try:
+            data = await self.get()
+        except ChannelClosed:
+            raise StopAsyncIteration
+        else:
+            return data
+
+    def release(self) -> None:
+        """Detach this process from the channel.
+        The channel can't be used in this process after this.
+        """
+        self.detach()
+        for signal in (self._data, self._space, self._done):
+            signal.close()
+
+    def detach(self) -> None:
+        """Unmap the shared memory of this handle to the channel, but leave
+        the wakeup signals open, for other handles in this process that
+        share them (unlike release()). This handle can't be used after this.
+        """
+        self._header.release()
+        self._buf.release()
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Destroy the shared memory segment backing the channel.
+        Called once, by the process that created the channel, after every
+        process is done with it.
+        """
+        self._shm.unlink()
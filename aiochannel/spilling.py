@@ -0,0 +1,272 @@
+from .channel import Channel, T
+from asyncio import AbstractEventLoop, Future, gather
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Set
+import mmap
+import os
+import pickle
+import struct
+
+# every item is stored as its length, followed by its serialized bytes
+_LENGTH = struct.Struct("<I")
+_SUFFIX = ".seg"
+
+
+class _Segment:
+    # A run of items in the middle of the channel, spilled to one file.
+    # items is None once they have been written and dropped from memory,
+    # until they are read back in.
+
+    def __init__(self, number: int, count: int, items: Optional[List[Any]]) -> None:
+        self.number = number
+        self.count = count
+        self.items = items
+        self.written = items is None
+        self.reading: Optional[Future] = None
+        self.consumed = False
+
+    def path(self, directory: str) -> str:
+        return os.path.join(directory, "{:016d}-{}{}".format(self.number, self.count, _SUFFIX))
+
+
+def _write(path: str, serializer: Any, items: List[Any]) -> None:
+    # Runs in the executor. Write to a temporary file first, so that a
+    # crash never leaves a partial segment behind.
+    data = bytearray()
+    for item in items:
+        record = serializer.dumps(item)
+        data += _LENGTH.pack(len(record))
+        data += record
+    with open(path + ".tmp", "wb") as file:
+        file.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def _read(path: str, serializer: Any) -> List[Any]:
+    # Runs in the executor (or, if an item is needed before it is done,
+    # on the event loop).
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        items = []
+        offset = 0
+        while offset < len(view):
+            (size,) = _LENGTH.unpack_from(view, offset)
+            offset += _LENGTH.size
+            items.append(serializer.loads(view[offset:offset + size]))
+            offset += size
+        return items
+
+
+class SpillingChannel(Channel[T]):
+    """
+        A Channel that spills to disk instead of growing without bounds in
+        memory.
+
+        The next items to come out (the head) and the latest items put (the
+        tail) are kept in memory, up to segment_items each. When the tail
+        fills up, it is handed to the executor to be written to a new
+        segment file in directory, and dropped from memory once written.
+        Segments are read back in order (memory-mapped), in the executor,
+        one segment ahead of the head. If an item is needed before its
+        segment has been read back, it is read on the spot.
+
+        serializer is any object with dumps() and loads() functions, like
+        the pickle module (the default). Items must not change once put,
+        as they may be serialized later, on another thread.
+
+        With recover=True, the segments left in directory (by a channel
+        that didn't get to drain them, say because the process crashed)
+        are put back in front of the channel, in order. Only items in
+        segments can be recovered: the items still in memory are lost, and
+        as a segment is removed once all of its items have been taken out,
+        the items of the segment being taken out are delivered again.
+        Without recover, leftover segments are removed.
+    """
+
+    _directory: str
+    _segment_items: int
+    _serializer: Any
+    _executor: Optional[Executor]
+    _recover: bool
+    _segments: Deque[_Segment]
+    _tail: Deque[T]
+    _spilled: int
+    _next_number: int
+    # the segment the head was last filled from, removed once it is drained
+    _current: Optional[_Segment]
+    _pending: Set[Future]
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        *,
+        directory: str,
+        segment_items: int = 1024,
+        serializer: Any = pickle,
+        recover: bool = False,
+        executor: Optional[Executor] = None,
+        overflow: str = "block",
+        loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        if segment_items < 1:
+            raise ValueError("segment_items must be >= 1")
+        self._directory = directory
+        self._segment_items = segment_items
+        self._serializer = serializer
+        self._executor = executor
+        self._recover = recover
+        super().__init__(maxsize, overflow=overflow, loop=loop)
+
+    def _init(self) -> None:
+        super()._init()
+        self._segments = deque()
+        self._tail = deque()
+        self._spilled = 0
+        self._current = None
+        self._pending = set()
+        os.makedirs(self._directory, exist_ok=True)
+        numbers = []
+        for name in sorted(os.listdir(self._directory)):
+            path = os.path.join(self._directory, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+            elif name.endswith(_SUFFIX):
+                number, count = name[:-len(_SUFFIX)].split("-")
+                numbers.append(int(number))
+                if self._recover:
+                    self._segments.append(_Segment(int(number), int(count), None))
+                    self._spilled += int(count)
+                else:
+                    os.remove(path)
+        self._next_number = max(numbers, default=-1) + 1
+
+    def _run(self, func: Any, *args: Any) -> Future:
+        future = self._loop.run_in_executor(self._executor, func, *args)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return future
+
+    def _put(self, item: T) -> None:
+        if not self._segments and not self._tail and len(self._queue) < self._segment_items:
+            self._queue.append(item)
+            return
+        self._tail.append(item)
+        if len(self._tail) >= self._segment_items:
+            self._spill()
+
+    def _put_many(self, items: Iterable[T]) -> None:
+        for item in items:
+            self._put(item)
+
+    def _spill(self) -> None:
+        # Hand the tail over to the executor, as a new segment.
+        segment = _Segment(self._next_number, len(self._tail), list(self._tail))
+        self._next_number += 1
+        self._tail.clear()
+        self._segments.append(segment)
+        self._spilled += segment.count
+        path = segment.path(self._directory)
+        self._run(_write, path, self._serializer, segment.items).add_done_callback(
+            lambda future: self._written(segment, future))
+
+    def _written(self, segment: _Segment, future: Future) -> None:
+        if future.exception() is not None:
+            # keep the items in memory
+            return
+        segment.written = True
+        if segment.consumed:
+            if segment is not self._current:
+                self._run(os.remove, segment.path(self._directory))
+        elif self._segments[0] is not segment:
+            # drop it from memory, until it is read back
+            segment.items = None
+            self._prefetch()
+
+    def _prefetch(self) -> None:
+        # Start reading the next segment back in, if it isn't in memory.
+        if self._segments:
+            segment = self._segments[0]
+            if segment.items is None and segment.reading is None:
+                segment.reading = self._run(
+                    _read, segment.path(self._directory), self._serializer)
+                segment.reading.add_done_callback(lambda future: self._loaded(segment, future))
+
+    def _loaded(self, segment: _Segment, future: Future) -> None:
+        if not segment.consumed and future.exception() is None:
+            segment.items = future.result()
+
+    def _drained(self) -> None:
+        # The head is empty: the segment it was filled from can go.
+        current, self._current = self._current, None
+        if current is not None and current.written:
+            self._run(os.remove, current.path(self._directory))
+
+    def _refill(self) -> None:
+        # The head is empty: move the next segment (or the tail) into it.
+        if not self._segments:
+            self._queue, self._tail = self._tail, self._queue
+            return
+        segment = self._segments.popleft()
+        if segment.items is None:
+            # not read back in time: read it here
+            segment.items = _read(segment.path(self._directory), self._serializer)
+        self._queue.extend(segment.items)
+        segment.items = None
+        segment.consumed = True
+        self._spilled -= segment.count
+        self._current = segment
+        self._prefetch()
+
+    def _get(self) -> T:
+        if not self._queue:
+            self._refill()
+        item = self._queue.popleft()
+        if not self._queue and self._current is not None:
+            self._drained()
+        return item
+
+    def _get_many(self, count: int) -> List[T]:
+        items: List[T] = []
+        while len(items) < count and self.qsize():
+            if not self._queue:
+                self._refill()
+            items.extend(super()._get_many(count - len(items)))
+            if not self._queue and self._current is not None:
+                self._drained()
+        return items
+
+    def qsize(self) -> int:
+        """Number of items in the channel, in memory and on disk."""
+        return len(self._queue) + self._spilled + len(self._tail)
+
+    def empty(self) -> bool:
+        """Return True if the channel is empty, False otherwise."""
+        return not self.qsize()
+
+    def full(self) -> bool:
+        """Return True if there are maxsize items in the channel.
+        Note: if the Channel was initialized with maxsize=0 (the default),
+        then full() is never True.
+        """
+        return 0 < self._maxsize <= self.qsize() + self._handed
+
+    def spilled(self) -> int:
+        """Number of items in segments (on disk, or being read or written)."""
+        return self._spilled
+
+    async def flush(self) -> None:
+        """Wait until the segments handed to the executor so far have been
+        written (and read back, or removed).
+        This method is a coroutine.
+        """
+        while self._pending:
+            await gather(*self._pending, return_exceptions=True)
+
+    def __iter__(self) -> Iterator[T]:
+        yield from self._queue
+        for segment in self._segments:
+            if segment.items is not None:
+                yield from segment.items
+            else:
+                yield from _read(segment.path(self._directory), self._serializer)
+        yield from self._tail
@@ -0,0 +1,158 @@
+from .channel import Channel, T, _running_loop
+from .errors import ChannelClosed, ChannelTimeout
+from asyncio import AbstractEventLoop, run_coroutine_threadsafe
+from collections import deque
+from threading import Condition
+from typing import Deque, List, Optional
+
+
+class ThreadSafeChannel(Channel[T]):
+    """
+        A Channel that can also be used from other threads.
+
+        Coroutines running on the channel's event loop use it like any
+        other Channel. Other threads use put_sync() and get_sync(), which
+        block the calling thread instead.
+
+        Items put from other threads are buffered and moved into the channel
+        in bursts: one wakeup of the event loop covers every put_sync() that
+        happened since the last one. They count towards maxsize (and qsize())
+        as soon as put_sync() returns.
+    """
+
+    # every item goes through _get(), to let pending items in
+    _direct_handoff = False
+
+    _pending: Deque[T]
+    _cond: Condition
+    _flush_scheduled: bool
+    _sync_putters: int
+
+    def __init__(
+        self, maxsize: int = 0, *, loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        super().__init__(maxsize, loop=loop)
+        # Items put by other threads, not yet moved into the channel.
+        self._pending = deque()
+        self._cond = Condition()
+        self._flush_scheduled = False
+        # Number of threads blocked in put_sync()
+        self._sync_putters = 0
+
+    def _get(self) -> T:
+        item = self._queue.popleft()
+        if self._pending or self._sync_putters:
+            self._slots_freed(1)
+        return item
+
+    def _get_many(self, count: int) -> List[T]:
+        items = super()._get_many(count)
+        if self._pending or self._sync_putters:
+            self._slots_freed(len(items))
+        return items
+
+    def _slots_freed(self, count: int) -> None:
+        # Runs on the event loop: items were taken out of the channel, so
+        # pending items can move in, and blocked threads can put again.
+        with self._cond:
+            self._flush_pending()
+            self._cond.notify(count)
+
+    def _flush(self) -> None:
+        # Runs on the event loop, scheduled by put_sync().
+        with self._cond:
+            self._flush_scheduled = False
+            self._flush_pending()
+
+    def _flush_pending(self) -> None:
+        # Move as many pending items into the channel as there is room for.
+        # Must be called with self._cond held.
+        pending = self._pending
+        count = len(pending)
+        if self._maxsize > 0:
+            count = min(count, self._maxsize - len(self._queue))
+        if count <= 0:
+            return
+        if count == len(pending):
+            self._put_many(pending)
+            pending.clear()
+        else:
+            self._put_many([pending.popleft() for _ in range(count)])
+        self._wakeup_many(self._getters, count)
+
+    def qsize(self) -> int:
+        """Number of items in the channel buffer, including items put
+        by other threads that have not been moved into the channel yet."""
+        return len(self._queue) + len(self._pending)
+
+    def full(self) -> bool:
+        """Return True if there are maxsize items in the channel,
+        counting items put by other threads.
+        Note: if the Channel was initialized with maxsize=0 (the default),
+        then full() is never True.
+        """
+        return 0 < self._maxsize <= len(self._queue) + len(self._pending)
+
+    def _check_not_loop_thread(self, method: str) -> None:
+        if _running_loop() is self._loop:
+            raise RuntimeError(
+                "{0}_sync() would block the event loop, use {0}() instead".format(method))
+
+    def put_sync(self, item: T, timeout: Optional[float] = None) -> None:
+        """Put an item into the channel from another thread.
+        If the channel is full, block the calling thread until a free slot
+        is available. If timeout (in seconds) is given and passes before
+        that, raise ChannelTimeout.
+        If the channel is closed or closing, raise ChannelClosed.
+        Must not be called from the channel's event loop.
+        """
+        self._check_not_loop_thread("put")
+        with self._cond:
+            self._sync_putters += 1
+            try:
+                has_room = self._cond.wait_for(
+                    lambda: self._closed or not self.full(), timeout)
+            finally:
+                self._sync_putters -= 1
+            if self._closed:
+                raise ChannelClosed
+            if not has_room:
+                raise ChannelTimeout
+            self._pending.append(item)
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                self._loop.call_soon_threadsafe(self._flush)
+
+    def get_sync(self, timeout: Optional[float] = None) -> T:
+        """Remove and return an item from the channel from another thread.
+        If the channel is empty, block the calling thread until an item is
+        available. If timeout (in seconds) is given and passes before that,
+        raise ChannelTimeout.
+        If the channel is closed and drained, raise ChannelClosed.
+        Must not be called from the channel's event loop.
+        """
+        self._check_not_loop_thread("get")
+        return run_coroutine_threadsafe(self.get(timeout=timeout), self._loop).result()
+
+    def close(self, drain: bool = True) -> None:
+        """Marks the channel is closed and throw a ChannelClosed in all pending putters.
+        Items already accepted by put_sync() stay in the channel.
+        Must be called from the channel's event loop, see close_threadsafe().
+        """
+        with self._cond:
+            if self._pending:
+                # these were accepted before the close, so they go in
+                # regardless of maxsize
+                count = len(self._pending)
+                self._put_many(self._pending)
+                self._pending.clear()
+                self._wakeup_many(self._getters, count)
+            super().close(drain)
+            self._cond.notify_all()
+
+    def close_threadsafe(self) -> None:
+        """Close the channel from another thread.
+        The channel is closed as soon as the event loop gets to it; any
+        put_sync() that returned before this call is delivered.
+        """
+        self._loop.call_soon_threadsafe(self.close)
@@ -0,0 +1,276 @@
+from .channel import Channel
+from .errors import ChannelClosed, ChannelFull
+from array import array
+from asyncio import AbstractEventLoop
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+import struct
+
+# formats stored as scalars (the array module's typecodes, but "u" and
+# "w"); any other format is a struct format, for records
+_SCALAR_FORMATS = "bBhHiIlLqQfd"
+# formats of buffers taken as raw packed items
+_RAW_FORMATS = ("B", "b", "c")
+
+
+class TypedChannel(Channel[Any]):
+    """
+        A Channel of fixed-size items, kept packed in a ring buffer instead
+        of as Python objects, so every item takes up format's size in
+        memory and no more (plus the slack of the buffer, which doubles in
+        size when it fills up).
+
+        format is either an array typecode ("d", "q", ...), for numbers,
+        or a struct format ("<dI", ...), for records: those go in and come
+        out as tuples, like struct.unpack() returns them.
+
+        put_many() and put_nowait_many() take an iterable of items, or a
+        bytes-like object holding packed items, in one go: an array.array
+        of the same typecode, a memoryview or a NumPy array of the same
+        format, or raw bytes. get_many(), get_nowait_many() and get_batch()
+        return an array.array of the items (a list of tuples, for records).
+
+        Items are checked against format when they are put; an item that
+        doesn't fit raises TypeError, ValueError or struct.error.
+    """
+
+    # every item goes through _put(), to be packed
+    _direct_handoff = False
+
+    _format: str
+    _struct: Optional[struct.Struct]
+    _itemsize: int
+    # the ring buffer holds _capacity items, the _count first of which
+    # start at item _head (wrapping around)
+    _buffer: memoryview
+    _items: Optional[memoryview]
+    _capacity: int
+    _head: int
+    _count: int
+
+    def __init__(
+        self,
+        format: str,
+        maxsize: int = 0,
+        *,
+        overflow: str = "block",
+        loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        if len(format) == 1 and format in _SCALAR_FORMATS:
+            self._struct = None
+            self._itemsize = array(format).itemsize
+        else:
+            try:
+                self._struct = struct.Struct(format)
+            except struct.error:
+                raise ValueError("format must be an array typecode or a struct format") from None
+            self._itemsize = self._struct.size
+            if not self._itemsize:
+                raise ValueError("format must not be empty")
+        self._format = format
+        super().__init__(maxsize, overflow=overflow, loop=loop)
+
+    def _init(self) -> None:
+        self._capacity = 0
+        self._head = 0
+        self._count = 0
+        self._alloc(0)
+
+    def _alloc(self, capacity: int) -> None:
+        # Point the buffer at a new one, of capacity items.
+        self._buffer = memoryview(bytearray(capacity * self._itemsize))
+        self._items = (
+            self._buffer.cast(self._format) if self._struct is None else None  # type: ignore
+        )
+        self._capacity = capacity
+
+    def _spans(self, start: int, count: int) -> List[Tuple[int, int]]:
+        # The byte ranges of count items from item start on: one, or two if
+        # they wrap around the end of the buffer.
+        size = self._itemsize
+        end = start + count
+        if end <= self._capacity:
+            return [(start * size, end * size)]
+        return [(start * size, self._capacity * size), (0, (end - self._capacity) * size)]
+
+    def _reserve(self, count: int) -> None:
+        # Make room for count items in all, moving the items to the start
+        # of a new buffer if the current one is too small.
+        if count <= self._capacity:
+            return
+        chunks = [self._buffer[start:end] for start, end in self._spans(self._head, self._count)]
+        self._alloc(max(count, 2 * self._capacity, 16))
+        position = 0
+        for chunk in chunks:
+            self._buffer[position:position + chunk.nbytes] = chunk
+            position += chunk.nbytes
+        self._head = 0
+
+    def _advance(self, count: int) -> None:
+        # Drop the next count items.
+        self._count -= count
+        self._head = (self._head + count) % self._capacity if self._count else 0
+
+    def _pack(self, items: Any) -> memoryview:
+        # items (packed, or an iterable of items) as a view of their bytes.
+        try:
+            view = memoryview(items)
+        except TypeError:
+            if self._struct is None:
+                return memoryview(array(self._format, items)).cast("B")
+            pack = self._struct.pack
+            return memoryview(b"".join([pack(*item) for item in items]))
+        if view.format != self._format and view.format not in _RAW_FORMATS:
+            raise ValueError("buffer format {!r} doesn't match {!r}".format(
+                view.format, self._format))
+        view = view.cast("B")
+        if view.nbytes % self._itemsize:
+            raise ValueError("buffer size must be a multiple of {}".format(self._itemsize))
+        return view
+
+    def _get(self) -> Any:
+        head = self._head
+        if self._items is not None:
+            item = self._items[head]
+        else:
+            item = self._struct.unpack_from(self._buffer, head * self._itemsize)  # type: ignore
+        self._advance(1)
+        return item
+
+    def _put(self, item: Any) -> None:
+        self._reserve(self._count + 1)
+        tail = (self._head + self._count) % self._capacity
+        if self._items is not None:
+            self._items[tail] = item
+        else:
+            self._struct.pack_into(self._buffer, tail * self._itemsize, *item)  # type: ignore
+        self._count += 1
+
+    def _put_front(self, item: Any) -> None:
+        self._reserve(self._count + 1)
+        head = self._head = (self._head - 1) % self._capacity
+        if self._items is not None:
+            self._items[head] = item
+        else:
+            self._struct.pack_into(self._buffer, head * self._itemsize, *item)  # type: ignore
+        self._count += 1
+
+    def _get_many(self, count: int) -> Any:
+        count = min(count, self._count)
+        chunks = [self._buffer[start:end] for start, end in self._spans(self._head, count)]
+        if self._struct is None:
+            items: Any = array(self._format)
+            for chunk in chunks:
+                items.frombytes(chunk)
+        else:
+            items = [item for chunk in chunks for item in self._struct.iter_unpack(chunk)]
+        self._advance(count)
+        return items
+
+    def _put_many(self, items: Iterable[Any]) -> None:
+        data = self._pack(items)
+        count = data.nbytes // self._itemsize
+        if not count:
+            return
+        self._reserve(self._count + count)
+        position = 0
+        for start, end in self._spans((self._head + self._count) % self._capacity, count):
+            self._buffer[start:end] = data[position:position + end - start]
+            position += end - start
+        self._count += count
+
+    @property
+    def format(self) -> str:
+        """The format of the items (an array typecode or a struct format)."""
+        return self._format
+
+    @property
+    def itemsize(self) -> int:
+        """Size of an item in the channel buffer, in bytes."""
+        return self._itemsize
+
+    def nbytes(self) -> int:
+        """Number of bytes the items in the channel buffer take up."""
+        return self._count * self._itemsize
+
+    def qsize(self) -> int:
+        """Number of items in the channel buffer."""
+        return self._count
+
+    def empty(self) -> bool:
+        """Return True if the channel is empty, False otherwise."""
+        return not self._count
+
+    def full(self) -> bool:
+        """Return True if there are maxsize items in the channel.
+        Note: if the Channel was initialized with maxsize=0 (the default),
+        then full() is never True.
+        """
+        return 0 < self._maxsize <= self._count
+
+    async def put_many(self, items: Iterable[Any]) -> None:
+        """Put all items (an iterable of items, or packed items, see
+        TypedChannel) into the channel, in order (see Channel.put_many()).
+        Packed items are copied into the channel a chunk at a time, as
+        large as the free space allows.
+        This method is a coroutine.
+        """
+        if self._overflow != "block":
+            self.put_nowait_many(items)
+            return
+        data = self._pack(items)
+        size = self._itemsize
+        count = data.nbytes // size
+        start = 0
+        while start < count:
+            while self.full() and not self._closed:
+                await self._wait_put()
+            if self._closed:
+                raise ChannelClosed
+            if self._maxsize > 0:
+                end = min(count, start + self._maxsize - self._count)
+            else:
+                end = count
+            self._put_many(data[start * size:end * size])
+            self._wakeup_many(self._getters, end - start)
+            start = end
+
+    def put_nowait_many(self, items: Iterable[Any]) -> None:
+        """Put all items (an iterable of items, or packed items, see
+        TypedChannel) into the channel without blocking.
+        If there is not room for every item, raise ChannelFull and add none
+        of them. If the channel has an overflow policy other than "block",
+        add them all instead, dropping as many items as needed at once.
+        """
+        data = self._pack(items)
+        size = self._itemsize
+        count = data.nbytes // size
+        excess = self._count + count - self._maxsize
+        if self._maxsize > 0 and excess > 0:
+            if self._overflow == "block":
+                raise ChannelFull
+            if self._closed:
+                raise ChannelClosed
+            self._dropped += excess
+            if self._overflow == "drop_newest":
+                data = data[:(count - excess) * size]
+            else:
+                # keep the latest maxsize items, of the channel and data
+                skip = max(count - self._maxsize, 0)
+                self._advance(excess - skip)
+                data = data[skip * size:]
+            self._put_many(data)
+            self._wakeup_many(self._getters, self._count)
+            return
+        if self._closed:
+            raise ChannelClosed
+        self._put_many(data)
+        self._wakeup_many(self._getters, count)
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterate over the items in the channel, without removing them."""
+        for start, end in self._spans(self._head, self._count):
+            chunk = self._buffer[start:end]
+            if self._struct is None:
+                yield from chunk.cast(self._format)  # type: ignore
+            else:
+                yield from self._struct.iter_unpack(chunk)
@@ -0,0 +1,224 @@
+from .channel import Channel, T, _Waiters, _earliest
+from .errors import ChannelClosed, ChannelFull
+from asyncio import AbstractEventLoop
+from collections import deque
+from typing import Callable, Deque, Iterable, List, Optional, Union
+
+Cost = Union[int, float]
+
+
+class WeightedChannel(Channel[T]):
+    """
+        A Channel bounded by the summed cost of its items, instead of
+        their number.
+
+        cost is called once per item put, and returns how much of maxsize
+        the item takes up. An item fits if the channel has room for its
+        cost; an item that costs more than maxsize still fits into an empty
+        channel, so it can't block forever.
+
+        Blocked putters are served in order, but a putter whose item
+        doesn't fit yet doesn't hold up the putters behind it: when room
+        frees up, every waiting putter whose item fits is woken up. New
+        putters queue up behind blocked ones, though, even if their item
+        fits, so that a stream of small items can't starve a large one.
+    """
+
+    # every item goes through _put() and _get(), for its cost
+    _direct_handoff = False
+
+    _cost: Callable[[T], Cost]
+    _costs: Deque[Cost]
+    _total: Cost
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        *,
+        cost: Callable[[T], Cost],
+        loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        self._cost = cost
+        super().__init__(maxsize, loop=loop)
+
+    def _init(self) -> None:
+        super()._init()
+        # cost of each item in self._queue, in the same order
+        self._costs = deque()
+        self._total = 0
+
+    def _get(self) -> T:
+        self._total -= self._costs.popleft()
+        return self._queue.popleft()
+
+    def _put(self, item: T) -> None:
+        self._put_costed(item, self._item_cost(item))
+
+    def _put_front(self, item: T) -> None:
+        cost = self._item_cost(item)
+        self._queue.appendleft(item)
+        self._costs.appendleft(cost)
+        self._total += cost
+
+    def _get_many(self, count: int) -> List[T]:
+        items = super()._get_many(count)
+        self._total -= sum(self._costs.popleft() for _ in items)
+        return items
+
+    def _put_many(self, items: Iterable[T]) -> None:
+        for item in items:
+            self._put(item)
+
+    def _put_costed(self, item: T, cost: Cost) -> None:
+        self._queue.append(item)
+        self._costs.append(cost)
+        self._total += cost
+
+    def _item_cost(self, item: T) -> Cost:
+        cost = self._cost(item)
+        if cost < 0:
+            raise ValueError("cost must be >= 0")
+        return cost
+
+    def _fits(self, cost: Cost) -> bool:
+        return self._maxsize == 0 or not self._queue or self._total + cost <= self._maxsize
+
+    def _wakeup_next(self, waiters: _Waiters) -> None:
+        if waiters is self._putters:
+            self._wakeup_putters()
+        else:
+            super()._wakeup_next(waiters)
+
+    def _wakeup_many(self, waiters: _Waiters, count: int) -> None:
+        if waiters is self._putters:
+            self._wakeup_putters()
+        else:
+            super()._wakeup_many(waiters, count)
+
+    def _wakeup_putters(self) -> None:
+        # Wake up every waiting putter whose item fits into the room that
+        # is left, keeping count of the room claimed by earlier ones.
+        # (Putters only wait when maxsize > 0.)
+        total = self._total
+        empty = not self._queue
+        woken = []
+        for putter, cost in self._putters.items():
+            if total >= self._maxsize:
+                break
+            if putter.done():
+                woken.append(putter)
+            elif empty or total + cost <= self._maxsize:
+                putter.set_result(None)
+                woken.append(putter)
+                total += cost
+                empty = False
+        for putter in woken:
+            self._putters.discard(putter)
+
+    async def _wait_room(self, cost: Cost, deadline: Optional[float]) -> None:
+        # Wait until there is room for cost, behind the putters already
+        # waiting. If the channel is closed, raise ChannelClosed.
+        if self._putters and not self._closed:
+            await self._wait_turn(cost, deadline)
+        while not self._fits(cost):
+            if self._closed:
+                raise ChannelClosed
+            await self._wait_turn(cost, deadline)
+        if self._closed:
+            raise ChannelClosed
+
+    async def _wait_turn(self, cost: Cost, deadline: Optional[float]) -> None:
+        try:
+            await self._wait_put(deadline, cost)
+        except BaseException:
+            # the putters held up behind this one may fit now
+            self._wakeup_putters()
+            raise
+
+    def total_cost(self) -> Cost:
+        """Summed cost of the items in the channel buffer."""
+        return self._total
+
+    def full(self) -> bool:
+        """Return True if the cost of the items in the channel adds up
+        to maxsize (or more).
+        Note: if the Channel was initialized with maxsize=0 (the default),
+        then full() is never True.
+        """
+        return 0 < self._maxsize <= self._total
+
+    async def put(
+        self, item: T, *, timeout: Optional[float] = None, deadline: Optional[float] = None
+    ) -> None:
+        """Put an item into the channel.
+        If the channel doesn't have room for the cost of item, wait until
+        it does before adding item.
+        If the channel is closed or closing, raise ChannelClosed.
+        If timeout (in seconds) or deadline (in event loop time, see
+        loop.time()) is given and passes before there is room, raise
+        ChannelTimeout. If both are given, the earliest one applies.
+        This method is a coroutine.
+        """
+        cost = self._item_cost(item)
+        if timeout is not None:
+            deadline = _earliest(self._loop.time() + timeout, deadline)
+        await self._wait_room(cost, deadline)
+        self._put_costed(item, cost)
+        if self._getters:
+            self._wakeup_next(self._getters)
+
+    def put_nowait(self, item: T) -> None:
+        """Put an item into the channel without blocking.
+        If the channel doesn't have room for the cost of item, raise
+        ChannelFull.
+        """
+        cost = self._item_cost(item)
+        if self._putters or not self._fits(cost):
+            raise ChannelFull
+        if self._closed:
+            raise ChannelClosed
+        self._put_costed(item, cost)
+        if self._getters:
+            self._wakeup_next(self._getters)
+
+    async def put_many(self, items: Iterable[T]) -> None:
+        """Put all items into the channel, in order.
+        Items are added as long as they fit. When one doesn't, wait for
+        room before adding it and the rest.
+        If the channel is closed or closing, raise ChannelClosed. Items
+        added before that point stay in the channel.
+        This method is a coroutine.
+        """
+        count = 0
+        for item in items:
+            cost = self._item_cost(item)
+            if self._putters or not self._fits(cost) or self._closed:
+                self._wakeup_many(self._getters, count)
+                count = 0
+                await self._wait_room(cost, None)
+            self._put_costed(item, cost)
+            count += 1
+        self._wakeup_many(self._getters, count)
+
+    def put_nowait_many(self, items: Iterable[T]) -> None:
+        """Put all items into the channel without blocking.
+        If the items don't all fit, one after the other (that is, if
+        put_many() would have to wait), raise ChannelFull and add none of
+        them. Only the first item may go over maxsize, into an empty channel.
+        """
+        pending = [(item, self._item_cost(item)) for item in items]
+        if self._putters:
+            raise ChannelFull
+        if self._maxsize > 0:
+            total = self._total
+            empty = not self._queue
+            for _, cost in pending:
+                if not empty and total + cost > self._maxsize:
+                    raise ChannelFull
+                total += cost
+                empty = False
+        if self._closed:
+            raise ChannelClosed
+        for item, cost in pending:
+            self._put_costed(item, cost)
+        self._wakeup_many(self._getters, len(pending))
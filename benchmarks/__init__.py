@@ -0,0 +1,5 @@
+"""
+Benchmark suite for aiochannel.
+
+Run with ``python -m benchmarks --help`` from the repository root.
+"""
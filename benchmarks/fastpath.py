@@ -0,0 +1,55 @@
+"""
+Micro-benchmark for the uncontended put()/get() path.
+
+Compares Channel against asyncio.Queue when put() always has room and
+get() always has an item buffered, i.e. when neither call has to wait.
+InstrumentedChannel shows what keeping metrics costs on this path.
+
+    python benchmarks/fastpath.py [ROUNDS]
+"""
+import asyncio
+import sys
+from time import perf_counter
+
+from aiochannel import Channel, InstrumentedChannel
+
+ROUNDS = 200_000
+REPEAT = 5
+
+
+async def put_get(queue, rounds: int) -> float:
+    put = queue.put
+    get = queue.get
+    start = perf_counter()
+    for i in range(rounds):
+        await put(i)
+        await get()
+    return (perf_counter() - start) / rounds
+
+
+async def put_nowait_get_nowait(queue, rounds: int) -> float:
+    put = queue.put_nowait
+    get = queue.get_nowait
+    start = perf_counter()
+    for i in range(rounds):
+        put(i)
+        get()
+    return (perf_counter() - start) / rounds
+
+
+async def main(rounds: int) -> None:
+    factories = [
+        ("Channel()", Channel),
+        ("Channel(100)", lambda: Channel(100)),
+        ("InstrumentedChannel()", InstrumentedChannel),
+        ("asyncio.Queue()", asyncio.Queue),
+        ("asyncio.Queue(100)", lambda: asyncio.Queue(100)),
+    ]
+    for bench in (put_get, put_nowait_get_nowait):
+        for name, factory in factories:
+            best = min([await bench(factory(), rounds) for _ in range(REPEAT)])
+            print("{:<24} {:<22} {:8.1f} ns/op".format(bench.__name__, name, best * 1e9))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else ROUNDS))
@@ -0,0 +1,274 @@
+"""
+Benchmark scenarios.
+
+Every scenario is a coroutine function taking a queue factory (a callable
+returning a new, empty queue for a given maxsize) and a scale factor, and
+returning a dict of measurements. Scenarios that depend on Channel-only
+APIs (such as close()) only run against Channel implementations.
+"""
+import asyncio
+import gc
+import tracemalloc
+from functools import partial
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, List
+
+from aiochannel import Channel, ChannelClosed, InstrumentedChannel, TypedChannel
+
+Factory = Callable[[int], Any]
+Scenario = Callable[[Factory, int], Awaitable[Dict[str, Any]]]
+
+BOUNDED = 1024
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+async def _produce(queue: Any, count: int) -> None:
+    put = queue.put
+    for i in range(count):
+        await put(i)
+
+
+async def _consume(queue: Any, count: int) -> None:
+    get = queue.get
+    for _ in range(count):
+        await get()
+
+
+async def _throughput(
+    factory: Factory, maxsize: int, producers: int, consumers: int, items: int
+) -> Dict[str, Any]:
+    queue = factory(maxsize)
+    per_producer = items // producers
+    per_consumer = items // consumers
+    total = per_producer * producers
+    # hand any remainder to the first consumer so that the counts line up
+    first_consumer = per_consumer + total - per_consumer * consumers
+    tasks = [_produce(queue, per_producer) for _ in range(producers)]
+    tasks.append(_consume(queue, first_consumer))
+    tasks.extend(_consume(queue, per_consumer) for _ in range(consumers - 1))
+    start = perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = perf_counter() - start
+    return {"items": total, "seconds": elapsed, "items_per_second": total / elapsed}
+
+
+def throughput(producers: int, consumers: int, maxsize: int) -> Scenario:
+    async def scenario(factory: Factory, scale: int) -> Dict[str, Any]:
+        return await _throughput(factory, maxsize, producers, consumers, 100_000 * scale)
+    return scenario
+
+
+def latency(maxsize: int) -> Scenario:
+    async def scenario(factory: Factory, scale: int) -> Dict[str, Any]:
+        queue = factory(maxsize)
+        count = 20_000 * scale
+        samples: List[float] = []
+
+        async def producer() -> None:
+            for i in range(count):
+                await queue.put(perf_counter())
+                if i % 64 == 0:
+                    # let the consumer catch up now and then, so the
+                    # measurement isn't dominated by buffer depth
+                    await asyncio.sleep(0)
+
+        async def consumer() -> None:
+            for _ in range(count):
+                sent = await queue.get()
+                samples.append(perf_counter() - sent)
+
+        await asyncio.gather(producer(), consumer())
+        return {
+            "items": count,
+            "p50_us": _percentile(samples, 50) * 1e6,
+            "p99_us": _percentile(samples, 99) * 1e6,
+            "max_us": max(samples) * 1e6,
+        }
+    return scenario
+
+
+async def many_getters(factory: Factory, scale: int) -> Dict[str, Any]:
+    """The issue #13 scenario: many idle workers, few items, then close."""
+    channel = factory(0)
+    workers = 10_000 * scale
+
+    async def worker() -> None:
+        async for _ in channel:
+            pass
+
+    start = perf_counter()
+    tasks = [asyncio.ensure_future(worker()) for _ in range(workers)]
+    await asyncio.sleep(0)
+    parked = perf_counter()
+    for i in range(workers // 10):
+        await channel.put(i)
+    channel.close()
+    closed = perf_counter()
+    await asyncio.gather(*tasks)
+    done = perf_counter()
+    return {
+        "workers": workers,
+        "park_seconds": parked - start,
+        "close_seconds": done - parked,
+        "close_call_seconds": closed - parked,
+    }
+
+
+async def close_drain(factory: Factory, scale: int) -> Dict[str, Any]:
+    channel = factory(0)
+    count = 100_000 * scale
+    for i in range(count):
+        channel.put_nowait(i)
+    start = perf_counter()
+    channel.close()
+    closed = perf_counter()
+    drained = 0
+    while True:
+        try:
+            channel.get_nowait()
+        except ChannelClosed:
+            break
+        drained += 1
+    await channel.join()
+    done = perf_counter()
+    return {
+        "items": drained,
+        "close_seconds": closed - start,
+        "drain_seconds": done - closed,
+    }
+
+
+async def close_waiters(factory: Factory, scale: int) -> Dict[str, Any]:
+    channel = factory(0)
+    waiters = 10_000 * scale
+    tasks = [asyncio.ensure_future(channel.get()) for _ in range(waiters)]
+    await asyncio.sleep(0)
+    start = perf_counter()
+    channel.close()
+    closed = perf_counter()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    done = perf_counter()
+    return {
+        "waiters": waiters,
+        "close_call_seconds": closed - start,
+        "wakeup_seconds": done - closed,
+    }
+
+
+async def timeout_churn(factory: Factory, scale: int) -> Dict[str, Any]:
+    """Many consumers repeatedly giving up on get() through wait_for()."""
+    queue = factory(0)
+    consumers = 1_000 * scale
+    rounds = 20
+    # keep a crowd of long-lived getters parked, so that every timed-out
+    # getter has to be found and removed among them
+    parked = [asyncio.ensure_future(queue.get()) for _ in range(10_000 * scale)]
+    await asyncio.sleep(0)
+    start = perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(
+            *[asyncio.wait_for(queue.get(), 0.0001) for _ in range(consumers)],
+            return_exceptions=True
+        )
+    elapsed = perf_counter() - start
+    # waiters still queued beyond the parked ones are dead weight
+    leftover = len(queue._getters) - len(parked)
+    for task in parked:
+        task.cancel()
+    await asyncio.gather(*parked, return_exceptions=True)
+    return {"timeouts": consumers * rounds, "seconds": elapsed,
+            "timeouts_per_second": consumers * rounds / elapsed,
+            "leftover_waiters": leftover}
+
+
+async def timeout_churn_native(factory: Factory, scale: int) -> Dict[str, Any]:
+    """Same as timeout_churn, using get(timeout=...) instead of wait_for()."""
+    channel = factory(0)
+    consumers = 1_000 * scale
+    rounds = 20
+    parked = [asyncio.ensure_future(channel.get()) for _ in range(10_000 * scale)]
+    await asyncio.sleep(0)
+    start = perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(
+            *[channel.get(timeout=0.0001) for _ in range(consumers)],
+            return_exceptions=True
+        )
+    elapsed = perf_counter() - start
+    leftover = len(channel._getters) - len(parked)
+    for task in parked:
+        task.cancel()
+    await asyncio.gather(*parked, return_exceptions=True)
+    return {"timeouts": consumers * rounds, "seconds": elapsed,
+            "timeouts_per_second": consumers * rounds / elapsed,
+            "leftover_waiters": leftover}
+
+
+async def memory_per_item(factory: Factory, scale: int) -> Dict[str, Any]:
+    count = 100_000 * scale
+    # allocate the items up-front so that only the queue's own overhead is measured
+    items = list(range(count))
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        queue = factory(0)
+        for item in items:
+            queue.put_nowait(item)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return {"items": count, "bytes_per_item": (after - before) / count}
+
+
+async def memory_per_float(factory: Factory, scale: int) -> Dict[str, Any]:
+    """Like memory_per_item, but counting the items too: every float is
+    created as it is put, and kept alive only by the queue."""
+    count = 100_000 * scale
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        queue = factory(0)
+        for i in range(count):
+            queue.put_nowait(i * 0.5)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return {"items": count, "bytes_per_item": (after - before) / count}
+
+
+# name -> (scenario, uses Channel-only APIs)
+SCENARIOS: Dict[str, Any] = {
+    "spsc_unbounded": (throughput(1, 1, 0), False),
+    "spsc_bounded": (throughput(1, 1, BOUNDED), False),
+    "mpsc_unbounded": (throughput(8, 1, 0), False),
+    "mpsc_bounded": (throughput(8, 1, BOUNDED), False),
+    "mpmc_unbounded": (throughput(8, 8, 0), False),
+    "mpmc_bounded": (throughput(8, 8, BOUNDED), False),
+    "latency_unbounded": (latency(0), False),
+    "latency_bounded": (latency(BOUNDED), False),
+    "many_getters": (many_getters, True),
+    "close_drain": (close_drain, True),
+    "close_waiters": (close_waiters, True),
+    "timeout_churn": (timeout_churn, False),
+    "timeout_churn_native": (timeout_churn_native, True),
+    "memory_per_item": (memory_per_item, False),
+    "memory_per_float": (memory_per_float, False),
+}
+
+IMPLEMENTATIONS: Dict[str, Factory] = {
+    "Channel": Channel,
+    # the cost of metrics; Channel itself doesn't keep any
+    "InstrumentedChannel": InstrumentedChannel,
+    # items packed as doubles, instead of as objects
+    "TypedChannel": partial(TypedChannel, "d"),
+    "asyncio.Queue": asyncio.Queue,
+}
+
+CHANNEL_ONLY = {"Channel", "InstrumentedChannel", "TypedChannel"}
@@ -0,0 +1,259 @@
+import aiounittest
+import asyncio
+from aiochannel import AckChannel, ChannelClosed, ChannelEmpty, ChannelTimeout, LeaseExpired
+
+
+class AckChannelTest(aiounittest.AsyncTestCase):
+    async def test_construct(self):
+        channel = AckChannel()
+        self.assertEqual(0, channel.leased())
+        self.assertIn("leased=0", repr(channel))
+        with self.assertRaises(ValueError):
+            AckChannel(lease_timeout=0)
+
+    async def test_ack(self):
+        channel = AckChannel()
+        channel.put_nowait("a")
+        lease = await channel.get_lease()
+        self.assertEqual("a", lease.item)
+        self.assertIsNone(lease.deadline)
+        self.assertIn("item='a'", repr(lease))
+        self.assertTrue(channel.empty())
+        self.assertEqual(1, channel.leased())
+        self.assertTrue(lease.active())
+        lease.extend()
+        self.assertIsNone(lease.deadline)
+        lease.ack()
+        self.assertFalse(lease.active())
+        self.assertEqual(0, channel.leased())
+        with self.assertRaises(LeaseExpired):
+            lease.ack()
+        with self.assertRaises(LeaseExpired):
+            lease.nack()
+        with self.assertRaises(LeaseExpired):
+            lease.extend()
+
+    async def test_plain_get_methods(self):
+        channel = AckChannel(lease_timeout=10)
+        channel.put_nowait_many([1, 2, 3, 4])
+        # items, done with as soon as they are taken
+        self.assertEqual(1, await channel.get())
+        self.assertEqual([2, 3], channel.get_nowait_many(2))
+        self.assertEqual(0, channel.leased())
+        lease = channel.get_lease_nowait()
+        channel.close()
+        # getters keep waiting while the lease is out
+        with self.assertRaises(ChannelEmpty):
+            channel.get_nowait()
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        lease.nack()
+        self.assertEqual(4, await getter)
+        await asyncio.wait_for(channel.join(), 1)
+        self.assertEqual([], [item async for item in channel])
+
+    async def test_nack_requeues_to_head(self):
+        channel = AckChannel()
+        channel.put_nowait_many([1, 2, 3])
+        lease = channel.get_lease_nowait()
+        channel.nack(lease)
+        self.assertEqual([1, 2, 3], list(channel))
+        leases = channel.get_lease_nowait_many(2)
+        self.assertEqual([1, 2], [lease.item for lease in leases])
+        for lease in leases:
+            lease.nack()
+        self.assertEqual([2, 1, 3], list(channel))
+
+    async def test_nack_wakes_getter(self):
+        channel = AckChannel()
+        channel.put_nowait(1)
+        lease = channel.get_lease_nowait()
+        getter = asyncio.ensure_future(channel.get_lease())
+        await asyncio.sleep(0)
+        lease.nack()
+        self.assertEqual(1, (await getter).item)
+
+    async def test_lease_timeout(self):
+        channel = AckChannel(lease_timeout=0.2)
+        channel.put_nowait_many([1, 2, 3])
+        first = channel.get_lease_nowait()
+        self.assertIsNotNone(first.deadline)
+        await asyncio.sleep(0.1)
+        second, third = channel.get_lease_nowait_many(2)
+        second.ack()
+        await asyncio.sleep(0.15)
+        # first ran out, third not yet
+        self.assertFalse(first.active())
+        self.assertTrue(third.active())
+        self.assertEqual([1], list(channel))
+        with self.assertRaises(LeaseExpired):
+            first.ack()
+        third.extend()
+        redelivered = await channel.get_lease(timeout=1)
+        self.assertEqual(1, redelivered.item)
+        redelivered.ack()
+        await asyncio.sleep(0.3)
+        self.assertEqual([3], list(channel))
+        self.assertEqual(0, channel.leased())
+
+    async def test_get_nowait(self):
+        channel = AckChannel()
+        with self.assertRaises(ChannelEmpty):
+            channel.get_lease_nowait()
+        with self.assertRaises(ChannelEmpty):
+            channel.get_lease_nowait_many(2)
+        with self.assertRaises(ValueError):
+            channel.get_lease_nowait_many(0)
+        with self.assertRaises(ChannelTimeout):
+            await channel.get_lease(timeout=0.01)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            channel.get_lease_nowait()
+        with self.assertRaises(ChannelClosed):
+            channel.get_lease_nowait_many(2)
+        with self.assertRaises(ChannelClosed):
+            await channel.get_lease()
+
+    async def test_wakes_putter(self):
+        channel = AckChannel(1)
+        channel.put_nowait(1)
+        putter = asyncio.ensure_future(channel.put(2))
+        await asyncio.sleep(0)
+        channel.get_lease_nowait()
+        await putter
+        putter = asyncio.ensure_future(channel.put(3))
+        await asyncio.sleep(0)
+        self.assertEqual(2, (await channel.get_lease()).item)
+        await putter
+        putter = asyncio.ensure_future(channel.put(4))
+        await asyncio.sleep(0)
+        await channel.get_lease_many(1)
+        await putter
+        self.assertEqual([4], list(channel))
+        # a cancelled putter is skipped when the channel closes
+        putter = asyncio.ensure_future(channel.put(5))
+        await asyncio.sleep(0)
+        putter.cancel()
+        channel.close()
+        with self.assertRaises(asyncio.CancelledError):
+            await putter
+
+    async def test_get_many_waits(self):
+        channel = AckChannel()
+        getter = asyncio.ensure_future(channel.get_lease_many(3))
+        await asyncio.sleep(0)
+        channel.put_nowait_many([1, 2])
+        self.assertEqual([1, 2], [lease.item for lease in await getter])
+
+    async def test_close_waits_for_acks(self):
+        channel = AckChannel()
+        channel.put_nowait_many([1, 2])
+        first, second = await channel.get_lease_many(2)
+        getter = asyncio.ensure_future(channel.get_lease())
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await channel.put(3)
+        joiner = asyncio.ensure_future(channel.join())
+        first.nack()
+        redelivered = await getter
+        self.assertEqual(1, redelivered.item)
+        getter = asyncio.ensure_future(channel.get_lease())
+        batch = asyncio.ensure_future(channel.get_lease_batch(2, 1))
+        cancelled = asyncio.ensure_future(channel.get_lease())
+        await asyncio.sleep(0)
+        second.ack()
+        await asyncio.sleep(0)
+        self.assertFalse(getter.done())
+        self.assertFalse(joiner.done())
+        # a cancelled getter is skipped when the last lease is acked
+        cancelled.cancel()
+        redelivered.ack()
+        with self.assertRaises(ChannelClosed):
+            await getter
+        with self.assertRaises(ChannelClosed):
+            await batch
+        await joiner
+        self.assertEqual([], [lease async for lease in channel.leases()])
+
+    async def test_close_with_items_left(self):
+        channel = AckChannel(1)
+        channel.put_nowait(1)
+        lease = channel.get_lease_nowait()
+        channel.put_nowait(2)
+        putter = asyncio.ensure_future(channel.put(3))
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await putter
+        lease.ack()
+        items = []
+        async for lease in channel.leases():
+            items.append(lease.item)
+            lease.ack()
+        self.assertEqual([2], items)
+
+    async def test_close_without_drain(self):
+        channel = AckChannel()
+        channel.put_nowait_many([1, 2, 3])
+        lease = channel.get_lease_nowait()
+        channel.close(drain=False)
+        self.assertTrue(channel.empty())
+        lease.nack()
+        self.assertEqual(1, (await channel.get_lease()).item)
+
+    async def test_drain_nowait_with_leases(self):
+        channel = AckChannel()
+        channel.put_nowait_many([1, 2])
+        lease = channel.get_lease_nowait()
+        channel.close()
+        self.assertEqual([2], channel.drain_nowait())
+        # not finished while the lease is out: its item may come back
+        joiner = asyncio.ensure_future(channel.join())
+        await asyncio.sleep(0)
+        self.assertFalse(joiner.done())
+        lease.ack()
+        await asyncio.wait_for(joiner, 1)
+
+    async def test_get_batch(self):
+        channel = AckChannel()
+        with self.assertRaises(ValueError):
+            await channel.get_lease_batch(0, 1)
+        self.assertEqual([], await channel.get_lease_batch(2, 0.01))
+        channel.put_nowait_many([1, 2, 3])
+        batch = await channel.get_lease_batch(2, 1)
+        self.assertEqual([1, 2], [lease.item for lease in batch])
+
+        async def producer():
+            await asyncio.sleep(0.01)
+            channel.put_nowait(4)
+
+        batch, _ = await asyncio.gather(channel.get_lease_batch(2, 1), producer())
+        self.assertEqual([3, 4], [lease.item for lease in batch])
+        channel.close()
+        for lease in channel._leases.copy():
+            lease.ack()
+        with self.assertRaises(ChannelClosed):
+            await channel.get_lease_batch(2, 1)
+
+    async def test_get_batch_cancelled(self):
+        channel = AckChannel()
+        channel.put_nowait_many([1, 2])
+        batch = asyncio.ensure_future(channel.get_lease_batch(3, 1))
+        await asyncio.sleep(0)
+        self.assertEqual(2, channel.leased())
+        batch.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await batch
+        # the leases taken so far are nacked, their items back in order
+        self.assertEqual(0, channel.leased())
+        self.assertEqual([1, 2], channel.get_nowait_many(3))
+        channel.put_nowait_many([1, 2])
+        batch = asyncio.ensure_future(channel.get_lease_batch(3, 1))
+        await asyncio.sleep(0)
+        # a lease let go of meanwhile isn't nacked twice
+        channel.nack(list(channel._leases)[1])
+        batch.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await batch
+        self.assertEqual([1, 2], channel.get_nowait_many(3))
@@ -0,0 +1,94 @@
+import aiounittest
+import asyncio
+from aiochannel import AdaptiveBatcher, Channel, ChannelClosed
+
+
+class AdaptiveBatcherTest(aiounittest.AsyncTestCase):
+    async def test_construct(self):
+        channel = Channel()
+        batcher = AdaptiveBatcher(channel, min_size=2, max_size=8)
+        self.assertIs(channel, batcher.channel)
+        self.assertEqual(2, batcher.batch_size)
+        self.assertEqual(0, batcher.batches)
+        self.assertIn("batch_size=2", repr(batcher))
+        with self.assertRaises(ValueError):
+            AdaptiveBatcher(channel, min_size=0)
+        with self.assertRaises(ValueError):
+            AdaptiveBatcher(channel, min_size=4, max_size=2)
+        with self.assertRaises(ValueError):
+            AdaptiveBatcher(channel, linger=-1)
+
+    async def test_grows_under_load(self):
+        channel = Channel()
+        channel.put_nowait_many(range(100))
+        batcher = AdaptiveBatcher(channel, max_size=16)
+        sizes = []
+        while not channel.empty():
+            sizes.append(len(await batcher.get()))
+        self.assertEqual([1, 2, 4, 8, 16, 16, 16, 16, 16, 5], sizes)
+        self.assertEqual(8, batcher.batch_size)
+        self.assertEqual(10, batcher.batches)
+
+    async def test_shrinks_when_idle(self):
+        channel = Channel()
+        channel.put_nowait_many(range(15))
+        batcher = AdaptiveBatcher(channel, max_size=8)
+        for size in (1, 2, 4, 8):
+            self.assertEqual(size, len(await batcher.get()))
+        for size in (4, 2, 1, 1):
+            channel.put_nowait(0)
+            await batcher.get()
+            self.assertEqual(size, batcher.batch_size)
+
+    async def test_steady(self):
+        channel = Channel()
+        batcher = AdaptiveBatcher(channel, min_size=4)
+        channel.put_nowait_many(range(4))
+        self.assertEqual([0, 1, 2, 3], await batcher.get())
+        self.assertEqual(4, batcher.batch_size)
+
+    async def test_linger(self):
+        channel = Channel()
+        batcher = AdaptiveBatcher(channel, min_size=3, linger=0.05)
+
+        async def producer():
+            for i in range(3):
+                await channel.put(i)
+                await asyncio.sleep(0.01)
+
+        batch, _ = await asyncio.gather(batcher.get(), producer())
+        self.assertEqual([0, 1, 2], batch)
+        channel.put_nowait(3)
+        channel.close()
+        self.assertEqual([3], await batcher.get())
+        with self.assertRaises(ChannelClosed):
+            await batcher.get()
+
+    async def test_linger_cancelled(self):
+        channel = Channel()
+        batcher = AdaptiveBatcher(channel, min_size=3, linger=1)
+        channel.put_nowait(1)
+        getter = asyncio.ensure_future(batcher.get())
+        await asyncio.sleep(0)
+        channel.put_nowait(2)
+        await asyncio.sleep(0)
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        self.assertEqual([1, 2], list(channel))
+
+    async def test_async_iteration(self):
+        channel = Channel(10)
+
+        async def producer():
+            await channel.put_many(range(50))
+            channel.close()
+
+        batches = []
+
+        async def consumer():
+            async for batch in AdaptiveBatcher(channel, max_size=4):
+                batches.append(batch)
+
+        await asyncio.gather(producer(), consumer())
+        self.assertEqual(list(range(50)), [item for batch in batches for item in batch])
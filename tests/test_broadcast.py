@@ -0,0 +1,345 @@
+import aiounittest
+import asyncio
+from aiochannel import BroadcastChannel, ChannelClosed, ChannelEmpty, ChannelFull, ChannelTimeout
+
+
+class BroadcastChannelTest(aiounittest.AsyncTestCase):
+    async def test_construct(self):
+        channel = BroadcastChannel(10)
+        self.assertEqual(10, channel.maxsize)
+        self.assertEqual(0, channel.subscribers)
+        self.assertTrue(channel.empty())
+        self.assertFalse(channel.full())
+        self.assertFalse(channel.closed())
+        self.assertEqual(
+            "<BroadcastChannel at {:#x} maxsize=10 qsize=0 subscribers=0>".format(id(channel)),
+            repr(channel))
+        self.assertEqual("<BroadcastChannel maxsize=10 qsize=0 subscribers=0>", str(channel))
+        with self.assertRaises(TypeError):
+            BroadcastChannel(-1)
+        with self.assertRaises(ValueError):
+            BroadcastChannel(1, overflow="lag")
+
+    async def test_every_subscriber_gets_every_item(self):
+        channel = BroadcastChannel()
+        subscriptions = [channel.subscribe() for _ in range(3)]
+        self.assertEqual(3, channel.subscribers)
+        for i in range(5):
+            await channel.put(i)
+        # stored once
+        self.assertEqual(5, channel.qsize())
+        for subscription in subscriptions:
+            self.assertIs(channel, subscription.channel)
+            self.assertEqual(5, subscription.qsize())
+            self.assertEqual(list(range(5)), [subscription.get_nowait() for _ in range(5)])
+            with self.assertRaises(ChannelEmpty):
+                subscription.get_nowait()
+        self.assertTrue(channel.empty())
+
+    async def test_items_before_subscribing_are_not_seen(self):
+        channel = BroadcastChannel()
+        channel.put_nowait("nobody listens")
+        self.assertTrue(channel.empty())
+        first = channel.subscribe()
+        channel.put_nowait(1)
+        second = channel.subscribe()
+        channel.put_nowait(2)
+        self.assertEqual([1, 2], [first.get_nowait(), first.get_nowait()])
+        self.assertEqual(2, second.get_nowait())
+        self.assertTrue(channel.empty())
+
+    async def test_buffer_kept_until_slowest_reads(self):
+        channel = BroadcastChannel()
+        fast, slow = channel.subscribe(), channel.subscribe()
+        channel.put_nowait(1)
+        channel.put_nowait(2)
+        fast.get_nowait()
+        fast.get_nowait()
+        self.assertEqual(2, channel.qsize())
+        self.assertEqual(0, fast.qsize())
+        self.assertEqual(2, slow.qsize())
+        slow.get_nowait()
+        self.assertEqual(1, channel.qsize())
+
+    async def test_backpressure_from_slowest(self):
+        channel = BroadcastChannel(2)
+        fast, slow = channel.subscribe(), channel.subscribe()
+        await channel.put(1)
+        await channel.put(2)
+        self.assertTrue(channel.full())
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait(3)
+        putter = asyncio.ensure_future(channel.put(3))
+        await asyncio.sleep(0)
+        self.assertEqual([1, 2], [fast.get_nowait(), fast.get_nowait()])
+        await asyncio.sleep(0)
+        self.assertFalse(putter.done())
+        slow.get_nowait()
+        await putter
+        self.assertEqual([2, 3], [slow.get_nowait(), slow.get_nowait()])
+        channel.put_nowait(4)  # fast hasn't read 3 yet
+        with self.assertRaises(ChannelTimeout):
+            await channel.put(5, timeout=0.01)
+
+    async def test_putter_cancelled_after_wakeup(self):
+        channel = BroadcastChannel(1)
+        subscription = channel.subscribe()
+        channel.put_nowait(1)
+        first = asyncio.ensure_future(channel.put(2))
+        second = asyncio.ensure_future(channel.put(3))
+        await asyncio.sleep(0)
+        subscription.get_nowait()
+        first.cancel()
+        await second
+        self.assertEqual(3, subscription.get_nowait())
+
+    async def test_putter_cancelled_after_wakeup_when_full_again(self):
+        channel = BroadcastChannel(1)
+        subscription = channel.subscribe()
+        channel.put_nowait(1)
+        first = asyncio.ensure_future(channel.put(2))
+        second = asyncio.ensure_future(channel.put(3))
+        await asyncio.sleep(0)
+        subscription.get_nowait()
+        # the room is taken before the woken putter gets to run
+        channel.put_nowait(4)
+        first.cancel()
+        await asyncio.sleep(0)
+        self.assertFalse(second.done())
+        self.assertEqual(4, subscription.get_nowait())
+        await asyncio.wait_for(second, 1)
+        self.assertEqual(3, subscription.get_nowait())
+
+    async def test_woken_putter_cancelled_skips_cancelled_putter(self):
+        channel = BroadcastChannel(1)
+        subscription = channel.subscribe()
+        channel.put_nowait(1)
+        first = asyncio.ensure_future(channel.put(2))
+        second = asyncio.ensure_future(channel.put(3))
+        await asyncio.sleep(0)
+        subscription.get_nowait()  # wakes first
+        first.cancel()
+        # cancelled, but not yet taken out of the waiters
+        next(iter(channel._putters)).cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        self.assertFalse(channel._putters)
+        self.assertTrue(channel.empty())
+
+    async def test_cancelled_waiters_are_skipped(self):
+        channel = BroadcastChannel(1)
+        subscription = channel.subscribe()
+        channel.put_nowait(1)
+        putters = [asyncio.ensure_future(channel.put(i)) for i in (2, 3)]
+        await asyncio.sleep(0)
+        # cancelled, but not yet taken out of the waiters
+        next(iter(channel._putters)).cancel()
+        subscription.get_nowait()
+        await putters[1]
+        with self.assertRaises(asyncio.CancelledError):
+            await putters[0]
+        self.assertEqual(3, subscription.get_nowait())
+        getter = asyncio.ensure_future(subscription.get())
+        await asyncio.sleep(0)
+        next(iter(subscription._getters)).cancel()
+        channel.put_nowait(4)
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        self.assertEqual(4, subscription.get_nowait())
+
+    async def test_close_skips_cancelled_waiters(self):
+        channel = BroadcastChannel(1)
+        slow = channel.subscribe()
+        channel.put_nowait(1)
+        idle = channel.subscribe()
+        getter = asyncio.ensure_future(idle.get())
+        putter = asyncio.ensure_future(channel.put(2))
+        await asyncio.sleep(0)
+        next(iter(channel._putters)).cancel()
+        next(iter(idle._getters)).cancel()
+        channel.close()
+        results = await asyncio.gather(getter, putter, return_exceptions=True)
+        self.assertTrue(all(isinstance(r, asyncio.CancelledError) for r in results))
+        self.assertEqual(1, slow.get_nowait())
+
+    async def test_cancel_waiting(self):
+        channel = BroadcastChannel(1)
+        subscription = channel.subscribe()
+        getter = asyncio.ensure_future(subscription.get())
+        await asyncio.sleep(0)
+        getter.cancel()
+        await asyncio.gather(getter, return_exceptions=True)
+        channel.put_nowait(1)
+        putter = asyncio.ensure_future(channel.put(2))
+        await asyncio.sleep(0)
+        putter.cancel()
+        await asyncio.gather(putter, return_exceptions=True)
+        self.assertFalse(channel._putters or subscription._getters)
+
+    async def test_close_empty(self):
+        channel = BroadcastChannel()
+        subscription = channel.subscribe()
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait(1)
+        with self.assertRaises(ChannelClosed):
+            await channel.put(1)
+        await asyncio.wait_for(channel.join(), timeout=1)
+        await asyncio.wait_for(subscription.join(), timeout=1)
+
+    async def test_drop_oldest_lags_slow_subscribers(self):
+        channel = BroadcastChannel(2, overflow="drop_oldest")
+        fast, slow = channel.subscribe(), channel.subscribe()
+        for i in range(5):
+            await channel.put(i)
+            self.assertEqual(i, fast.get_nowait())
+        channel.put_nowait(5)
+        self.assertEqual(4, channel.dropped)
+        self.assertEqual(2, slow.qsize())
+        self.assertEqual([4, 5], [slow.get_nowait(), slow.get_nowait()])
+        self.assertEqual(4, slow.lagged)
+        self.assertEqual(0, fast.lagged)
+
+    async def test_drop_newest(self):
+        channel = BroadcastChannel(1, overflow="drop_newest")
+        subscription = channel.subscribe()
+        channel.put_nowait(1)
+        channel.put_nowait(2)
+        await channel.put(3)
+        self.assertEqual(2, channel.dropped)
+        self.assertEqual(1, subscription.get_nowait())
+        self.assertTrue(subscription.empty())
+
+    async def test_get_waits(self):
+        channel = BroadcastChannel()
+        subscriptions = [channel.subscribe() for _ in range(3)]
+        getters = [asyncio.ensure_future(s.get()) for s in subscriptions]
+        await asyncio.sleep(0)
+        channel.put_nowait("hello")
+        self.assertEqual(["hello"] * 3, await asyncio.gather(*getters))
+        with self.assertRaises(ChannelTimeout):
+            await subscriptions[0].get(timeout=0.01)
+
+    async def test_getter_cancelled_after_wakeup(self):
+        channel = BroadcastChannel()
+        subscription = channel.subscribe()
+        first = asyncio.ensure_future(subscription.get())
+        second = asyncio.ensure_future(subscription.get())
+        await asyncio.sleep(0)
+        channel.put_nowait(1)
+        first.cancel()
+        self.assertEqual(1, await second)
+
+    async def test_getter_cancelled_after_wakeup_when_empty_again(self):
+        channel = BroadcastChannel()
+        subscription = channel.subscribe()
+        first = asyncio.ensure_future(subscription.get())
+        second = asyncio.ensure_future(subscription.get())
+        await asyncio.sleep(0)
+        channel.put_nowait(1)
+        # the item is read before the woken getter gets to run
+        self.assertEqual(1, subscription.get_nowait())
+        first.cancel()
+        await asyncio.sleep(0)
+        self.assertFalse(second.done())
+        channel.put_nowait(2)
+        self.assertEqual(2, await asyncio.wait_for(second, 1))
+
+    async def test_unsubscribe(self):
+        channel = BroadcastChannel(2)
+        gone, staying = channel.subscribe(), channel.subscribe()
+        getter = asyncio.ensure_future(gone.get())
+        await asyncio.sleep(0)
+        channel.put_nowait(1)
+        channel.put_nowait(2)
+        self.assertEqual(1, await getter)
+        putter = asyncio.ensure_future(channel.put(3))
+        await asyncio.sleep(0)
+        self.assertEqual(1, staying.get_nowait())
+        gone.close()
+        gone.close()
+        self.assertTrue(gone.closed())
+        self.assertEqual(1, channel.subscribers)
+        await putter
+        self.assertEqual([2, 3], [staying.get_nowait(), staying.get_nowait()])
+        self.assertTrue(channel.empty())
+        with self.assertRaises(ChannelClosed):
+            gone.get_nowait()
+        with self.assertRaises(ChannelClosed):
+            await gone.get()
+        await asyncio.wait_for(gone.join(), timeout=1)
+
+    async def test_close(self):
+        channel = BroadcastChannel(1)
+        drained, behind = channel.subscribe(), channel.subscribe()
+        channel.put_nowait(1)
+        putter = asyncio.ensure_future(channel.put(2))
+        drained_getter = asyncio.ensure_future(drained.get())
+        await asyncio.sleep(0)
+        self.assertEqual(1, await drained_getter)
+        waiting = [asyncio.ensure_future(drained.get()) for _ in range(2)]
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await putter
+        for getter in waiting:
+            with self.assertRaises(ChannelClosed):
+                await getter
+        with self.assertRaises(ChannelClosed):
+            await channel.put(3)
+        with self.assertRaises(ChannelClosed):
+            channel.subscribe()
+        self.assertTrue(channel.closed())
+        await asyncio.wait_for(drained.join(), timeout=1)
+        self.assertFalse(channel._finished.is_set())
+        self.assertEqual([1], [item async for item in behind])
+        await asyncio.wait_for(behind.join(), timeout=1)
+        await asyncio.wait_for(channel.join(), timeout=1)
+
+    async def test_close_full(self):
+        channel = BroadcastChannel(1, overflow="drop_oldest")
+        subscription = channel.subscribe()
+        channel.put_nowait(1)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait(2)
+        with self.assertRaises(ChannelClosed):
+            await channel.put(2)
+        getter = asyncio.ensure_future(subscription.get())
+        self.assertEqual(1, await getter)
+
+    async def test_close_wakes_getters_with_items(self):
+        channel = BroadcastChannel()
+        subscription = channel.subscribe()
+        getters = [asyncio.ensure_future(subscription.get()) for _ in range(2)]
+        await asyncio.sleep(0)
+        # queued items, but not woken up yet
+        channel._buffer.append("x")
+        channel._readers.append(1)
+        channel.close()
+        results = await asyncio.gather(*getters, return_exceptions=True)
+        self.assertEqual("x", results[0])
+        self.assertIsInstance(results[1], ChannelClosed)
+
+    async def test_fan_out(self):
+        channel = BroadcastChannel(8)
+        subscriptions = [channel.subscribe() for _ in range(4)]
+
+        async def producer():
+            for i in range(100):
+                await channel.put(i)
+            channel.close()
+
+        async def consumer(subscription, delay):
+            items = []
+            async for item in subscription:
+                items.append(item)
+                await asyncio.sleep(delay)
+            return items
+
+        results = await asyncio.gather(
+            *(consumer(s, 0 if n else 0.0001) for n, s in enumerate(subscriptions)), producer())
+        for items in results[:-1]:
+            self.assertEqual(list(range(100)), items)
+        await asyncio.wait_for(channel.join(), timeout=1)
+        self.assertEqual("<Subscription at {:#x} qsize=0>".format(id(subscriptions[0])),
+                         repr(subscriptions[0]))
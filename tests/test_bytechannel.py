@@ -0,0 +1,176 @@
+import aiounittest
+import asyncio
+from aiochannel import ByteChannel, ChannelClosed, ChannelFull
+
+
+class ByteChannelTest(aiounittest.AsyncTestCase):
+    async def test_get_returns_views_without_copying(self):
+        channel = ByteChannel()
+        data = bytearray(b"hello")
+        await channel.put(data)
+        view = await channel.get()
+        self.assertIsInstance(view, memoryview)
+        data[0] = ord("j")
+        self.assertEqual(b"jello", view.tobytes())
+
+    async def test_capacity_is_in_bytes(self):
+        channel = ByteChannel(10)
+        channel.put_nowait(b"12345")
+        self.assertFalse(channel.full())
+        channel.put_nowait(b"123456")  # goes over by one item
+        self.assertTrue(channel.full())
+        self.assertEqual(11, channel.nbytes())
+        self.assertEqual(2, channel.qsize())
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait(b"1")
+        self.assertEqual(b"12345", bytes(channel.get_nowait()))
+        self.assertEqual(6, channel.nbytes())
+        self.assertFalse(channel.full())
+
+    async def test_non_byte_formats_count_bytes(self):
+        channel = ByteChannel()
+        channel.put_nowait(memoryview(bytearray(8)).cast("I"))
+        self.assertEqual(8, channel.nbytes())
+        self.assertEqual(8, len(channel.get_nowait()))
+
+    async def test_blocked_putters_wake_while_there_is_room(self):
+        channel = ByteChannel(10)
+        channel.put_nowait(b"x" * 10)
+        putters = [asyncio.ensure_future(channel.put(b"y")) for _ in range(3)]
+        await asyncio.sleep(0)
+        self.assertEqual(3, len(channel._putters))
+        await channel.read(10)
+        await asyncio.gather(*putters)
+        self.assertEqual(3, channel.nbytes())
+
+    async def test_read(self):
+        channel = ByteChannel()
+        channel.put_nowait_many([b"abc", b"def", b"gh"])
+        self.assertEqual(b"", await channel.read(0))
+        self.assertEqual(b"ab", await channel.read(2))
+        self.assertEqual(b"cdef", await channel.read(4))
+        self.assertEqual(b"gh", await channel.read(100))
+        channel.close()
+        self.assertEqual(b"", await channel.read(1))
+        await asyncio.wait_for(channel.join(), timeout=1)
+
+    async def test_read_waits_for_data(self):
+        channel = ByteChannel()
+        reader = asyncio.ensure_future(channel.read(10))
+        await asyncio.sleep(0)
+        channel.put_nowait(b"abc")
+        self.assertEqual(b"abc", await reader)
+
+    async def test_read_waiting_on_close(self):
+        channel = ByteChannel()
+        reader = asyncio.ensure_future(channel.read(10))
+        await asyncio.sleep(0)
+        channel.close()
+        self.assertEqual(b"", await reader)
+
+    async def test_read_to_eof(self):
+        channel = ByteChannel(4)
+
+        async def producer():
+            for chunk in (b"abc", b"defg", b"h"):
+                await channel.put(chunk)
+            channel.close()
+
+        result, _ = await asyncio.gather(channel.read(), producer())
+        self.assertEqual(b"abcdefgh", result)
+
+    async def test_read_wakes_remaining_reader(self):
+        channel = ByteChannel()
+        readers = [asyncio.ensure_future(channel.read(2)) for _ in range(2)]
+        await asyncio.sleep(0)
+        channel.put_nowait(b"abcd")
+        self.assertEqual([b"ab", b"cd"], await asyncio.gather(*readers))
+
+    async def test_readexactly(self):
+        channel = ByteChannel(4)
+
+        async def producer():
+            for chunk in (b"abc", b"defg", b"hij"):
+                await channel.put(chunk)
+
+        # more than maxsize, so it has to consume while waiting
+        result, _ = await asyncio.gather(channel.readexactly(9), producer())
+        self.assertEqual(b"abcdefghi", result)
+        self.assertEqual(b"j", bytes(channel.get_nowait()))
+
+    async def test_readexactly_incomplete(self):
+        channel = ByteChannel()
+        channel.put_nowait(b"abc")
+        reader = asyncio.ensure_future(channel.readexactly(5))
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(asyncio.IncompleteReadError) as cm:
+            await reader
+        self.assertEqual(b"abc", cm.exception.partial)
+        self.assertEqual(5, cm.exception.expected)
+
+    async def test_readexactly_closed(self):
+        channel = ByteChannel()
+        channel.put_nowait(b"abc")
+        channel.close()
+        with self.assertRaises(asyncio.IncompleteReadError) as cm:
+            await channel.readexactly(5)
+        self.assertEqual(b"abc", cm.exception.partial)
+
+    async def test_get_into(self):
+        channel = ByteChannel()
+        channel.put_nowait_many([b"abc", b"def"])
+        buffer = bytearray(4)
+        self.assertEqual(4, await channel.get_into(buffer))
+        self.assertEqual(b"abcd", buffer)
+        self.assertEqual(2, await channel.get_into(buffer))
+        self.assertEqual(b"efcd", buffer)
+        self.assertEqual(0, await channel.get_into(bytearray()))
+        channel.close()
+        self.assertEqual(0, await channel.get_into(buffer))
+
+    async def test_put_many(self):
+        channel = ByteChannel(4)
+        putter = asyncio.ensure_future(channel.put_many([b"ab", b"cd", b"ef", b"gh"]))
+        await asyncio.sleep(0)
+        self.assertFalse(putter.done())
+        self.assertEqual(2, channel.qsize())
+        self.assertEqual(b"abcd", await channel.readexactly(4))
+        await putter
+        self.assertEqual(b"efgh", await channel.readexactly(4))
+
+    async def test_put_many_closed(self):
+        channel = ByteChannel(2)
+        putter = asyncio.ensure_future(channel.put_many([b"ab", b"cd"]))
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await putter
+        with self.assertRaises(ChannelClosed):
+            await channel.put_many([b"x"])
+        self.assertEqual(b"ab", await channel.read())
+
+    async def test_put_nowait_many(self):
+        channel = ByteChannel(4)
+        channel.put_nowait_many([])
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait_many([b"abcd", b"e"])
+        self.assertEqual(0, channel.qsize())
+        channel.put_nowait_many([b"abc", b"defg"])
+        self.assertEqual(7, channel.nbytes())
+        self.assertEqual([b"abc", b"defg"], [bytes(v) for v in channel.get_nowait_many(2)])
+        self.assertEqual(0, channel.nbytes())
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait_many([b"x"])
+
+    async def test_get_batch_cancelled(self):
+        channel = ByteChannel(10)
+        channel.put_nowait_many([b"ab", b"cde"])
+        getter = asyncio.ensure_future(channel.get_batch(5, timeout=1))
+        await asyncio.sleep(0)
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        self.assertEqual(5, channel.nbytes())
+        self.assertEqual([b"ab", b"cde"], [bytes(view) for view in channel.get_nowait_many(5)])
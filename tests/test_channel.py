@@ -1,6 +1,7 @@
 import aiounittest
 import asyncio
-from aiochannel import Channel, ChannelClosed, ChannelFull, ChannelEmpty
+from aiochannel import Channel, ChannelClosed, ChannelFull, ChannelEmpty, ChannelTimeout
+from aiochannel.channel import _expire_waiter
 
 
 class ChannelTest(aiounittest.AsyncTestCase):
@@ -195,6 +196,39 @@ class ChannelTest(aiounittest.AsyncTestCase):
         with self.assertRaises(ChannelClosed):
             await channel.put("foo")
 
+    async def test_put_when_closed_and_full(self):
+        channel = Channel(1)
+        channel.put_nowait("foo")
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await channel.put("bar")
+        channel.get_nowait()
+        self.assertRaises(ChannelClosed, lambda: channel.put_nowait("bar"))
+
+    async def test_get_drains_closed_channel(self):
+        channel = Channel(2)
+        channel.put_nowait("foo")
+        channel.put_nowait("bar")
+        channel.close()
+        self.assertEqual("foo", await channel.get())
+        self.assertEqual("bar", await channel.get())
+        await asyncio.wait_for(channel.join(), timeout=1)
+        with self.assertRaises(ChannelClosed):
+            await channel.get()
+
+    async def test_get_wakes_putter(self):
+        channel = Channel(1)
+        channel.put_nowait("foo")
+        putter = asyncio.ensure_future(channel.put("bar"))
+        await asyncio.sleep(0)
+        self.assertEqual("foo", await channel.get())
+        await putter
+        putter = asyncio.ensure_future(channel.put("baz"))
+        await asyncio.sleep(0)
+        self.assertEqual("bar", channel.get_nowait())
+        await putter
+        self.assertEqual(["baz"], list(channel))
+
     async def test_double_close(self):
         channel = Channel(1)
         self.assertFalse(channel.closed())
@@ -214,7 +248,7 @@ class ChannelTest(aiounittest.AsyncTestCase):
 
         async def test_cancel():
             await asyncio.sleep(0.01)
-            channel._putters[0].cancel()
+            next(iter(channel._putters)).cancel()
 
         result = await asyncio.gather(test_put(), test_cancel(), return_exceptions=True)
         self.assertIsInstance(result[0], asyncio.CancelledError)
@@ -231,11 +265,28 @@ class ChannelTest(aiounittest.AsyncTestCase):
         async def test_cancel():
             await asyncio.sleep(0.01)
             channel._maxsize = 2  # For hitting a different code branch in Channel
-            channel._putters[0].set_exception(TypeError('random type error'))
+            next(iter(channel._putters)).set_exception(TypeError('random type error'))
 
         result = await asyncio.gather(test_put(), test_cancel(), return_exceptions=True)
         self.assertIsInstance(result[0], TypeError)
 
+    async def test_woken_putter_cancelled_when_full_again(self):
+        channel = Channel(1)
+        channel.put_nowait("foo")
+        first = asyncio.ensure_future(channel.put("bar"))
+        second = asyncio.ensure_future(channel.put("baz"))
+        await asyncio.sleep(0)
+        self.assertEqual("foo", channel.get_nowait())
+        # the slot is taken before the woken putter gets to run: no
+        # wakeup to pass on
+        channel.put_nowait("qux")
+        first.cancel()
+        await asyncio.sleep(0)
+        self.assertFalse(second.done())
+        self.assertEqual("qux", channel.get_nowait())
+        await asyncio.wait_for(second, 1)
+        self.assertEqual(["baz"], list(channel))
+
     async def test_getter_cancel(self):
         channel = Channel(1)
 
@@ -244,7 +295,7 @@ class ChannelTest(aiounittest.AsyncTestCase):
 
         async def test_cancel():
             await asyncio.sleep(0.01)
-            channel._getters[0].cancel()
+            next(iter(channel._getters)).cancel()
 
         result = await asyncio.gather(test_get(), test_cancel(), return_exceptions=True)
         self.assertIsInstance(result[0], asyncio.CancelledError)
@@ -258,7 +309,7 @@ class ChannelTest(aiounittest.AsyncTestCase):
         async def test_cancel():
             await asyncio.sleep(0.01)
             channel.empty = lambda: False  # For hitting a different code branch in Channel
-            channel._getters[0].set_exception(TypeError('random type error'))
+            next(iter(channel._getters)).set_exception(TypeError('random type error'))
 
         result = await asyncio.gather(test_get(), test_cancel(), return_exceptions=True)
 
@@ -288,3 +339,434 @@ class ChannelTest(aiounittest.AsyncTestCase):
         channel = Channel()
         [channel.put_nowait(n) for n in range(5)]
         self.assertEqual(list(range(5)), list(channel))
+
+    async def test_put_nowait_many_get_nowait_many(self):
+        channel = Channel(3)
+        channel.put_nowait_many(["a", "b"])
+        self.assertRaises(ChannelFull, lambda: channel.put_nowait_many(["c", "d"]))
+        self.assertEqual(channel.qsize(), 2)
+        channel.put_nowait_many(iter(["c"]))
+        self.assertTrue(channel.full())
+        self.assertEqual(["a", "b"], channel.get_nowait_many(2))
+        self.assertEqual(["c"], channel.get_nowait_many(10))
+        self.assertRaises(ChannelEmpty, lambda: channel.get_nowait_many(1))
+        self.assertRaises(ValueError, lambda: channel.get_nowait_many(0))
+        channel.close()
+        self.assertRaises(ChannelClosed, lambda: channel.put_nowait_many([1]))
+        self.assertRaises(ChannelClosed, lambda: channel.get_nowait_many(1))
+
+    async def test_put_nowait_many_wakes_getters(self):
+        channel = Channel()
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(3)]
+        await asyncio.sleep(0)
+        channel.put_nowait_many([1, 2])
+        await asyncio.sleep(0)
+        self.assertEqual([True, True, False], [g.done() for g in getters])
+        getters.append(asyncio.ensure_future(channel.get()))
+        await asyncio.sleep(0)
+        # the cancelled getter is still queued until its task runs, and is skipped
+        getters[2].cancel()
+        channel.put_nowait_many([3])
+        getters.pop(2)
+        self.assertEqual([1, 2, 3], sorted(await asyncio.gather(*getters)))
+
+    async def test_put_many_backpressure(self):
+        """
+            put_many fills the channel partway, then waits for free slots
+        """
+        channel = Channel(2)
+        putter = asyncio.ensure_future(channel.put_many(range(5)))
+        await asyncio.sleep(0)
+        self.assertTrue(channel.full())
+        self.assertFalse(putter.done())
+        received = []
+        while len(received) < 5:
+            received.extend(await channel.get_many(10))
+        await putter
+        self.assertEqual(list(range(5)), received)
+
+    async def test_put_many_unbounded(self):
+        channel = Channel()
+        await channel.put_many(range(100))
+        self.assertEqual(list(range(100)), await channel.get_many(100))
+        await channel.put_many([])
+        self.assertTrue(channel.empty())
+
+    async def test_put_many_closed(self):
+        channel = Channel(1)
+        putter = asyncio.ensure_future(channel.put_many([1, 2, 3]))
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await putter
+        self.assertEqual([1], list(channel))
+        with self.assertRaises(ChannelClosed):
+            await channel.put_many([4])
+
+    async def test_get_many_waits(self):
+        channel = Channel(10)
+        getter = asyncio.ensure_future(channel.get_many(5))
+        await asyncio.sleep(0)
+        self.assertFalse(getter.done())
+        channel.put_nowait_many([1, 2, 3])
+        self.assertEqual([1, 2, 3], await getter)
+
+    async def test_get_many_wakes_putters(self):
+        channel = Channel(2)
+        channel.put_nowait_many([1, 2])
+        putters = [asyncio.ensure_future(channel.put(n)) for n in (3, 4, 5)]
+        await asyncio.sleep(0)
+        self.assertEqual([1, 2], await channel.get_many(2))
+        await asyncio.sleep(0)
+        self.assertEqual([True, True, False], [p.done() for p in putters])
+        self.assertEqual([3, 4], channel.get_nowait_many(2))
+        await asyncio.gather(*putters)
+        channel.close()
+        self.assertEqual([5], await channel.get_many(2))
+        with self.assertRaises(ChannelClosed):
+            await channel.get_many(2)
+        await asyncio.wait_for(channel.join(), timeout=1)
+
+    async def test_get_batch_fills(self):
+        channel = Channel()
+
+        async def producer():
+            for n in range(5):
+                await asyncio.sleep(0)
+                channel.put_nowait(n)
+
+        batch, _ = await asyncio.gather(channel.get_batch(3, timeout=1), producer())
+        self.assertEqual([0, 1, 2], batch)
+        self.assertEqual([3, 4], await channel.get_batch(3, timeout=0.01))
+
+    async def test_get_batch_timeout(self):
+        channel = Channel()
+        self.assertEqual([], await channel.get_batch(3, timeout=0.01))
+        self.assertEqual([], await channel.get_batch(3, timeout=0))
+        self.assertEqual(0, len([g for g in channel._getters if not g.done()]))
+        with self.assertRaises(ValueError):
+            await channel.get_batch(0, timeout=0)
+
+    async def test_waiters_removed_on_timeout_churn(self):
+        """
+            Getters and putters that time out take themselves out of the
+            waiter queues, so they don't pile up under timeout churn.
+        """
+        channel = Channel(1)
+        for _ in range(10):
+            await asyncio.gather(
+                *[asyncio.wait_for(channel.get(), 0.001) for _ in range(100)],
+                return_exceptions=True
+            )
+            self.assertEqual(0, len(channel._getters))
+        channel.put_nowait("foo")
+        for _ in range(10):
+            await asyncio.gather(
+                *[asyncio.wait_for(channel.put("bar"), 0.001) for _ in range(100)],
+                return_exceptions=True
+            )
+            self.assertEqual(0, len(channel._putters))
+        self.assertEqual("foo", await channel.get())
+        await channel.put("baz")
+        self.assertEqual(["baz"], list(channel))
+
+    async def test_expire_waiter_already_done(self):
+        waiter = asyncio.get_event_loop().create_future()
+        waiter.set_result("woken")
+        _expire_waiter(waiter)
+        self.assertEqual("woken", waiter.result())
+
+    async def test_get_timeout(self):
+        channel = Channel()
+        with self.assertRaises(ChannelTimeout):
+            await channel.get(timeout=0.01)
+        self.assertEqual(0, len(channel._getters))
+        # ChannelTimeout can be caught the same way as a wait_for() timeout
+        with self.assertRaises(asyncio.TimeoutError):
+            await channel.get(timeout=0)
+        channel.put_nowait("foo")
+        self.assertEqual("foo", await channel.get(timeout=0))
+
+    async def test_get_timeout_item_arrives(self):
+        channel = Channel()
+        asyncio.get_event_loop().call_later(0.01, channel.put_nowait, "foo")
+        self.assertEqual("foo", await channel.get(timeout=1))
+        self.assertEqual(0, len(channel._getters))
+
+    async def test_get_deadline(self):
+        channel = Channel()
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        with self.assertRaises(ChannelTimeout):
+            await channel.get(deadline=start + 0.01)
+        # the earliest of timeout and deadline applies
+        with self.assertRaises(ChannelTimeout):
+            await asyncio.wait_for(channel.get(timeout=0.01, deadline=loop.time() + 10), 1)
+        with self.assertRaises(ChannelTimeout):
+            await asyncio.wait_for(channel.get(timeout=10, deadline=loop.time() + 0.01), 1)
+
+    async def test_put_timeout(self):
+        channel = Channel(1)
+        channel.put_nowait("foo")
+        with self.assertRaises(ChannelTimeout):
+            await channel.put("bar", timeout=0.01)
+        with self.assertRaises(ChannelTimeout):
+            await channel.put("bar", deadline=asyncio.get_event_loop().time())
+        self.assertEqual(0, len(channel._putters))
+        asyncio.get_event_loop().call_later(0.01, channel.get_nowait)
+        await channel.put("baz", timeout=1)
+        self.assertEqual(["baz"], list(channel))
+
+    async def test_timeout_does_not_swallow_wakeup(self):
+        """
+            A getter that times out must not eat an item meant for another getter
+        """
+        channel = Channel()
+        waiting = asyncio.ensure_future(channel.get())
+        timing_out = asyncio.ensure_future(channel.get(timeout=0.01))
+        await asyncio.sleep(0.02)
+        with self.assertRaises(ChannelTimeout):
+            await timing_out
+        channel.put_nowait("foo")
+        self.assertEqual("foo", await waiting)
+
+    async def test_get_batch_closed(self):
+        channel = Channel()
+        channel.put_nowait(1)
+        getter = asyncio.ensure_future(channel.get_batch(3, timeout=1))
+        await asyncio.sleep(0)
+        channel.close()
+        self.assertEqual([1], await getter)
+        with self.assertRaises(ChannelClosed):
+            await channel.get_batch(3, timeout=1)
+
+    async def test_get_batch_timeout_then_closed(self):
+        channel = Channel()
+        getter = asyncio.ensure_future(channel.get_batch(3, timeout=1))
+        await asyncio.sleep(0)
+        # the timer goes off, then items come in before the getter runs
+        _expire_waiter(next(iter(channel._getters)))
+        channel.put_nowait(1)
+        channel.close()
+        self.assertEqual([1], await getter)
+
+    async def test_get_batch_cancelled(self):
+        channel = Channel()
+        getter = asyncio.ensure_future(channel.get_batch(3, timeout=1))
+        await asyncio.sleep(0)
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        channel.put_nowait(1)
+        self.assertEqual(1, await channel.get())
+
+    async def test_get_batch_cancelled_keeps_items(self):
+        channel = Channel()
+        channel.put_nowait_many([1, 2])
+        getter = asyncio.ensure_future(channel.get_batch(5, timeout=1))
+        await asyncio.sleep(0)
+        self.assertTrue(channel.empty())
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        # the items it had collected go back, in order
+        channel.put_nowait(3)
+        self.assertEqual([1, 2, 3], list(channel))
+        # even if the channel closed (and was finished) meanwhile
+        getter = asyncio.ensure_future(channel.get_batch(5, timeout=1))
+        await asyncio.sleep(0)
+        channel.close()
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        self.assertEqual([1, 2, 3], [item async for item in channel])
+        await asyncio.wait_for(channel.join(), 1)
+
+    async def test_direct_handoff(self):
+        """
+            An item put while a get() is waiting goes straight to that
+            getter: it can't be taken by anyone else first
+        """
+        channel = Channel()
+        first = asyncio.ensure_future(channel.get())
+        second = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.put_nowait(1)
+        await channel.put(2)
+        self.assertTrue(channel.empty())
+        with self.assertRaises(ChannelEmpty):
+            channel.get_nowait()
+        self.assertEqual([1, 2], await asyncio.gather(first, second))
+
+    async def test_handoff_getter_cancelled(self):
+        channel = Channel()
+        first = asyncio.ensure_future(channel.get())
+        second = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.put_nowait(1)
+        first.cancel()
+        # the item is put back, for the next getter
+        self.assertEqual(1, await second)
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+    async def test_handoff_cancelled_keeps_fifo(self):
+        """
+            An item handed over to a getter that is cancelled goes back in
+            front of the items put since
+        """
+        channel = Channel()
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.put_nowait("a")
+        channel.put_nowait("b")
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        self.assertEqual(["a", "b"], list(channel))
+
+    async def test_handoff_holds_its_slot(self):
+        channel = Channel(1)
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.put_nowait("a")
+        self.assertTrue(channel.full())
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait("b")
+        putter = asyncio.ensure_future(channel.put("b"))
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        self.assertEqual(1, channel.qsize())
+        self.assertEqual("a", channel.get_nowait())
+        await putter
+        self.assertEqual(["b"], list(channel))
+
+    async def test_handoff_taken_wakes_putter(self):
+        channel = Channel(1)
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        # runs before the getter does, and finds the channel full
+        putter = asyncio.ensure_future(channel.put("b"))
+        channel.put_nowait("a")
+        self.assertEqual("a", await getter)
+        await putter
+        self.assertEqual(["b"], list(channel))
+
+    async def test_handoff_pending_on_close(self):
+        """
+            The channel isn't finished while a handed over item is on its
+            way to a getter
+        """
+        channel = Channel()
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(2)]
+        await asyncio.sleep(0)
+        channel.put_nowait("a")
+        channel.put_nowait("b")
+        channel.close()
+        self.assertFalse(channel._finished.is_set())
+        getters[0].cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getters[0]
+        self.assertFalse(channel._finished.is_set())
+        self.assertEqual(["a"], list(channel))
+        self.assertEqual("b", await getters[1])
+        self.assertFalse(channel._finished.is_set())
+        self.assertEqual("a", channel.get_nowait())
+        await asyncio.wait_for(channel.join(), timeout=1)
+
+    async def test_handoff_taken_after_close(self):
+        channel = Channel()
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.put_nowait("a")
+        channel.close()
+        self.assertFalse(channel._finished.is_set())
+        self.assertEqual("a", await getter)
+        await asyncio.wait_for(channel.join(), timeout=1)
+
+    async def test_handoff_behind_other_getter(self):
+        """
+            Getters that wait to be woken up (not in get()) keep their turn
+        """
+        channel = Channel()
+        batch = asyncio.ensure_future(channel.get_many(5))
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.put_nowait(1)
+        channel.close()
+        self.assertEqual([1], await batch)
+        with self.assertRaises(ChannelClosed):
+            await getter
+
+    async def test_close_many_getters(self):
+        """
+            close() wakes up as many getters as there are items, and fails
+            the others
+        """
+        channel = Channel()
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(100)]
+        batch = asyncio.ensure_future(channel.get_many(5))
+        await asyncio.sleep(0)
+        getters[0].cancel()
+        await asyncio.sleep(0)
+        channel._queue.extend(range(3))
+        channel.close()
+        self.assertFalse(channel._getters)
+        results = await asyncio.gather(*getters[1:], batch, return_exceptions=True)
+        self.assertEqual([0, 1, 2], results[:3])
+        self.assertTrue(all(isinstance(result, ChannelClosed) for result in results[3:]))
+        self.assertTrue(channel._finished.is_set())
+
+    async def test_close_without_drain(self):
+        channel = Channel(2)
+        channel.put_nowait_many([1, 2])
+        putter = asyncio.ensure_future(channel.put(3))
+        await asyncio.sleep(0)
+        channel.close(drain=False)
+        self.assertTrue(channel.empty())
+        with self.assertRaises(ChannelClosed):
+            await putter
+        with self.assertRaises(ChannelClosed):
+            channel.get_nowait()
+        await channel.join()
+
+    async def test_drain_nowait(self):
+        channel = Channel(2)
+        self.assertEqual([], channel.drain_nowait())
+        channel.put_nowait_many([1, 2])
+        putters = [asyncio.ensure_future(channel.put(item)) for item in (3, 4, 5)]
+        await asyncio.sleep(0)
+        self.assertEqual([1, 2], channel.drain_nowait())
+        await asyncio.sleep(0)
+        self.assertEqual([3, 4], list(channel))
+        self.assertFalse(putters[2].done())
+        channel.close()
+        self.assertEqual([3, 4], channel.drain_nowait())
+        self.assertTrue(channel._finished.is_set())
+        with self.assertRaises(ChannelClosed):
+            await putters[2]
+
+    async def test_aclose(self):
+        channel = Channel()
+        channel.put_nowait_many([1, 2])
+
+        async def consumer():
+            return [item async for item in channel]
+
+        task = asyncio.ensure_future(consumer())
+        await channel.aclose()
+        self.assertEqual([1, 2], await task)
+        channel = Channel()
+        channel.put_nowait(1)
+        await channel.aclose(0.01, drain=False)
+        self.assertTrue(channel.closed())
+
+    async def test_aclose_timeout(self):
+        channel = Channel()
+        channel.put_nowait(1)
+        with self.assertRaises(ChannelTimeout):
+            await channel.aclose(0.01)
+        self.assertTrue(channel.closed())
+        self.assertEqual(1, channel.get_nowait())
+        await channel.join()
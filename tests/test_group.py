@@ -0,0 +1,233 @@
+import aiounittest
+import asyncio
+import threading
+from aiochannel import ChannelClosed, ChannelGroup, ChannelTimeout
+
+
+class ChannelGroupTest(aiounittest.AsyncTestCase):
+    async def test_construct(self):
+        group = ChannelGroup()
+        channel = group.channel(10)
+        self.assertIs(group, channel.group)
+        self.assertEqual([channel], group.channels)
+        self.assertEqual(10, channel.maxsize)
+        self.assertIn("channels=1", repr(group))
+        with self.assertRaises(ValueError):
+            ChannelGroup(steal_batch=0)
+        with self.assertRaises(ValueError):
+            ChannelGroup(steal_threshold=0)
+
+    async def test_local_first(self):
+        group = ChannelGroup()
+        first, second = group.channel(), group.channel()
+        first.put_nowait(1)
+        second.put_nowait_many([2, 3])
+        self.assertEqual(3, group.qsize())
+        self.assertEqual(1, await first.get())
+        self.assertEqual(0, group.steals)
+
+    async def test_steal_half(self):
+        group = ChannelGroup(steal_batch=3)
+        idle, busy = group.channel(), group.channel()
+        busy.put_nowait_many(range(10))
+        self.assertEqual(0, await idle.get())
+        # took 3 (half of 10, up to steal_batch), kept 2
+        self.assertEqual([1, 2], list(idle))
+        self.assertEqual(list(range(3, 10)), list(busy))
+        self.assertEqual(1, idle.steals)
+        self.assertEqual(3, idle.stolen)
+        self.assertEqual(1, group.steals)
+        self.assertEqual(3, group.stolen)
+        self.assertEqual(1, await idle.get())
+
+    async def test_threshold(self):
+        group = ChannelGroup(steal_threshold=2)
+        idle, busy = group.channel(), group.channel()
+        busy.put_nowait(1)
+        # a single item is left for busy's own getters
+        with self.assertRaises(ChannelTimeout):
+            await idle.get(timeout=0.01)
+        self.assertEqual([1], list(busy))
+
+    async def test_idle_getter_woken_to_steal(self):
+        group = ChannelGroup()
+        idle, busy = group.channel(), group.channel()
+        getters = [asyncio.ensure_future(idle.get()) for _ in range(2)]
+        await asyncio.sleep(0)
+        busy.put_nowait(1)
+        await asyncio.sleep(0)
+        self.assertFalse(getters[0].done())
+        busy.put_nowait_many([2, 3, 4])
+        self.assertEqual(1, await getters[0])
+        # the other getter got the rest of the batch
+        self.assertEqual(2, await getters[1])
+        busy.put_nowait(5)
+        self.assertEqual([3, 4, 5], [await busy.get() for _ in range(3)])
+        # and local items still wake the getter up
+        getter = asyncio.ensure_future(idle.get())
+        await asyncio.sleep(0)
+        idle.put_nowait(6)
+        self.assertEqual(6, await getter)
+
+    async def test_poked_but_gone(self):
+        group = ChannelGroup()
+        idle, busy = group.channel(), group.channel()
+        getter = asyncio.ensure_future(idle.get())
+        await asyncio.sleep(0)
+        busy.put_nowait(1)
+        busy.put_nowait(2)
+        # busy's own getter takes both before the idle getter gets to them
+        self.assertEqual([1, 2], busy.get_nowait_many(2))
+        await asyncio.sleep(0)
+        self.assertFalse(getter.done())
+        group._poke()
+        idle._poke()
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+
+    async def test_nothing_left_to_steal(self):
+        group = ChannelGroup()
+        idle, busy = group.channel(), group.channel()
+        busy.put_nowait_many([1, 2])
+        getter = asyncio.ensure_future(idle.get(timeout=0.01))
+        await asyncio.sleep(0)
+        # the idle getter set out to steal, but busy's own getter is first
+        self.assertEqual([1, 2], busy.get_nowait_many(2))
+        with self.assertRaises(ChannelTimeout):
+            await getter
+        busy.put_nowait_many([1, 2])
+        getter = asyncio.ensure_future(idle.get())
+        await asyncio.sleep(0)
+        self.assertEqual([1, 2], busy.get_nowait_many(2))
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+
+    async def test_thief_cancelled(self):
+        group = ChannelGroup()
+        idle, busy = group.channel(), group.channel()
+        busy.put_nowait_many([1, 2, 3])
+        getter = asyncio.ensure_future(idle.get())
+        await asyncio.sleep(0)
+        getter.cancel()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        # the items it was handed stay with it
+        self.assertEqual([1, 2], list(idle))
+        self.assertEqual([3], list(busy))
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+
+    async def test_thief_times_out(self):
+        group = ChannelGroup()
+        idle = group.channel()
+        ready = threading.Event()
+        release = threading.Event()
+
+        def run():
+            async def main():
+                busy = group.channel()
+                busy.put_nowait_many([1, 2, 3])
+                ready.set()
+                # hold up this loop, so the steal isn't answered in time
+                release.wait(1)
+                await asyncio.sleep(0.01)
+
+            asyncio.run(main())
+
+        loop = asyncio.get_running_loop()
+        thread = threading.Thread(target=run)
+        thread.start()
+        await loop.run_in_executor(None, ready.wait)
+        with self.assertRaises(ChannelTimeout):
+            await idle.get(timeout=0.05)
+        release.set()
+        await loop.run_in_executor(None, thread.join)
+        await asyncio.sleep(0.01)
+        # the items handed over too late stay with it
+        self.assertEqual([1, 2], list(idle))
+
+    async def test_victim_loop_gone(self):
+        group = ChannelGroup()
+        idle = group.channel()
+
+        def run():
+            async def main():
+                busy = group.channel()
+                busy.put_nowait_many([1, 2, 3])
+
+            asyncio.run(main())
+
+        loop = asyncio.get_running_loop()
+        thread = threading.Thread(target=run)
+        thread.start()
+        await loop.run_in_executor(None, thread.join)
+        # its loop is closed: nobody is left to hand the items over
+        with self.assertRaises(ChannelTimeout):
+            await idle.get(timeout=0.01)
+        stopped = asyncio.new_event_loop()
+        try:
+            group.channel(loop=stopped).put_nowait_many([1, 2, 3])
+            getter = asyncio.ensure_future(idle.get())
+            await asyncio.sleep(0)
+            idle.put_nowait(4)
+            self.assertEqual(4, await asyncio.wait_for(getter, 1))
+        finally:
+            stopped.close()
+        self.assertEqual(0, group.steals)
+
+    async def test_close_and_join(self):
+        group = ChannelGroup()
+        first, second = group.channel(), group.channel()
+        second.put_nowait_many([1, 2, 3])
+        getter = asyncio.ensure_future(first.get())
+        await asyncio.sleep(0)
+        group.close()
+        # it set out to steal a batch before it was closed
+        self.assertEqual(1, await getter)
+        self.assertEqual([2], list(first))
+        joiner = asyncio.ensure_future(group.join())
+        self.assertEqual(2, await first.get())
+        # closed: steals one item at a time, so it stays finished
+        self.assertEqual(3, await first.get())
+        self.assertEqual([], list(first))
+        with self.assertRaises(ChannelClosed):
+            await first.get()
+        with self.assertRaises(ChannelClosed):
+            await second.get()
+        await joiner
+
+    async def test_threads(self):
+        group = ChannelGroup(steal_batch=16)
+        count = 2000
+        seen = []
+        started = threading.Barrier(3)
+        channels = {}
+
+        def run(name, produce):
+            async def main():
+                channel = group.channel()
+                channels[name] = channel
+                started.wait()
+                if produce:
+                    await channel.put_many(range(count))
+                    group.close()
+                async for item in channel:
+                    seen.append(item)
+                    await asyncio.sleep(0)
+                await group.join()
+
+            asyncio.run(main())
+
+        threads = [
+            threading.Thread(target=run, args=("busy", True)),
+            threading.Thread(target=run, args=("idle", False)),
+        ]
+        for thread in threads:
+            thread.start()
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        for thread in threads:
+            await asyncio.get_running_loop().run_in_executor(None, thread.join)
+        self.assertEqual(list(range(count)), sorted(seen))
+        self.assertGreater(channels["idle"].stolen, 0)
@@ -0,0 +1,120 @@
+import aiounittest
+import asyncio
+from aiochannel import InstrumentedChannel, Histogram, ChannelTimeout
+
+
+class HistogramTest(aiounittest.AsyncTestCase):
+    async def test_observe(self):
+        histogram = Histogram([1, 0.1])
+        self.assertEqual(0.0, histogram.quantile(0.5))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+        self.assertEqual((0.1, 1), histogram.bounds)
+        self.assertEqual([2, 1, 1], histogram.counts)
+        self.assertEqual([2, 3, 4], histogram.cumulative())
+        self.assertEqual(4, histogram.count)
+        self.assertAlmostEqual(2.65, histogram.sum)
+        self.assertEqual(0.1, histogram.quantile(0.5))
+        self.assertEqual(1, histogram.quantile(0.75))
+        self.assertEqual(float("inf"), histogram.quantile(1))
+        self.assertIn("count=4", repr(histogram))
+
+    async def test_copy(self):
+        histogram = Histogram()
+        copy = histogram.copy()
+        histogram.observe(1)
+        self.assertEqual(0, copy.count)
+        self.assertEqual(histogram.bounds, copy.bounds)
+
+
+class InstrumentedChannelTest(aiounittest.AsyncTestCase):
+    async def test_counts(self):
+        channel = InstrumentedChannel(10)
+        await channel.put(1)
+        channel.put_nowait(2)
+        await channel.put_many([3, 4, 5])
+        channel.put_nowait_many([6])
+        self.assertEqual(1, await channel.get())
+        self.assertEqual([2, 3], await channel.get_many(2))
+        self.assertEqual(4, channel.get_nowait())
+        stats = channel.stats()
+        self.assertEqual(6, stats.puts)
+        self.assertEqual(4, stats.gets)
+        self.assertEqual(2, stats.qsize)
+        self.assertEqual(6, stats.high_water)
+        self.assertEqual(0, stats.put_wait.count)  # nothing had to wait
+        self.assertEqual(0, stats.get_wait.count)
+        self.assertEqual(4, stats.residency.count)
+
+    async def test_blocked(self):
+        channel = InstrumentedChannel(1, buckets=[0.001, 1])
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(3)]
+        await asyncio.sleep(0)
+        self.assertEqual(3, channel.stats().blocked_getters)
+        # cancelled, but not yet taken out of the waiters
+        next(iter(channel._getters)).cancel()
+        self.assertEqual(2, channel.stats().blocked_getters)
+        for getter in getters:
+            getter.cancel()
+        await asyncio.gather(*getters, return_exceptions=True)
+        channel.put_nowait(1)
+        putter = asyncio.ensure_future(channel.put(2))
+        await asyncio.sleep(0)
+        self.assertEqual(1, channel.stats().blocked_putters)
+        await asyncio.sleep(0.01)
+        channel.get_nowait()
+        await putter
+        self.assertEqual([0, 1, 0], channel.stats().put_wait.counts)
+
+    async def test_wait_times(self):
+        channel = InstrumentedChannel(1, buckets=[0.001, 1])
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0.01)
+        await channel.put(1)
+        await getter
+        stats = channel.stats()
+        self.assertEqual([0, 1, 0], stats.get_wait.counts)
+        self.assertEqual(0, stats.put_wait.count)
+        with self.assertRaises(ChannelTimeout):
+            await channel.get(timeout=0.01)
+        self.assertEqual(2, channel.stats().get_wait.count)
+
+    async def test_residency(self):
+        channel = InstrumentedChannel(buckets=[0.001, 1])
+        channel.put_nowait_many([1, 2])
+        await asyncio.sleep(0.01)
+        channel.get_nowait_many(2)
+        self.assertEqual([0, 2, 0], channel.stats().residency.counts)
+        channel.put_nowait_many([3])
+        self.assertEqual(2, channel.stats().high_water)
+
+    async def test_hooks(self):
+        channel = InstrumentedChannel()
+        events = []
+
+        def hook(source, event, seconds):
+            self.assertIs(channel, source)
+            events.append(event)
+
+        channel.add_hook(hook)
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        await channel.put(1)
+        await getter
+        channel.remove_hook(hook)
+        await channel.put(2)
+        await channel.get()
+        self.assertEqual(["get_wait", "residency"], events)
+        with self.assertRaises(ValueError):
+            channel.remove_hook(hook)
+
+    async def test_get_batch_cancelled(self):
+        channel = InstrumentedChannel()
+        channel.put_nowait_many([1, 2])
+        getter = asyncio.ensure_future(channel.get_batch(5, timeout=1))
+        await asyncio.sleep(0)
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        self.assertEqual([1, 2], channel.get_nowait_many(5))
+        self.assertEqual(4, channel.stats().residency.count)
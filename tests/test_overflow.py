@@ -0,0 +1,185 @@
+import aiounittest
+import asyncio
+from aiochannel import Channel, CoalescingChannel, LifoChannel, ChannelClosed, ChannelFull
+
+
+class OverflowTest(aiounittest.AsyncTestCase):
+    async def test_construct(self):
+        channel = Channel(2)
+        self.assertEqual("block", channel.overflow)
+        self.assertEqual(0, channel.dropped)
+        self.assertEqual("drop_oldest", Channel(2, overflow="drop_oldest").overflow)
+        with self.assertRaises(ValueError):
+            Channel(2, overflow="sliding")
+
+    async def test_block(self):
+        channel = Channel(1)
+        channel.put_nowait(1)
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait(2)
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait_many([2])
+        self.assertEqual(0, channel.dropped)
+
+    async def test_drop_newest(self):
+        channel = Channel(2, overflow="drop_newest")
+        for i in range(4):
+            await channel.put(i)
+        channel.put_nowait(4)
+        self.assertEqual([0, 1], list(channel))
+        self.assertEqual(3, channel.dropped)
+
+    async def test_drop_oldest(self):
+        channel = Channel(2, overflow="drop_oldest")
+        for i in range(4):
+            await channel.put(i)
+        channel.put_nowait(4)
+        self.assertEqual([3, 4], list(channel))
+        self.assertEqual(3, channel.dropped)
+
+    async def test_handed_over_items_are_not_dropped(self):
+        for overflow, dropped, left in (("drop_oldest", 0, [2]), ("drop_newest", 1, [])):
+            channel = Channel(1, overflow=overflow)
+            getter = asyncio.ensure_future(channel.get())
+            await asyncio.sleep(0)
+            channel.put_nowait(1)
+            channel.put_nowait(2)
+            self.assertEqual(1, await getter)
+            self.assertEqual(left, list(channel))
+            self.assertEqual(dropped, channel.dropped)
+
+    async def test_drop_oldest_wakes_getters_past_handed_items(self):
+        channel = Channel(1, overflow="drop_oldest")
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(2)]
+        await asyncio.sleep(0)
+        channel.put_nowait("x")
+        # full of the item handed to the first getter: the next one still
+        # gets the new item
+        channel.put_nowait("y")
+        self.assertEqual(["x", "y"], await asyncio.wait_for(asyncio.gather(*getters), 1))
+        self.assertEqual(0, channel.dropped)
+
+    async def test_drop_oldest_lifo_drops_oldest(self):
+        channel = LifoChannel(2, overflow="drop_oldest")
+        channel.put_nowait_many([1, 2, 3])
+        # the oldest item goes, even though it is the last one out
+        self.assertEqual([3, 2], list(channel))
+        channel.put_nowait(4)
+        self.assertEqual(4, channel.get_nowait())
+        self.assertEqual([3], list(channel))
+        self.assertEqual(2, channel.dropped)
+
+    async def test_put_many_never_waits(self):
+        channel = Channel(3, overflow="drop_oldest")
+        await channel.put_many(range(10))
+        self.assertEqual([7, 8, 9], list(channel))
+        self.assertEqual(7, channel.dropped)
+        channel = Channel(3, overflow="drop_newest")
+        channel.put_nowait(0)
+        await channel.put_many(range(1, 10))
+        self.assertEqual([0, 1, 2], list(channel))
+        self.assertEqual(7, channel.dropped)
+
+    async def test_put_many_wakes_getters(self):
+        channel = Channel(2, overflow="drop_oldest")
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(3)]
+        await asyncio.sleep(0)
+        channel.put_nowait_many([1, 2, 3])
+        self.assertEqual([2, 3], await asyncio.gather(*getters[:2]))
+        self.assertFalse(getters[2].done())
+        getters[2].cancel()
+
+    async def test_closed(self):
+        channel = Channel(1, overflow="drop_newest")
+        channel.put_nowait(1)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait(2)
+        with self.assertRaises(ChannelClosed):
+            await channel.put(2)
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait_many([2])
+        self.assertEqual(0, channel.dropped)
+        self.assertEqual([1], [item async for item in channel])
+
+
+class CoalescingChannelTest(aiounittest.AsyncTestCase):
+    async def test_replaces_in_place(self):
+        channel = CoalescingChannel(key=lambda quote: quote[0])
+        channel.put_nowait(("AAPL", 1))
+        channel.put_nowait(("MSFT", 2))
+        await channel.put(("AAPL", 3))
+        self.assertEqual([("AAPL", 3), ("MSFT", 2)], list(channel))
+        self.assertEqual(1, channel.dropped)
+        self.assertEqual(("AAPL", 3), await channel.get())
+        channel.put_nowait(("AAPL", 4))
+        self.assertEqual([("MSFT", 2), ("AAPL", 4)], channel.get_nowait_many(10))
+
+    async def test_replacing_needs_no_room(self):
+        channel = CoalescingChannel(1, key=lambda quote: quote[0])
+        channel.put_nowait(("AAPL", 1))
+        channel.put_nowait(("AAPL", 2))
+        await channel.put(("AAPL", 3))
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait(("MSFT", 1))
+        putter = asyncio.ensure_future(channel.put(("MSFT", 2)))
+        await asyncio.sleep(0)
+        self.assertEqual(("AAPL", 3), channel.get_nowait())
+        await putter
+        self.assertEqual([("MSFT", 2)], list(channel))
+        self.assertEqual(2, channel.dropped)
+
+    async def test_batches(self):
+        channel = CoalescingChannel(2, key=lambda quote: quote[0])
+        await channel.put_many([("AAPL", 1), ("MSFT", 1), ("AAPL", 2)])
+        self.assertEqual([("AAPL", 2), ("MSFT", 1)], list(channel))
+        self.assertEqual(1, channel.dropped)
+
+    async def test_put_nowait_many(self):
+        channel = CoalescingChannel(2, key=lambda quote: quote[0])
+        channel.put_nowait(("AAPL", 1))
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait_many([("MSFT", 1), ("GOOG", 1)])
+        channel.put_nowait_many([("MSFT", 1), ("AAPL", 2), ("MSFT", 2)])
+        self.assertEqual([("AAPL", 2), ("MSFT", 2)], list(channel))
+        self.assertEqual(2, channel.dropped)
+
+    async def test_storage_hooks_coalesce(self):
+        channel = CoalescingChannel(key=lambda quote: quote[0])
+        channel._put_many([("AAPL", 1), ("AAPL", 2)])
+        self.assertEqual([("AAPL", 2)], list(channel))
+        self.assertEqual(1, channel.dropped)
+
+    async def test_handoff_put_back(self):
+        for later, left, dropped in (
+            ([("MSFT", 1)], [("AAPL", 1), ("MSFT", 1)], 0),
+            ([("MSFT", 1), ("AAPL", 2)], [("MSFT", 1), ("AAPL", 2)], 1),
+        ):
+            channel = CoalescingChannel(key=lambda quote: quote[0])
+            getter = asyncio.ensure_future(channel.get())
+            await asyncio.sleep(0)
+            channel.put_nowait(("AAPL", 1))
+            channel.put_nowait_many(later)
+            getter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await getter
+            self.assertEqual(left, list(channel))
+            self.assertEqual(dropped, channel.dropped)
+
+    async def test_drop_oldest(self):
+        channel = CoalescingChannel(2, key=lambda quote: quote[0], overflow="drop_oldest")
+        channel.put_nowait_many([("AAPL", 1), ("MSFT", 1), ("GOOG", 1), ("MSFT", 2)])
+        self.assertEqual([("MSFT", 2), ("GOOG", 1)], list(channel))
+        self.assertEqual(2, channel.dropped)
+
+    async def test_closed(self):
+        channel = CoalescingChannel(key=lambda quote: quote[0])
+        channel.put_nowait(("AAPL", 1))
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait(("AAPL", 2))
+        with self.assertRaises(ChannelClosed):
+            await channel.put(("AAPL", 2))
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait_many([("AAPL", 2)])
+        self.assertEqual([("AAPL", 1)], [item async for item in channel])
@@ -0,0 +1,182 @@
+import aiounittest
+import asyncio
+from aiochannel import ChannelClosed, ChannelEmpty, ChannelFull, ChannelTimeout, PartitionedChannel
+
+
+def account(event):
+    return event[0]
+
+
+class PartitionedChannelTest(aiounittest.AsyncTestCase):
+    async def test_construct(self):
+        channel = PartitionedChannel(4, account, 10)
+        self.assertEqual(4, channel.partitions)
+        self.assertEqual(10, channel.maxsize)
+        self.assertIn("partitions=4", repr(channel))
+        self.assertEqual(hash("a") % 4, channel.partition(("a", 1)))
+        with self.assertRaises(ValueError):
+            PartitionedChannel(0, account)
+        with self.assertRaises(TypeError):
+            PartitionedChannel(4, account, -1)
+
+    async def test_one_consumer_per_key(self):
+        channel = PartitionedChannel(8, lambda item: item)
+        for item in (1, 1, 2):
+            channel.put_nowait(item)
+        self.assertEqual(3, channel.qsize())
+        first = channel.get_nowait()
+        self.assertEqual(1, first.item)
+        self.assertEqual(1, channel.held())
+        self.assertIn("items=1", repr(first))
+        second = channel.get_nowait()
+        self.assertEqual(2, second.item)
+        # the other 1 waits for first to be released
+        with self.assertRaises(ChannelEmpty):
+            channel.get_nowait()
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        self.assertFalse(getter.done())
+        first.release()
+        self.assertTrue(first.released())
+        first.release()
+        third = await getter
+        self.assertEqual(1, third.item)
+        self.assertEqual(first.partition, third.partition)
+        self.assertTrue(channel.empty())
+
+    async def test_ready_order(self):
+        channel = PartitionedChannel(2, account)
+        for event in ((0, 1), (1, 1), (0, 2), (1, 2), (0, 3)):
+            channel.put_nowait(event)
+        claim = channel.get_nowait(max_items=2)
+        self.assertEqual(0, claim.partition)
+        self.assertEqual([(0, 1), (0, 2)], claim.items)
+        claim.release()
+        # partition 1 was ready first
+        with channel.get_nowait(max_items=5) as other:
+            self.assertEqual([(1, 1), (1, 2)], other.items)
+        self.assertEqual([(0, 3)], channel.get_nowait(max_items=5).items)
+        with self.assertRaises(ValueError):
+            channel.get_nowait(0)
+        with self.assertRaises(ValueError):
+            await channel.get(0)
+
+    async def test_order_within_key(self):
+        channel = PartitionedChannel(4, account)
+        await channel.put_many((key, index) for index in range(20) for key in "abcdef")
+        channel.close()
+        seen = {}
+        running = set()
+
+        async def consumer():
+            async for claim in channel:
+                with claim:
+                    key, index = claim.item
+                    self.assertNotIn(claim.partition, running)
+                    running.add(claim.partition)
+                    seen.setdefault(key, []).append(index)
+                    await asyncio.sleep(0)
+                    running.discard(claim.partition)
+
+        await asyncio.gather(*(consumer() for _ in range(4)))
+        await channel.join()
+        self.assertEqual({key: list(range(20)) for key in "abcdef"}, seen)
+
+    async def test_maxsize(self):
+        channel = PartitionedChannel(2, lambda item: item, 2)
+        channel.put_nowait(1)
+        channel.put_nowait(2)
+        self.assertTrue(channel.full())
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait(3)
+        with self.assertRaises(ChannelTimeout):
+            await channel.put(3, timeout=0.01)
+        putter = asyncio.ensure_future(channel.put(3))
+        await asyncio.sleep(0)
+        channel.get_nowait().release()
+        await putter
+        self.assertEqual(2, channel.qsize())
+
+    async def test_cancelled_waiters(self):
+        channel = PartitionedChannel(8, lambda item: item)
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(2)]
+        await asyncio.sleep(0)
+        channel.put_nowait(1)
+        # woken up, but cancelled before it got to run: the next one gets it
+        getters[0].cancel()
+        self.assertEqual(1, (await getters[1]).item)
+        with self.assertRaises(asyncio.CancelledError):
+            await getters[0]
+        with self.assertRaises(ChannelTimeout):
+            await channel.get(timeout=0.01)
+        # cancelled before anything came in: skipped
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(2)]
+        await asyncio.sleep(0)
+        getters[0].cancel()
+        channel.put_nowait(2)
+        self.assertEqual(2, (await getters[1]).item)
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        getter.cancel()
+        channel.put_nowait(3)
+        self.assertEqual(3, channel.get_nowait().item)
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        getter.cancel()
+        channel.close()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+
+    async def test_close(self):
+        channel = PartitionedChannel(2, lambda item: item)
+        channel.put_nowait(1)
+        claim = await channel.get()
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait(2)
+        with self.assertRaises(ChannelClosed):
+            await channel.put(2)
+        # nothing left: waiting getters stop, but join() waits for the claim
+        with self.assertRaises(ChannelClosed):
+            await getter
+        with self.assertRaises(ChannelClosed):
+            channel.get_nowait()
+        joiner = asyncio.ensure_future(channel.join())
+        await asyncio.sleep(0)
+        self.assertFalse(joiner.done())
+        claim.release()
+        await joiner
+        self.assertTrue(channel.closed())
+
+    async def test_close_with_items_held_back(self):
+        channel = PartitionedChannel(2, lambda item: item, 1)
+        channel.put_nowait(1)
+        claim = channel.get_nowait()
+        # behind the claim, and the channel is full
+        channel.put_nowait(1)
+        putters = [asyncio.ensure_future(channel.put(2)) for _ in range(2)]
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(3)]
+        await asyncio.sleep(0)
+        putters[0].cancel()
+        getters[0].cancel()
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await putters[1]
+        with self.assertRaises(ChannelClosed):
+            await channel.put(2)
+        self.assertFalse(getters[1].done())
+        claim.release()
+        last = await getters[1]
+        with self.assertRaises(ChannelClosed):
+            await getters[2]
+        last.release()
+        await channel.join()
+
+    async def test_close_empty(self):
+        channel = PartitionedChannel(2, lambda item: item)
+        channel.close()
+        await channel.join()
+        with self.assertRaises(ChannelClosed):
+            await channel.get()
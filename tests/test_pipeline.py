@@ -0,0 +1,252 @@
+import aiounittest
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from aiochannel import Channel, Pipeline, ChannelClosed
+
+
+async def feed(channel, items):
+    await channel.put_many(items)
+    channel.close()
+
+
+async def collect(channel):
+    return [item async for item in channel]
+
+
+class PipelineTest(aiounittest.AsyncTestCase):
+    async def test_construct(self):
+        pipeline = Pipeline()
+        self.assertIsNone(pipeline.error)
+        self.assertIn("stages=0", repr(pipeline))
+        with self.assertRaises(TypeError):
+            Pipeline(maxsize=0)
+        source = Channel()
+        with self.assertRaises(ValueError):
+            pipeline.map(source, str, concurrency=0)
+        with self.assertRaises(ValueError):
+            pipeline.batch(source, 0, 1)
+        with self.assertRaises(ValueError):
+            pipeline.tee(source, 0)
+        with self.assertRaises(ValueError):
+            pipeline.split(source, int, 0)
+        await pipeline.wait()
+
+    async def test_map_filter(self):
+        source = Channel()
+        async with Pipeline() as pipeline:
+            squares = pipeline.map(source, lambda x: x * x)
+            even = pipeline.filter(squares, lambda x: x % 2 == 0)
+            await feed(source, range(200))
+            self.assertEqual([x * x for x in range(0, 200, 2)], await collect(even))
+
+    async def test_filter_everything(self):
+        source = Channel()
+        async with Pipeline() as pipeline:
+            output = pipeline.filter(source, lambda x: x > 10)
+            await source.put_many(range(5))
+            await asyncio.sleep(0)
+            self.assertTrue(output.empty())
+            await feed(source, [11])
+            self.assertEqual([11], await collect(output))
+
+    async def test_map_coroutine_ordered(self):
+        async def slow(x):
+            await asyncio.sleep((10 - x) / 1000)
+            return x
+
+        source = Channel()
+        async with Pipeline() as pipeline:
+            output = pipeline.map(source, slow, concurrency=4)
+            await feed(source, range(10))
+            self.assertEqual(list(range(10)), await collect(output))
+
+    async def test_map_coroutine_unordered(self):
+        running = 0
+        most = 0
+
+        async def slow(x):
+            nonlocal running, most
+            running += 1
+            most = max(most, running)
+            await asyncio.sleep((10 - x) / 1000)
+            running -= 1
+            return x
+
+        source = Channel()
+        async with Pipeline() as pipeline:
+            output = pipeline.map(source, slow, concurrency=4, ordered=False)
+            await feed(source, range(10))
+            results = await collect(output)
+        self.assertEqual(list(range(10)), sorted(results))
+        self.assertNotEqual(list(range(10)), results)
+        self.assertEqual(4, most)
+
+    async def test_batch_flatten(self):
+        source = Channel()
+        async with Pipeline() as pipeline:
+            batches = pipeline.batch(source, 3, timeout=0.01)
+            await source.put_many(range(7))
+            self.assertEqual([0, 1, 2], await batches.get())
+            self.assertEqual([3, 4, 5], await batches.get())
+            self.assertEqual([6], await batches.get())  # after the timeout
+            await asyncio.sleep(0.02)
+            self.assertTrue(batches.empty())  # no empty batches
+            flat = pipeline.flatten(batches)
+            await source.put(7)
+            await asyncio.sleep(0)
+            await feed(source, range(8, 10))
+            self.assertEqual([7, 8, 9], await collect(flat))
+
+    async def test_batch_closed(self):
+        source = Channel()
+        source.close()
+        async with Pipeline() as pipeline:
+            self.assertEqual([], await collect(pipeline.batch(source, 3, timeout=0)))
+            source = Channel()
+            source.put_nowait(1)
+            source.close()
+            self.assertEqual([[1]], await collect(pipeline.batch(source, 3, timeout=1)))
+
+    async def test_batch_cancelled(self):
+        source = Channel()
+        with self.assertRaises(KeyError):
+            async with Pipeline() as pipeline:
+                pipeline.batch(source, 5, timeout=10)
+                source.put_nowait_many([1, 2])
+                await asyncio.sleep(0.01)
+                raise KeyError
+        # the stage put back the items of the batch it was filling
+        self.assertEqual([1, 2], list(source))
+
+    async def test_merge(self):
+        a, b = Channel(), Channel()
+        async with Pipeline() as pipeline:
+            merged = pipeline.merge([a, b])
+            await asyncio.gather(feed(a, range(100)), feed(b, range(100, 150)))
+            self.assertEqual(list(range(150)), sorted(await collect(merged)))
+
+    async def test_merge_one_at_a_time(self):
+        a, b = Channel(), Channel()
+        async with Pipeline() as pipeline:
+            merged = pipeline.merge([a, b])
+            for i in range(3):
+                await a.put(i)
+                self.assertEqual(i, await merged.get())
+            a.close()
+            b.close()
+
+    async def test_tee(self):
+        source = Channel()
+        async with Pipeline(maxsize=2) as pipeline:
+            left, right = pipeline.tee(source)
+            feeder = asyncio.ensure_future(feed(source, range(10)))
+            # the slowest output holds the others back
+            await asyncio.sleep(0.01)
+            self.assertEqual(2, left.qsize())
+            self.assertEqual([list(range(10))] * 2,
+                             await asyncio.gather(collect(left), collect(right)))
+            await feeder
+
+    async def test_split(self):
+        source = Channel()
+        async with Pipeline() as pipeline:
+            outputs = pipeline.split(source, lambda x: x % 3, 3)
+            await source.put_many([0, 3])
+            await asyncio.sleep(0)
+            await feed(source, range(1, 9))
+            self.assertEqual([[0, 3, 3, 6], [1, 4, 7], [2, 5, 8]],
+                             [await collect(output) for output in outputs])
+
+    async def test_run_in_executor(self):
+        source = Channel()
+        with ThreadPoolExecutor(2) as executor:
+            async with Pipeline() as pipeline:
+                output = pipeline.run_in_executor(
+                    source, lambda x: x + 1, executor=executor, concurrency=2)
+                await feed(source, range(300))
+                self.assertEqual(list(range(1, 301)), await collect(output))
+
+    async def test_run_in_executor_unordered(self):
+        source = Channel()
+        async with Pipeline() as pipeline:
+            output = pipeline.run_in_executor(source, str, ordered=False)
+            await feed(source, range(3))
+            self.assertEqual(["0", "1", "2"], await collect(output))
+
+    async def test_backpressure(self):
+        source = Channel(1)
+        pipeline = Pipeline(maxsize=1)
+        output = pipeline.map(pipeline.map(source, str), len)
+        for i in range(10):
+            if source.full():
+                break
+            await source.put(i)
+            await asyncio.sleep(0)
+        # each stage holds one item in its output, and one in hand
+        self.assertTrue(source.full())
+        self.assertEqual(1, output.qsize())
+        pipeline.cancel()
+        await pipeline.wait()
+
+    async def test_error(self):
+        source = Channel()
+        pipeline = Pipeline()
+        output = pipeline.map(pipeline.map(source, lambda x: 1 // x), str)
+        await source.put_many([1, 0])
+        with self.assertRaises(ZeroDivisionError):
+            await pipeline.wait()
+        self.assertIsInstance(pipeline.error, ZeroDivisionError)
+        self.assertTrue(source.closed())
+        self.assertTrue(output.closed())
+        with self.assertRaises(ChannelClosed):
+            await source.put(2)
+
+    async def test_first_error_wins(self):
+        async def fail_on_cancel(x):
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                raise KeyError(x)
+
+        a, b = Channel(), Channel()
+        pipeline = Pipeline()
+        pipeline.map(a, lambda x: 1 // x)
+        pipeline.map(b, fail_on_cancel)
+        b.put_nowait(0)
+        await asyncio.sleep(0)
+        a.put_nowait(0)
+        with self.assertRaises(ZeroDivisionError):
+            await pipeline.wait()
+
+    async def test_error_in_worker(self):
+        async def fail(x):
+            if x == 3:
+                raise ValueError(x)
+            await asyncio.sleep(0.01)
+            return x
+
+        source = Channel()
+        async with Pipeline() as pipeline:
+            output = pipeline.map(source, fail, concurrency=2)
+            await feed(source, range(10))
+            await collect(output)
+            with self.assertRaises(ValueError):
+                await pipeline.wait()
+            pipeline._error = None
+
+    async def test_exit_with_error_cancels(self):
+        source = Channel()
+        with self.assertRaises(KeyError):
+            async with Pipeline() as pipeline:
+                output = pipeline.map(source, str)
+                raise KeyError
+        self.assertTrue(output.closed())
+
+    async def test_output_closed_downstream(self):
+        source = Channel()
+        pipeline = Pipeline()
+        output = pipeline.map(source, str)
+        output.close()
+        await source.put(1)
+        await pipeline.wait()
+        self.assertTrue(source.closed())
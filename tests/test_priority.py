@@ -0,0 +1,141 @@
+import aiounittest
+import asyncio
+import random
+from aiochannel import LifoChannel, PriorityChannel, ChannelClosed, ChannelFull
+
+
+class LifoChannelTest(aiounittest.AsyncTestCase):
+    async def test_lifo_ordering(self):
+        channel = LifoChannel()
+        for i in range(5):
+            await channel.put(i)
+        self.assertEqual([4, 3, 2, 1, 0], list(channel))
+        self.assertEqual(4, await channel.get())
+        self.assertEqual([3, 2], channel.get_nowait_many(2))
+        self.assertEqual([1, 0], channel.get_nowait_many(10))
+
+    async def test_handoff_put_back(self):
+        channel = LifoChannel()
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.put_nowait(1)
+        channel.put_nowait(2)
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        self.assertEqual([1, 2], list(channel))
+
+    async def test_close_and_drain(self):
+        channel = LifoChannel(2)
+        await channel.put("a")
+        await channel.put("b")
+        channel.close()
+        self.assertEqual(["b", "a"], [item async for item in channel])
+        await asyncio.wait_for(channel.join(), timeout=1)
+
+
+class PriorityChannelTest(aiounittest.AsyncTestCase):
+    async def test_priority_ordering(self):
+        channel = PriorityChannel()
+        for item in [5, 1, 4, 2, 3]:
+            channel.put_nowait(item)
+        self.assertEqual([1, 2, 3, 4, 5], list(channel))
+        self.assertEqual(1, await channel.get())
+        self.assertEqual([2, 3], await channel.get_many(2))
+        self.assertEqual([4, 5], channel.get_nowait_many(10))
+
+    async def test_equal_priorities_are_fifo(self):
+        channel = PriorityChannel(key=lambda item: item[0])
+        # the items themselves can't be compared
+        items = [(1, {"n": i}) for i in range(5)] + [(0, {"n": 5})]
+        channel.put_nowait_many(items)
+        self.assertEqual(items[-1:] + items[:-1], channel.get_nowait_many(10))
+
+    async def test_handoff_put_back(self):
+        for drop_lowest in (False, True):
+            channel = PriorityChannel(key=lambda item: item[0], drop_lowest=drop_lowest)
+            getter = asyncio.ensure_future(channel.get())
+            await asyncio.sleep(0)
+            channel.put_nowait((1, "a"))
+            channel.put_nowait_many([(1, "b"), (0, "c")])
+            getter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await getter
+            self.assertEqual([(0, "c"), (1, "a"), (1, "b")], channel.get_nowait_many(3))
+
+    async def test_urgent_items_jump_ahead(self):
+        channel = PriorityChannel(3, key=lambda item: item[0])
+        await channel.put_many([(1, "bulk"), (1, "bulk")])
+        await channel.put((0, "urgent"))
+        self.assertEqual((0, "urgent"), await channel.get())
+
+    async def test_bounded_blocks(self):
+        channel = PriorityChannel(1)
+        channel.put_nowait(1)
+        self.assertTrue(channel.full())
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait(0)
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait_many([0])
+        putter = asyncio.ensure_future(channel.put_many([0]))
+        await asyncio.sleep(0)
+        self.assertFalse(putter.done())
+        self.assertEqual(1, channel.get_nowait())
+        await putter
+        self.assertEqual(0, channel.dropped)
+
+    async def test_drop_lowest(self):
+        channel = PriorityChannel(3, drop_lowest=True)
+        for item in [2, 5, 3]:
+            await channel.put(item)
+        self.assertFalse(channel.full())
+        channel.put_nowait(1)  # drops 5
+        await channel.put(9)  # drops itself
+        self.assertEqual(2, channel.dropped)
+        self.assertEqual([1, 2, 3], list(channel))
+        await channel.put_many([0, 0])  # drop 3, then 2
+        self.assertEqual(4, channel.dropped)
+        self.assertEqual([0, 0, 1], channel.get_nowait_many(10))
+
+    async def test_drop_lowest_keeps_older_of_equal_priorities(self):
+        channel = PriorityChannel(2, key=lambda item: item[0], drop_lowest=True)
+        channel.put_nowait_many([(1, "first"), (1, "second"), (1, "third")])
+        self.assertEqual([(1, "first"), (1, "second")], list(channel))
+        self.assertEqual(1, channel.dropped)
+
+    async def test_drop_lowest_heap(self):
+        channel = PriorityChannel(20, drop_lowest=True)
+        rng = random.Random(0)
+        expected = []
+        for _ in range(500):
+            if rng.random() < 0.3 and expected:
+                expected.sort()
+                self.assertEqual(expected.pop(0), channel.get_nowait())
+            else:
+                item = rng.randrange(50)
+                channel.put_nowait(item)
+                # the latest of equal priorities is dropped first
+                expected.append(item)
+                expected.sort()
+                del expected[20:]
+            self.assertEqual(sorted(expected), list(channel))
+        self.assertEqual(sorted(expected), channel.get_nowait_many(20))
+
+    async def test_drop_lowest_wakes_getters(self):
+        channel = PriorityChannel(2, drop_lowest=True)
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.put_nowait_many([3, 2, 1])
+        self.assertEqual(1, await getter)
+        self.assertEqual([2], list(channel))
+
+    async def test_close_and_drain(self):
+        channel = PriorityChannel(drop_lowest=True)
+        channel.put_nowait_many([2, 1])
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait_many([0])
+        with self.assertRaises(ChannelClosed):
+            await channel.put(0)
+        self.assertEqual([1, 2], [item async for item in channel])
+        await asyncio.wait_for(channel.join(), timeout=1)
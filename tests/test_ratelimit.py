@@ -0,0 +1,214 @@
+import aiounittest
+import asyncio
+from aiochannel import RateLimitedChannel, ChannelClosed, ChannelEmpty, ChannelFull, ChannelTimeout
+
+
+class RateLimitedChannelTest(aiounittest.AsyncTestCase):
+    async def test_construct(self):
+        channel = RateLimitedChannel()
+        channel.put_nowait_many(range(3))
+        self.assertEqual([0, 1, 2], await channel.get_many(3))
+        with self.assertRaises(ValueError):
+            RateLimitedChannel(rate=0)
+        with self.assertRaises(ValueError):
+            RateLimitedChannel(rate=1, burst=0.5)
+
+    async def test_get_rate(self):
+        channel = RateLimitedChannel(rate=100, burst=2)
+        channel.put_nowait_many(range(6))
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        self.assertEqual(list(range(6)), [await channel.get() for _ in range(6)])
+        # a burst of 2, then one every 10ms
+        self.assertGreaterEqual(loop.time() - start, 0.035)
+
+    async def test_get_nowait(self):
+        channel = RateLimitedChannel(rate=50)
+        with self.assertRaises(ChannelEmpty):
+            channel.get_nowait()
+        channel.put_nowait_many(range(3))
+        self.assertEqual(0, channel.get_nowait())
+        with self.assertRaises(ChannelEmpty):
+            channel.get_nowait()
+        with self.assertRaises(ChannelEmpty):
+            channel.get_nowait_many(2)
+        await asyncio.sleep(0.025)
+        self.assertEqual([1, 2], channel.get_nowait_many(2))
+
+    async def test_single_timer(self):
+        channel = RateLimitedChannel(rate=100)
+        channel.put_nowait_many(range(10))
+        channel.get_nowait()
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(5)]
+        await asyncio.sleep(0)
+        bucket = channel._get_bucket
+        self.assertEqual(5, len(bucket._waiters))
+        self.assertIsNotNone(bucket._timer)
+        # waiters come out in order, one per token
+        self.assertEqual([1, 2, 3, 4, 5], await asyncio.gather(*getters))
+
+    async def test_cancelled_waiter(self):
+        channel = RateLimitedChannel(rate=100)
+        channel.put_nowait_many(range(3))
+        channel.get_nowait()
+        first = asyncio.ensure_future(channel.get())
+        second = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        next(iter(channel._get_bucket._waiters)).cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+        self.assertEqual(1, await second)
+
+    async def test_get_timeout(self):
+        channel = RateLimitedChannel(rate=10)
+        channel.put_nowait_many(range(3))
+        channel.get_nowait()
+        with self.assertRaises(ChannelTimeout):
+            await channel.get(timeout=0.01)
+        self.assertEqual([], await channel.get_batch(2, timeout=0.01))
+        self.assertEqual(1, await channel.get(deadline=channel._loop.time() + 1))
+
+    async def test_batches_pay_for_every_item(self):
+        channel = RateLimitedChannel(rate=100, burst=1)
+        channel.put_nowait_many(range(10))
+        self.assertEqual([0, 1, 2, 3], await channel.get_many(4))
+        with self.assertRaises(ChannelEmpty):
+            channel.get_nowait()
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        self.assertEqual([4, 5], await channel.get_batch(2, timeout=1))
+        self.assertGreaterEqual(loop.time() - start, 0.035)
+
+    async def test_put_rate(self):
+        channel = RateLimitedChannel(put_rate=100)
+        channel.put_nowait(0)
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait(1)
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait_many([1])
+        await channel.put(1)
+        await channel.put_many([2, 3])
+        await asyncio.sleep(0.03)
+        channel.put_nowait_many([4])
+        with self.assertRaises(ChannelTimeout):
+            await channel.put(5, timeout=0.001)
+        self.assertEqual([0, 1, 2, 3, 4], list(channel))
+
+    async def test_put_rate_overflow(self):
+        channel = RateLimitedChannel(2, put_rate=1000, overflow="drop_oldest")
+        await channel.put_many(range(4))
+        self.assertEqual([2, 3], list(channel))
+        self.assertFalse(channel._put_bucket.ready())
+
+    async def test_close_drains_at_rate(self):
+        channel = RateLimitedChannel(rate=100)
+        channel.put_nowait_many(range(4))
+        channel.close()
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        self.assertEqual([0, 1, 2, 3], [item async for item in channel])
+        self.assertGreaterEqual(loop.time() - start, 0.025)
+        await asyncio.wait_for(channel.join(), 1)
+        with self.assertRaises(ChannelClosed):
+            await channel.get()
+
+    async def test_close_wakes_token_waiters(self):
+        channel = RateLimitedChannel(rate=10, put_rate=10)
+        channel.put_nowait(0)
+        self.assertEqual(0, channel.get_nowait())
+        getter = asyncio.ensure_future(channel.get())
+        putter = asyncio.ensure_future(channel.put(1))
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await getter
+        with self.assertRaises(ChannelClosed):
+            await putter
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait(2)
+        with self.assertRaises(ChannelClosed):
+            await channel.put(2)
+        RateLimitedChannel(put_rate=10).close()
+
+    async def test_cancelled_waiters_are_skipped(self):
+        channel = RateLimitedChannel(rate=10)
+        channel.put_nowait_many(range(3))
+        channel.get_nowait()
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(3)]
+        await asyncio.sleep(0)
+        bucket = channel._get_bucket
+        # cancelled, but not yet taken out of the waiters
+        waiters = list(bucket._waiters)
+        waiters[0].cancel()
+        bucket._tokens = 1
+        bucket._release()
+        self.assertTrue(waiters[1].done())
+        waiters[2].cancel()
+        bucket.close()
+        self.assertEqual(1, await getters[1])
+        for getter in (getters[0], getters[2]):
+            with self.assertRaises(asyncio.CancelledError):
+                await getter
+
+    async def test_parked_getters(self):
+        channel = RateLimitedChannel(rate=100, burst=1)
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(4)]
+        await asyncio.sleep(0)
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        channel.put_nowait_many(range(4))
+        # getters parked on the empty channel still come away one per token
+        self.assertEqual([0, 1, 2, 3], await asyncio.gather(*getters))
+        self.assertGreaterEqual(loop.time() - start, 0.025)
+
+    async def test_tokens_are_refunded(self):
+        channel = RateLimitedChannel(rate=10)
+        with self.assertRaises(ChannelTimeout):
+            await channel.get(timeout=0.01)
+        self.assertEqual([], await channel.get_batch(2, timeout=0.01))
+        for getter in (channel.get_many(2), channel.get_batch(2, timeout=1)):
+            getter = asyncio.ensure_future(getter)
+            await asyncio.sleep(0)
+            getter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await getter
+        channel.put_nowait(0)
+        # none of the tokens above were used up
+        self.assertEqual(0, channel.get_nowait())
+
+    async def test_refund_wakes_next_waiter(self):
+        channel = RateLimitedChannel(rate=1)
+        first = asyncio.ensure_future(channel.get())
+        second = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        # first holds the token, waiting for an item; second waits for a token
+        first.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+        channel.put_nowait(0)
+        self.assertEqual(0, await asyncio.wait_for(second, 0.5))
+
+    async def test_woken_waiter_cancelled(self):
+        channel = RateLimitedChannel(rate=10)
+        channel.put_nowait_many(range(2))
+        channel.get_nowait()
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        bucket = channel._get_bucket
+        bucket._tokens = 1
+        bucket._release()
+        # given the token, but cancelled before it could use it
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        self.assertEqual(1, channel.get_nowait())
+
+    async def test_put_many_refunded(self):
+        channel = RateLimitedChannel(1, put_rate=10, put_burst=2)
+        channel.put_nowait(0)
+        putter = asyncio.ensure_future(channel.put_many([1, 2]))
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await putter
+        self.assertTrue(channel._put_bucket.ready())
@@ -0,0 +1,183 @@
+import aiounittest
+import asyncio
+from aiochannel import (
+    ChannelClosed, ChannelEmpty, ChannelFull, ChannelTimeout, RendezvousChannel, Selector
+)
+
+
+class RendezvousChannelTest(aiounittest.AsyncTestCase):
+    async def test_put_waits_for_getter(self):
+        channel = RendezvousChannel()
+        self.assertEqual(0, channel.maxsize)
+        self.assertTrue(channel.empty())
+        self.assertTrue(channel.full())
+        putter = asyncio.ensure_future(channel.put(1))
+        await asyncio.sleep(0)
+        self.assertFalse(putter.done())
+        self.assertEqual(1, channel.qsize())
+        self.assertEqual([1], list(channel))
+        self.assertEqual(1, await channel.get())
+        await putter
+        self.assertTrue(channel.empty())
+
+    async def test_direct_handoff(self):
+        channel = RendezvousChannel()
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        self.assertFalse(channel.full())
+        # the item goes straight into the getter's future
+        await channel.put(1)
+        self.assertEqual([], list(channel))
+        self.assertEqual(1, await getter)
+
+    async def test_nowait(self):
+        channel = RendezvousChannel()
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait(1)
+        with self.assertRaises(ChannelEmpty):
+            channel.get_nowait()
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(2)]
+        await asyncio.sleep(0)
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait_many([1, 2, 3])
+        channel.put_nowait_many([1, 2])
+        self.assertEqual([1, 2], await asyncio.gather(*getters))
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.put_nowait(3)
+        self.assertEqual(3, await getter)
+
+    async def test_many(self):
+        channel = RendezvousChannel()
+        putters = [asyncio.ensure_future(channel.put(i)) for i in range(3)]
+        await asyncio.sleep(0)
+        self.assertEqual([0, 1], await channel.get_many(2))
+        self.assertEqual([2], channel.get_nowait_many(5))
+        await asyncio.gather(*putters)
+        # get_many() waits for a putter
+        getter = asyncio.ensure_future(channel.get_many(5))
+        await asyncio.sleep(0)
+        putter = asyncio.ensure_future(channel.put_many([3, 4]))
+        self.assertEqual([3], await getter)
+        self.assertEqual(4, await channel.get())
+        await putter
+        self.assertEqual([], await channel.get_batch(2, 0.01))
+
+    async def test_timeouts(self):
+        channel = RendezvousChannel()
+        with self.assertRaises(ChannelTimeout):
+            await channel.put(1, timeout=0.01)
+        with self.assertRaises(ChannelTimeout):
+            await channel.get(timeout=0.01)
+        self.assertTrue(channel.empty())
+        self.assertTrue(channel.full())
+
+    async def test_cancelled_putter(self):
+        channel = RendezvousChannel()
+        putters = [asyncio.ensure_future(channel.put(i)) for i in range(2)]
+        await asyncio.sleep(0)
+        putters[0].cancel()
+        self.assertEqual([1], list(channel))
+        self.assertEqual(1, channel.get_nowait())
+        with self.assertRaises(asyncio.CancelledError):
+            await putters[0]
+        await putters[1]
+
+    async def test_cancelled_getter(self):
+        channel = RendezvousChannel()
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(2)]
+        await asyncio.sleep(0)
+        getters[0].cancel()
+        channel.put_nowait(1)
+        self.assertEqual(1, await getters[1])
+
+    async def test_getter_cancelled_after_handoff(self):
+        channel = RendezvousChannel()
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(2)]
+        await asyncio.sleep(0)
+        channel.put_nowait(1)
+        getters[0].cancel()
+        # the item is passed on to the next getter
+        self.assertEqual(1, await getters[1])
+        with self.assertRaises(asyncio.CancelledError):
+            await getters[0]
+        # or kept until the next one comes
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.put_nowait(2)
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        self.assertEqual([2], list(channel))
+        self.assertEqual(2, await channel.get())
+        # or to a get_many() waiting
+        getter = asyncio.ensure_future(channel.get())
+        batch = asyncio.ensure_future(channel.get_many(5))
+        await asyncio.sleep(0)
+        channel.put_nowait(3)
+        getter.cancel()
+        self.assertEqual([3], await batch)
+
+    async def test_selector(self):
+        channel = RendezvousChannel()
+        selector = Selector([channel])
+        getter = asyncio.ensure_future(selector.get())
+        await asyncio.sleep(0)
+        putter = asyncio.ensure_future(channel.put(1))
+        self.assertEqual((channel, 1), await getter)
+        await putter
+        putter = asyncio.ensure_future(selector.put(2))
+        await asyncio.sleep(0)
+        self.assertEqual(2, await channel.get())
+        self.assertIs(channel, await putter)
+
+    async def test_close(self):
+        channel = RendezvousChannel()
+        putter = asyncio.ensure_future(channel.put(1))
+        cancelled = asyncio.ensure_future(channel.put(1))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await putter
+        with self.assertRaises(ChannelClosed):
+            await channel.put(2)
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait(2)
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait_many([2])
+        with self.assertRaises(ChannelClosed):
+            await channel.get()
+        await channel.join()
+
+        channel = RendezvousChannel()
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await getter
+        self.assertEqual([], [item async for item in channel])
+
+    async def test_handoff_pending_on_close(self):
+        channel = RendezvousChannel()
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(2)]
+        await asyncio.sleep(0)
+        channel.put_nowait(1)
+        channel.close()
+        # not finished until the getter takes the item handed to it
+        self.assertFalse(channel._finished.is_set())
+        self.assertEqual(1, await getters[0])
+        with self.assertRaises(ChannelClosed):
+            await getters[1]
+        await asyncio.wait_for(channel.join(), 1)
+
+    async def test_handoff_skips_get_many(self):
+        channel = RendezvousChannel()
+        batch = asyncio.ensure_future(channel.get_many(5))
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        # the item goes to the get() waiting behind the get_many()
+        channel.put_nowait(1)
+        self.assertEqual(1, await getter)
+        self.assertFalse(batch.done())
+        batch.cancel()
@@ -0,0 +1,200 @@
+import aiounittest
+import asyncio
+from aiochannel import (
+    Channel, Selector, WeightedChannel, select,
+    ChannelClosed, ChannelEmpty, ChannelFull, ChannelTimeout
+)
+
+
+class SelectorTest(aiounittest.AsyncTestCase):
+    async def test_construct(self):
+        channels = [Channel(), Channel()]
+        self.assertEqual(channels, Selector(channels).channels)
+        with self.assertRaises(ValueError):
+            Selector([])
+        with self.assertRaises(ValueError):
+            Selector(channels, weights=[1])
+        with self.assertRaises(ValueError):
+            Selector(channels, weights=[1, 0])
+
+    async def test_get_nowait(self):
+        a, b = Channel(), Channel()
+        selector = Selector([a, b])
+        with self.assertRaises(ChannelEmpty):
+            selector.get_nowait()
+        b.put_nowait("b")
+        self.assertEqual((b, "b"), selector.get_nowait())
+
+    async def test_round_robin(self):
+        channels = [Channel() for _ in range(3)]
+        for channel in channels:
+            channel.put_nowait_many(range(3))
+        selector = Selector(channels)
+        picked = [selector.get_nowait()[0] for _ in range(9)]
+        self.assertEqual(channels * 3, picked)
+
+    async def test_round_robin_skips_empty(self):
+        a, b, c = Channel(), Channel(), Channel()
+        a.put_nowait_many(range(3))
+        c.put_nowait_many(range(3))
+        selector = Selector([a, b, c])
+        picked = [selector.get_nowait()[0] for _ in range(4)]
+        self.assertEqual([a, c, a, c], picked)
+
+    async def test_weighted(self):
+        a, b = Channel(), Channel()
+        a.put_nowait_many(range(100))
+        b.put_nowait_many(range(100))
+        selector = Selector([a, b], weights=[3, 1])
+        picked = [selector.get_nowait()[0] for _ in range(8)]
+        self.assertEqual(6, picked.count(a))
+        self.assertEqual(2, picked.count(b))
+        # interleaved, not a burst of a's first
+        self.assertEqual([a, a, b, a], picked[:4])
+
+    async def test_weighted_only_counts_ready_channels(self):
+        a, b = Channel(), Channel()
+        b.put_nowait_many(range(3))
+        selector = Selector([a, b], weights=[3, 1])
+        self.assertEqual([b, b], [selector.get_nowait()[0] for _ in range(2)])
+        with self.assertRaises(ChannelEmpty):
+            Selector([a], weights=[1]).get_nowait()
+
+    async def test_get_waits_with_one_waiter(self):
+        channels = [Channel() for _ in range(100)]
+        selector = Selector(channels)
+        getter = asyncio.ensure_future(selector.get())
+        await asyncio.sleep(0)
+        waiters = {next(iter(channel._getters)) for channel in channels}
+        self.assertEqual(1, len(waiters))
+        channels[42].put_nowait("hello")
+        self.assertEqual((channels[42], "hello"), await getter)
+        self.assertTrue(all(not channel._getters for channel in channels))
+
+    async def test_get_passes_on_wakeup(self):
+        a, b = Channel(), Channel()
+        selector = Selector([b, a])
+        selected = asyncio.ensure_future(selector.get())
+        await asyncio.sleep(0)
+        other = asyncio.ensure_future(a.get())
+        await asyncio.sleep(0)
+        # a wakes up the selector, but it takes from b (its turn comes first)
+        a.put_nowait("a")
+        b.put_nowait("b")
+        self.assertEqual((b, "b"), await selected)
+        self.assertEqual("a", await other)
+
+    async def test_get_cancelled_after_wakeup(self):
+        a = Channel()
+        selector = Selector([a])
+        selected = asyncio.ensure_future(selector.get())
+        await asyncio.sleep(0)
+        other = asyncio.ensure_future(a.get())
+        await asyncio.sleep(0)
+        a.put_nowait("a")
+        selected.cancel()
+        self.assertEqual("a", await other)
+        with self.assertRaises(asyncio.CancelledError):
+            await selected
+        self.assertFalse(a._getters)
+
+    async def test_get_timeout(self):
+        a, b = Channel(), Channel()
+        selector = Selector([a, b])
+        with self.assertRaises(ChannelTimeout):
+            await selector.get(timeout=0.01)
+        self.assertFalse(a._getters or b._getters)
+        a.put_nowait("a")
+        self.assertEqual((a, "a"), await selector.get(deadline=a._loop.time() + 1))
+
+    async def test_close(self):
+        a, b = Channel(), Channel()
+        selector = Selector([a, b])
+        getter = asyncio.ensure_future(selector.get())
+        await asyncio.sleep(0)
+        a.close()
+        await asyncio.sleep(0)
+        self.assertFalse(getter.done())
+        b.put_nowait("b")
+        b.close()
+        self.assertEqual((b, "b"), await getter)
+        with self.assertRaises(ChannelClosed):
+            selector.get_nowait()
+        with self.assertRaises(ChannelClosed):
+            await selector.get()
+
+    async def test_async_iteration(self):
+        channels = [Channel() for _ in range(3)]
+
+        async def producer(channel, count):
+            for i in range(count):
+                await channel.put(i)
+            channel.close()
+
+        received = []
+
+        async def consumer():
+            async for channel, item in Selector(channels):
+                received.append((channels.index(channel), item))
+
+        await asyncio.gather(consumer(), *(producer(c, 10) for c in channels))
+        self.assertEqual(
+            sorted((index, i) for index in range(3) for i in range(10)), sorted(received))
+
+    async def test_select(self):
+        a, b = Channel(), Channel()
+        getter = asyncio.ensure_future(select([a, b]))
+        await asyncio.sleep(0)
+        b.put_nowait(1)
+        self.assertEqual((b, 1), await getter)
+
+    async def test_put(self):
+        a, b = Channel(1), Channel(1)
+        selector = Selector([a, b])
+        self.assertIs(a, await selector.put(1))
+        self.assertIs(b, selector.put_nowait(2))
+        with self.assertRaises(ChannelFull):
+            selector.put_nowait(3)
+        putter = asyncio.ensure_future(selector.put(3))
+        await asyncio.sleep(0)
+        self.assertEqual(2, b.get_nowait())
+        self.assertIs(b, await putter)
+        with self.assertRaises(ChannelTimeout):
+            await selector.put(4, timeout=0.01)
+
+    async def test_put_passes_on_wakeup(self):
+        a, b = Channel(1), Channel(1)
+        a.put_nowait(0)
+        b.put_nowait(0)
+        selector = Selector([a, b])
+        selected = asyncio.ensure_future(selector.put(1))
+        await asyncio.sleep(0)
+        other = asyncio.ensure_future(b.put(2))
+        await asyncio.sleep(0)
+        b.get_nowait()  # wakes the selector
+        a.get_nowait()  # a's turn comes first
+        self.assertIs(a, await selected)
+        await other
+        self.assertEqual([2], list(b))
+
+    async def test_put_closed(self):
+        a, b = Channel(1), Channel(1)
+        selector = Selector([a, b])
+        a.close()
+        self.assertIs(b, selector.put_nowait(1))
+        putter = asyncio.ensure_future(selector.put(2))
+        await asyncio.sleep(0)
+        b.close()
+        with self.assertRaises(ChannelClosed):
+            await putter
+        with self.assertRaises(ChannelClosed):
+            selector.put_nowait(3)
+
+    async def test_put_weighted(self):
+        weighted = WeightedChannel(2, cost=len)
+        selector = Selector([Channel(1), weighted])
+        # its waiting putters carry the cost of their item
+        with self.assertRaises(TypeError):
+            await selector.put("ab")
+        self.assertTrue(weighted.empty())
+        self.assertIs(weighted, Selector([weighted]).put_nowait("ab"))
@@ -0,0 +1,241 @@
+import aiounittest
+import array
+import asyncio
+import multiprocessing
+from aiochannel import SharedMemoryChannel, ChannelClosed, ChannelFull, ChannelEmpty
+from aiochannel.shared import _Signal
+
+
+def produce(channel, count):
+    async def main():
+        for i in range(count):
+            await channel.put(i.to_bytes(4, "little") * (i % 7))
+        channel.close()
+
+    asyncio.run(main())
+    channel.release()
+
+
+def consume(channel, results):
+    async def main():
+        total = 0
+        async for item in channel:
+            total += len(item)
+        results.put(total)
+
+    asyncio.run(main())
+    channel.release()
+
+
+class SharedMemoryChannelTest(aiounittest.AsyncTestCase):
+    def setUp(self):
+        self.channels = []
+        self.attached = []
+
+    def tearDown(self):
+        for other in self.attached:
+            # not other.release(): the signals are shared with the channel
+            other.detach()
+        for channel in self.channels:
+            channel.release()
+            channel.unlink()
+
+    def make(self, *args, **kwargs):
+        channel = SharedMemoryChannel(*args, **kwargs)
+        self.channels.append(channel)
+        return channel
+
+    def attach(self, channel):
+        """Another handle to the same channel, as another process would see it"""
+        other = SharedMemoryChannel.__new__(SharedMemoryChannel)
+        other.__setstate__(channel.__getstate__())
+        self.attached.append(other)
+        return other
+
+    def test_construct(self):
+        channel = self.make(64)
+        self.assertEqual(64, channel.capacity)
+        self.assertTrue(channel.empty())
+        self.assertFalse(channel.full())
+        self.assertFalse(channel.closed())
+        self.assertEqual(
+            "<SharedMemoryChannel at {:#x} name={!r} capacity=64 qsize=0>".format(
+                id(channel), channel.name),
+            repr(channel))
+        self.assertEqual("<SharedMemoryChannel capacity=64 qsize=0>", str(channel))
+        self.assertRaises(TypeError, lambda: SharedMemoryChannel(4))
+        self.assertRaises(TypeError, lambda: SharedMemoryChannel(1.0))
+
+    async def test_put_nowait_get_nowait(self):
+        channel = self.make(20)
+        channel.put_nowait(b"foo")
+        channel.put_nowait(bytearray(b"barbaz"))
+        self.assertEqual(2, channel.qsize())
+        self.assertEqual(4 + 3 + 4 + 6, channel.nbytes())
+        self.assertRaises(ChannelFull, lambda: channel.put_nowait(b"x"))
+        self.assertRaises(ValueError, lambda: channel.put_nowait(b"x" * 17))
+        self.assertEqual(b"foo", channel.get_nowait())
+        self.assertEqual(b"barbaz", channel.get_nowait())
+        self.assertRaises(ChannelEmpty, channel.get_nowait)
+        channel.put_nowait(memoryview(array.array("H", [1, 2])))
+        self.assertEqual(b"\x01\x00\x02\x00", channel.get_nowait())
+        channel.put_nowait(b"x" * 16)
+        self.assertTrue(channel.full())
+
+    async def test_wraparound(self):
+        channel = self.make(37)
+        sent = [bytes([n]) * (n % 11) for n in range(200)]
+        received = []
+        for item in sent:
+            while True:
+                try:
+                    channel.put_nowait(item)
+                    break
+                except ChannelFull:
+                    received.append(channel.get_nowait())
+        while not channel.empty():
+            received.append(channel.get_nowait())
+        self.assertEqual(sent, received)
+
+    async def test_get_waits_for_put(self):
+        channel = self.make(64)
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        self.assertEqual(3, channel._read_header()[3])
+        for item in (b"a", b"b", b"c"):
+            channel.put_nowait(item)
+        self.assertEqual([b"a", b"b", b"c"],
+                         sorted(await asyncio.wait_for(asyncio.gather(*getters), 1)))
+        self.assertEqual(0, channel._read_header()[3])
+
+    async def test_put_waits_for_get(self):
+        channel = self.make(16)
+        channel.put_nowait(b"x" * 12)
+        putters = [asyncio.ensure_future(channel.put(b"y" * 4)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        self.assertEqual(2, channel._read_header()[4])
+        self.assertEqual(b"x" * 12, await channel.get())
+        await asyncio.wait_for(asyncio.gather(*putters), 1)
+        self.assertEqual([b"yyyy", b"yyyy"], [channel.get_nowait(), channel.get_nowait()])
+        self.assertEqual(0, channel._read_header()[4])
+
+    async def test_close(self):
+        channel = self.make(16)
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        channel.put_nowait(b"a")
+        channel.close()
+        results = await asyncio.wait_for(asyncio.gather(*getters, return_exceptions=True), 1)
+        self.assertEqual(1, results.count(b"a"))
+        self.assertEqual(2, len([r for r in results if isinstance(r, ChannelClosed)]))
+        await asyncio.wait_for(channel.join(), 1)
+        self.assertTrue(channel.closed())
+        with self.assertRaises(ChannelClosed):
+            await channel.put(b"b")
+        self.assertRaises(ChannelClosed, channel.get_nowait)
+
+    async def test_close_fails_putters(self):
+        channel = self.make(8)
+        channel.put_nowait(b"1234")
+        putters = [asyncio.ensure_future(channel.put(b"5678")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        joiner = asyncio.ensure_future(channel.join())
+        channel.close()
+        results = await asyncio.wait_for(asyncio.gather(*putters, return_exceptions=True), 1)
+        self.assertTrue(all(isinstance(r, ChannelClosed) for r in results))
+        self.assertFalse(joiner.done())
+        self.assertEqual([b"1234"], [item async for item in channel])
+        await asyncio.wait_for(joiner, 1)
+
+    async def test_cancelled_waiters_unregister(self):
+        channel = self.make(8)
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0.01)
+        getter.cancel()
+        await asyncio.gather(getter, return_exceptions=True)
+        self.assertEqual(0, channel._read_header()[3])
+        channel.put_nowait(b"1234")
+        putter = asyncio.ensure_future(channel.put(b"5678"))
+        await asyncio.sleep(0.01)
+        putter.cancel()
+        await asyncio.gather(putter, return_exceptions=True)
+        self.assertEqual(0, channel._read_header()[4])
+
+    async def test_woken_then_cancelled_passes_wakeup_on(self):
+        channel = self.make(8)
+        waiter = asyncio.ensure_future(channel._data.wait())
+        await asyncio.sleep(0)
+        # wake the waiter, then cancel it before it gets to run
+        next(iter(channel._data._waiters)).set_result(None)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        # the wakeup was passed on to the socket
+        self.assertEqual(b"\0", channel._data._recv.recv(1))
+
+    async def test_signal_lost_race(self):
+        channel = self.make(8)
+        signal = channel._data
+        # nothing to read: another process got to the wakeup first
+        signal._on_readable()
+        # a wakeup arrives, but every local waiter already gave up
+        waiter = asyncio.get_event_loop().create_future()
+        waiter.cancel()
+        signal._waiters.append(waiter)
+        signal.notify()
+        await asyncio.sleep(0.01)
+        signal._on_readable()
+        self.assertEqual(b"\0", signal._recv.recv(1))
+
+    async def test_signal_socket_full(self):
+        channel = self.make(8)
+        for _ in range(1 << 20):
+            try:
+                channel._space._send.send(b"\0" * 4096)
+            except BlockingIOError:
+                break
+        channel._space.notify()  # doesn't raise
+
+    async def test_signal_state(self):
+        signal = _Signal()
+        copy = _Signal.__new__(_Signal)
+        copy.__setstate__(signal.__getstate__())
+        waiter = asyncio.ensure_future(copy.wait())
+        await asyncio.sleep(0)
+        self.assertIsNotNone(copy._loop)
+        signal.notify()
+        await asyncio.wait_for(waiter, 1)
+        self.assertIsNone(copy._loop)
+        # closing with waiters still around
+        waiter = asyncio.ensure_future(signal.wait())
+        await asyncio.sleep(0)
+        signal.close()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+    async def test_attach(self):
+        channel = self.make(64)
+        other = self.attach(channel)
+        other.put_nowait(b"hello")
+        self.assertEqual(b"hello", channel.get_nowait())
+        other.close()
+        self.assertTrue(channel.closed())
+        await asyncio.wait_for(channel.join(), 1)
+
+    async def test_processes(self):
+        ctx = multiprocessing.get_context("spawn")
+        channel = self.make(256, ctx=ctx)
+        results = ctx.Queue()
+        count = 2000
+        producer = ctx.Process(target=produce, args=(channel, count))
+        consumer = ctx.Process(target=consume, args=(channel, results))
+        producer.start()
+        consumer.start()
+        total = 0
+        async for item in channel:
+            total += len(item)
+        loop = asyncio.get_event_loop()
+        total += await loop.run_in_executor(None, results.get, True, 10)
+        await loop.run_in_executor(None, producer.join, 10)
+        await loop.run_in_executor(None, consumer.join, 10)
+        self.assertEqual(sum(4 * (i % 7) for i in range(count)), total)
+        await asyncio.wait_for(channel.join(), 1)
@@ -0,0 +1,132 @@
+import aiounittest
+import asyncio
+import json
+import os
+import tempfile
+from aiochannel import SpillingChannel
+
+
+class SpillingChannelTest(aiounittest.AsyncTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(".seg"))
+
+    async def test_construct(self):
+        with self.assertRaises(ValueError):
+            SpillingChannel(directory=self.directory, segment_items=0)
+
+    async def test_in_memory(self):
+        channel = SpillingChannel(directory=self.directory, segment_items=4)
+        channel.put_nowait_many(range(7))
+        self.assertEqual(7, channel.qsize())
+        self.assertEqual(0, channel.spilled())
+        self.assertEqual(list(range(7)), [channel.get_nowait() for _ in range(7)])
+        self.assertTrue(channel.empty())
+
+    async def test_spills_in_order(self):
+        channel = SpillingChannel(directory=self.directory, segment_items=4)
+        channel.put_nowait_many(range(20))
+        # head: 0-3, segments: 4-7, 8-11, 12-15, 16-19, tail: empty
+        self.assertEqual(16, channel.spilled())
+        self.assertEqual(20, channel.qsize())
+        await channel.flush()
+        self.assertEqual(4, len(self.segments()))
+        self.assertEqual(list(range(20)), list(channel))
+        channel.put_nowait(20)
+        self.assertEqual(list(range(21)), [await channel.get() for _ in range(21)])
+        await channel.flush()
+        self.assertEqual([], self.segments())
+
+    async def test_get_many(self):
+        channel = SpillingChannel(directory=self.directory, segment_items=3)
+        await channel.put_many(range(10))
+        await channel.flush()
+        self.assertEqual(list(range(8)), await channel.get_many(8))
+        self.assertEqual([8, 9], channel.get_nowait_many(5))
+
+    async def test_read_before_written(self):
+        channel = SpillingChannel(directory=self.directory, segment_items=2)
+        channel.put_nowait_many(range(6))
+        # taken out before the executor got to write them
+        self.assertEqual(list(range(3)), channel.get_nowait_many(3))
+        await channel.flush()
+        # the segment 3 is in is kept until it is drained
+        self.assertEqual(["0000000000000000-2.seg", "0000000000000001-2.seg"], self.segments())
+        self.assertEqual([3, 4, 5], channel.get_nowait_many(3))
+        await channel.flush()
+        self.assertEqual([], self.segments())
+
+    async def test_read_on_the_spot(self):
+        channel = SpillingChannel(directory=self.directory, segment_items=2)
+        channel.put_nowait_many(range(8))
+        await channel.flush()
+        # the first segment is kept in memory, the others are on disk only
+        self.assertIsNotNone(channel._segments[0].items)
+        self.assertIsNone(channel._segments[1].items)
+        self.assertEqual(list(range(4)), channel.get_nowait_many(4))
+        # the next segment is being read back in
+        self.assertIsNotNone(channel._segments[0].reading)
+        channel._segments[0].reading.cancel()
+        self.assertEqual([4, 5, 6, 7], channel.get_nowait_many(4))
+        await channel.flush()
+
+    async def test_serializer(self):
+        channel = SpillingChannel(directory=self.directory, segment_items=1, serializer=json)
+        channel.put_nowait_many([{"a": 1}, [2], "three"])
+        await channel.flush()
+        self.assertEqual([{"a": 1}, [2], "three"], list(channel))
+
+    async def test_write_failure_keeps_items(self):
+        class Failing:
+            @staticmethod
+            def dumps(item):
+                raise ValueError(item)
+
+        channel = SpillingChannel(directory=self.directory, segment_items=1, serializer=Failing)
+        channel.put_nowait_many([1, 2, 3])
+        await channel.flush()
+        self.assertEqual([], self.segments())
+        self.assertEqual([1, 2, 3], channel.get_nowait_many(3))
+
+    async def test_recover(self):
+        channel = SpillingChannel(directory=self.directory, segment_items=2)
+        channel.put_nowait_many(range(9))
+        await channel.flush()
+        self.assertEqual([0, 1, 2], channel.get_nowait_many(3))
+        await channel.flush()
+        # crash: segments 2-3 (being taken out), 4-5 and 6-7 are on disk,
+        # 8 (in memory) is lost
+        open(os.path.join(self.directory, "0000000000000009-2.seg.tmp"), "w").close()
+        recovered = SpillingChannel(directory=self.directory, segment_items=2, recover=True)
+        self.assertEqual(6, recovered.qsize())
+        recovered.put_nowait(9)
+        self.assertEqual([2, 3, 4, 5, 6, 7, 9], [await recovered.get() for _ in range(7)])
+        await recovered.flush()
+        self.assertEqual([], os.listdir(self.directory))
+
+    async def test_no_recover(self):
+        channel = SpillingChannel(directory=self.directory, segment_items=2)
+        channel.put_nowait_many(range(9))
+        await channel.flush()
+        open(os.path.join(self.directory, "README"), "w").close()
+        fresh = SpillingChannel(directory=self.directory, segment_items=2)
+        self.assertTrue(fresh.empty())
+        self.assertEqual([], self.segments())
+        self.assertEqual(["README"], os.listdir(self.directory))
+
+    async def test_bounded(self):
+        channel = SpillingChannel(3, directory=self.directory, segment_items=1)
+        channel.put_nowait_many([1, 2, 3])
+        self.assertTrue(channel.full())
+        putter = asyncio.ensure_future(channel.put(4))
+        await asyncio.sleep(0)
+        self.assertEqual(1, await channel.get())
+        await putter
+        self.assertEqual([2, 3, 4], channel.get_nowait_many(3))
+        await channel.flush()
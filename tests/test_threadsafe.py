@@ -0,0 +1,163 @@
+import aiounittest
+import asyncio
+import threading
+from aiochannel import ThreadSafeChannel, ChannelClosed, ChannelTimeout
+
+
+class ThreadSafeChannelTest(aiounittest.AsyncTestCase):
+    async def run_in_thread(self, fn, *args):
+        return await asyncio.get_event_loop().run_in_executor(None, fn, *args)
+
+    async def test_put_sync_from_thread(self):
+        channel = ThreadSafeChannel()
+
+        def producer():
+            for i in range(100):
+                channel.put_sync(i)
+            channel.close_threadsafe()
+
+        received = []
+
+        async def consumer():
+            async for item in channel:
+                received.append(item)
+
+        await asyncio.gather(self.run_in_thread(producer), consumer())
+        self.assertEqual(list(range(100)), received)
+        await asyncio.wait_for(channel.join(), timeout=1)
+
+    async def test_put_sync_burst_is_one_wakeup(self):
+        channel = ThreadSafeChannel()
+        loop = asyncio.get_event_loop()
+        wakeups = []
+        call_soon_threadsafe = loop.call_soon_threadsafe
+
+        def counting_call_soon_threadsafe(*args):
+            wakeups.append(args)
+            return call_soon_threadsafe(*args)
+
+        loop.call_soon_threadsafe = counting_call_soon_threadsafe
+        try:
+            # block the event loop while the thread produces a burst
+            producer = threading.Thread(target=lambda: [channel.put_sync(i) for i in range(50)])
+            producer.start()
+            producer.join()
+            self.assertEqual(50, channel.qsize())
+            self.assertTrue(channel.empty())
+            await asyncio.sleep(0)
+        finally:
+            del loop.call_soon_threadsafe
+        self.assertEqual(1, len(wakeups))
+        self.assertEqual(list(range(50)), channel.get_nowait_many(100))
+
+    async def test_put_sync_backpressure(self):
+        channel = ThreadSafeChannel(2)
+
+        def producer():
+            for i in range(10):
+                channel.put_sync(i)
+
+        producing = asyncio.ensure_future(self.run_in_thread(producer))
+        received = []
+        while len(received) < 10:
+            received.append(await channel.get())
+            self.assertLessEqual(len(channel._queue), 2)
+        await producing
+        self.assertEqual(list(range(10)), received)
+
+    async def test_put_sync_batch_backpressure(self):
+        channel = ThreadSafeChannel(3)
+
+        def producer():
+            for i in range(30):
+                channel.put_sync(i)
+
+        producing = asyncio.ensure_future(self.run_in_thread(producer))
+        received = []
+        while len(received) < 30:
+            received.extend(await channel.get_many(2))
+            self.assertLessEqual(len(channel._queue), 3)
+        await producing
+        self.assertEqual(list(range(30)), received)
+
+    async def test_pending_items_flush_as_room_frees(self):
+        channel = ThreadSafeChannel(3)
+        channel.put_nowait("a")
+        channel.put_nowait("b")
+        # pretend two threads got their items in before the loop flushed
+        channel._pending.extend(["c", "d"])
+        channel._flush()
+        self.assertEqual(["a", "b", "c"], list(channel._queue))
+        self.assertEqual(4, channel.qsize())
+        self.assertTrue(channel.full())
+        self.assertEqual("a", await channel.get())
+        self.assertEqual(["b", "c", "d"], list(channel._queue))
+        channel._flush()
+        self.assertEqual(["b", "c", "d"], list(channel._queue))
+
+    async def test_put_sync_timeout(self):
+        channel = ThreadSafeChannel(1)
+        channel.put_nowait("foo")
+        with self.assertRaises(ChannelTimeout):
+            await self.run_in_thread(channel.put_sync, "bar", 0.01)
+        self.assertEqual(0, channel._sync_putters)
+
+    async def test_put_sync_closed(self):
+        channel = ThreadSafeChannel(1)
+        channel.put_nowait("foo")
+        blocked = asyncio.ensure_future(self.run_in_thread(channel.put_sync, "bar"))
+        while not channel._sync_putters:
+            await asyncio.sleep(0.001)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await blocked
+        with self.assertRaises(ChannelClosed):
+            await self.run_in_thread(channel.put_sync, "baz")
+
+    async def test_close_keeps_pending_items(self):
+        channel = ThreadSafeChannel(1)
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel._pending.extend(["a", "b"])
+        channel.close()
+        self.assertEqual("a", await getter)
+        self.assertEqual(["b"], [item async for item in channel])
+        await asyncio.wait_for(channel.join(), timeout=1)
+
+    async def test_get_sync(self):
+        channel = ThreadSafeChannel()
+        asyncio.get_event_loop().call_later(0.01, channel.put_nowait, "foo")
+        self.assertEqual("foo", await self.run_in_thread(channel.get_sync))
+        with self.assertRaises(ChannelTimeout):
+            await self.run_in_thread(channel.get_sync, 0.01)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await self.run_in_thread(channel.get_sync)
+
+    async def test_sync_methods_refuse_event_loop_thread(self):
+        channel = ThreadSafeChannel()
+        with self.assertRaises(RuntimeError):
+            channel.put_sync("foo")
+        with self.assertRaises(RuntimeError):
+            channel.get_sync()
+
+    async def test_many_threads(self):
+        channel = ThreadSafeChannel(16)
+        threads = 8
+        per_thread = 500
+
+        def producer(n):
+            for i in range(per_thread):
+                channel.put_sync((n, i))
+
+        workers = [threading.Thread(target=producer, args=(n,)) for n in range(threads)]
+        for worker in workers:
+            worker.start()
+
+        received = []
+        while len(received) < threads * per_thread:
+            received.extend(await channel.get_many(10))
+        for worker in workers:
+            await self.run_in_thread(worker.join)
+        for n in range(threads):
+            self.assertEqual(list(range(per_thread)), [i for m, i in received if m == n])
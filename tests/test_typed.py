@@ -0,0 +1,179 @@
+import aiounittest
+import asyncio
+import struct
+from array import array
+from aiochannel import ChannelClosed, ChannelEmpty, ChannelFull, TypedChannel
+
+
+class TypedChannelTest(aiounittest.AsyncTestCase):
+    async def test_construct(self):
+        channel = TypedChannel("d", 10)
+        self.assertEqual("d", channel.format)
+        self.assertEqual(8, channel.itemsize)
+        self.assertEqual(10, channel.maxsize)
+        self.assertEqual(12, TypedChannel("<dI").itemsize)
+        with self.assertRaises(ValueError):
+            TypedChannel("x!")
+        with self.assertRaises(ValueError):
+            TypedChannel("")
+
+    async def test_put_get(self):
+        channel = TypedChannel("d", 2)
+        await channel.put(1)
+        channel.put_nowait(2.5)
+        self.assertTrue(channel.full())
+        self.assertEqual(16, channel.nbytes())
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait(3)
+        with self.assertRaises(TypeError):
+            TypedChannel("d").put_nowait("x")
+        self.assertEqual(1.0, await channel.get())
+        self.assertEqual(2.5, channel.get_nowait())
+        with self.assertRaises(ChannelEmpty):
+            channel.get_nowait()
+
+    async def test_getter_waits(self):
+        channel = TypedChannel("q")
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        await channel.put(7)
+        self.assertEqual(7, await getter)
+
+    async def test_records(self):
+        channel = TypedChannel("<dI")
+        channel.put_nowait((0.5, 1))
+        channel.put_nowait_many([(1.5, 2), (2.5, 3)])
+        self.assertEqual([(0.5, 1), (1.5, 2), (2.5, 3)], list(channel))
+        self.assertEqual((0.5, 1), channel.get_nowait())
+        self.assertEqual([(1.5, 2), (2.5, 3)], channel.get_nowait_many(5))
+        channel.put_nowait_many(struct.pack("<dI", 3.5, 4) * 2)
+        self.assertEqual([(3.5, 4), (3.5, 4)], await channel.get_many(5))
+        with self.assertRaises(struct.error):
+            channel.put_nowait((1.0,))
+
+    async def test_ring_wraps_and_grows(self):
+        channel = TypedChannel("i")
+        channel.put_nowait_many(range(10))
+        self.assertEqual(array("i", range(8)), channel.get_nowait_many(8))
+        # wraps around the end of the buffer (of 16)
+        channel.put_nowait_many(range(10, 22))
+        self.assertEqual(list(range(8, 22)), list(channel))
+        # grows, moving the items to the start of a larger buffer
+        channel.put_nowait_many(range(22, 40))
+        channel.put_nowait(40)
+        self.assertEqual(33, channel.qsize())
+        self.assertEqual(list(range(8, 41)), [channel.get_nowait() for _ in range(33)])
+        self.assertTrue(channel.empty())
+
+    async def test_packed_items(self):
+        channel = TypedChannel("d")
+        channel.put_nowait_many(array("d", [1.0, 2.0]))
+        channel.put_nowait_many(memoryview(array("d", [3.0])))
+        channel.put_nowait_many(struct.pack("d", 4.0))
+        await channel.put_many(array("d", [5.0]))
+        batch = channel.get_nowait_many(10)
+        self.assertIsInstance(batch, array)
+        self.assertEqual(array("d", [1.0, 2.0, 3.0, 4.0, 5.0]), batch)
+        with self.assertRaises(ValueError):
+            channel.put_nowait_many(array("i", [1]))
+        with self.assertRaises(ValueError):
+            channel.put_nowait_many(b"123")
+        self.assertTrue(channel.empty())
+
+    async def test_put_many_backpressure(self):
+        channel = TypedChannel("q", 3)
+        putter = asyncio.ensure_future(channel.put_many(array("q", range(7))))
+        await asyncio.sleep(0)
+        self.assertEqual(3, channel.qsize())
+        items = array("q")
+        while len(items) < 7:
+            items.extend(await channel.get_many(2))
+            await asyncio.sleep(0)
+        await putter
+        self.assertEqual(array("q", range(7)), items)
+
+    async def test_put_many_closed(self):
+        channel = TypedChannel("q", 2)
+        putter = asyncio.ensure_future(channel.put_many(range(4)))
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await putter
+        self.assertEqual(array("q", [0, 1]), channel.drain_nowait())
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait_many([1])
+        with self.assertRaises(ChannelClosed):
+            await channel.put_many([1])
+        await channel.join()
+
+    async def test_put_nowait_many_full(self):
+        channel = TypedChannel("q", 3)
+        channel.put_nowait_many([])
+        channel.put_nowait(0)
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait_many([1, 2, 3])
+        self.assertEqual([0], list(channel))
+
+    async def test_drop_newest(self):
+        channel = TypedChannel("q", 3, overflow="drop_newest")
+        channel.put_nowait(0)
+        await channel.put_many(range(1, 5))
+        self.assertEqual([0, 1, 2], list(channel))
+        self.assertEqual(2, channel.dropped)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait_many([5])
+
+    async def test_drop_oldest(self):
+        channel = TypedChannel("q", 3, overflow="drop_oldest")
+        getter = asyncio.ensure_future(channel.get())
+        await asyncio.sleep(0)
+        channel.put_nowait_many([0, 1])
+        self.assertEqual(0, await getter)
+        channel.put_nowait_many([2, 3])
+        self.assertEqual([1, 2, 3], list(channel))
+        channel.put_nowait_many(range(4, 9))
+        self.assertEqual([6, 7, 8], list(channel))
+        channel.put_nowait(9)
+        self.assertEqual([7, 8, 9], list(channel))
+        self.assertEqual(6, channel.dropped)
+
+    async def test_get_batch(self):
+        channel = TypedChannel("f")
+        channel.put_nowait(1)
+
+        async def producer():
+            await asyncio.sleep(0.01)
+            channel.put_nowait_many([2, 3])
+
+        batch, _ = await asyncio.gather(channel.get_batch(3, 1), producer())
+        self.assertEqual(array("f", [1, 2, 3]), batch)
+
+    async def test_async_iteration(self):
+        channel = TypedChannel("H", 4)
+
+        async def producer():
+            await channel.put_many(range(10))
+            channel.close()
+
+        items = []
+
+        async def consumer():
+            async for item in channel:
+                items.append(item)
+
+        await asyncio.gather(producer(), consumer())
+        self.assertEqual(list(range(10)), items)
+
+    async def test_get_batch_cancelled(self):
+        for format, items in (("q", [1, 2, 3]), ("<dI", [(0.5, 1), (1.5, 2), (2.5, 3)])):
+            channel = TypedChannel(format)
+            channel.put_nowait_many(items)
+            getter = asyncio.ensure_future(channel.get_batch(5, timeout=1))
+            await asyncio.sleep(0)
+            getter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await getter
+            # put back in front, wrapping around the start of the buffer
+            self.assertEqual(items, list(channel))
+            self.assertEqual(3, channel.qsize())
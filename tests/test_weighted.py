@@ -0,0 +1,235 @@
+import aiounittest
+import asyncio
+from aiochannel import WeightedChannel, ChannelClosed, ChannelFull, ChannelTimeout
+
+
+def weight(item):
+    return item[1]
+
+
+class WeightedChannelTest(aiounittest.AsyncTestCase):
+    async def test_capacity_is_summed_cost(self):
+        channel = WeightedChannel(10, cost=weight)
+        channel.put_nowait(("a", 4))
+        channel.put_nowait(("b", 6))
+        self.assertTrue(channel.full())
+        self.assertEqual(10, channel.total_cost())
+        self.assertEqual(2, channel.qsize())
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait(("c", 0.5))
+        self.assertEqual(("a", 4), channel.get_nowait())
+        self.assertEqual(6, channel.total_cost())
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait(("c", 5))
+        channel.put_nowait(("c", 4))
+        self.assertEqual([("b", 6), ("c", 4)], channel.get_nowait_many(10))
+        self.assertEqual(0, channel.total_cost())
+
+    async def test_storage_hooks_track_cost(self):
+        channel = WeightedChannel(cost=weight)
+        channel._put_many([("a", 1), ("b", 2)])
+        channel._put(("c", 3))
+        self.assertEqual(6, channel.total_cost())
+        self.assertEqual(("a", 1), channel._get())
+        self.assertEqual(5, channel.total_cost())
+
+    async def test_unbounded(self):
+        channel = WeightedChannel(cost=weight)
+        channel.put_nowait_many([("a", 1000), ("b", 1000)])
+        self.assertFalse(channel.full())
+        self.assertEqual(2000, channel.total_cost())
+
+    async def test_oversized_item_fits_empty_channel(self):
+        channel = WeightedChannel(10, cost=weight)
+        await channel.put(("big", 100))
+        self.assertTrue(channel.full())
+        putter = asyncio.ensure_future(channel.put(("huge", 100)))
+        await asyncio.sleep(0)
+        self.assertFalse(putter.done())
+        channel.get_nowait()
+        await putter
+        self.assertEqual(100, channel.total_cost())
+
+    async def test_negative_cost(self):
+        channel = WeightedChannel(10, cost=weight)
+        with self.assertRaises(ValueError):
+            channel.put_nowait(("a", -1))
+        with self.assertRaises(ValueError):
+            await channel.put(("a", -1))
+
+    async def test_large_putter_does_not_block_small_putters(self):
+        channel = WeightedChannel(10, cost=weight)
+        channel.put_nowait_many([("a", 5), ("b", 4)])
+        large = asyncio.ensure_future(channel.put(("large", 8)))
+        small = [asyncio.ensure_future(channel.put(("small", 1))) for _ in range(3)]
+        await asyncio.sleep(0)
+        # the small ones fit, but queue up behind the large one
+        self.assertEqual(4, len(channel._putters))
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait(("small", 1))
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait_many([("small", 1)])
+        # once room frees up, the large one doesn't hold them up
+        channel.get_nowait()
+        await asyncio.sleep(0)
+        self.assertTrue(all(putter.done() for putter in small))
+        self.assertFalse(large.done())
+        self.assertEqual(7, channel.total_cost())
+        self.assertEqual(["b"] + ["small"] * 3, [name for name, _ in channel.get_nowait_many(4)])
+        await large
+        self.assertEqual(8, channel.total_cost())
+
+    async def test_new_putters_do_not_starve_large_putter(self):
+        channel = WeightedChannel(10, cost=weight)
+        channel.put_nowait(("a", 5))
+        large = asyncio.ensure_future(channel.put(("large", 8)))
+        await asyncio.sleep(0)
+        small = asyncio.ensure_future(channel.put_many([("small", 3)] * 2))
+        await asyncio.sleep(0)
+        self.assertEqual(5, channel.total_cost())
+        channel.get_nowait()
+        await asyncio.wait_for(large, 1)
+        # the small ones only came in after the large one
+        await asyncio.sleep(0)
+        self.assertFalse(small.done())
+        self.assertEqual("large", channel.get_nowait()[0])
+        await asyncio.wait_for(small, 1)
+        self.assertEqual(6, channel.total_cost())
+
+    async def test_putter_giving_up_lets_the_next_ones_in(self):
+        channel = WeightedChannel(10, cost=weight)
+        channel.put_nowait(("a", 5))
+        large = asyncio.ensure_future(channel.put(("large", 8), timeout=0.01))
+        await asyncio.sleep(0)
+        small = asyncio.ensure_future(channel.put(("small", 1)))
+        with self.assertRaises(ChannelTimeout):
+            await large
+        await asyncio.wait_for(small, 1)
+        self.assertEqual(6, channel.total_cost())
+
+    async def test_wakes_every_putter_that_fits(self):
+        channel = WeightedChannel(10, cost=weight)
+        channel.put_nowait(("a", 10))
+        putters = [asyncio.ensure_future(channel.put((i, 3))) for i in range(4)]
+        await asyncio.sleep(0)
+        channel.get_nowait()
+        await asyncio.sleep(0)
+        self.assertEqual([True, True, True, False], [putter.done() for putter in putters])
+        self.assertEqual(9, channel.total_cost())
+        channel.get_nowait()
+        await putters[3]
+
+    async def test_cancelled_woken_putter_passes_room_on(self):
+        channel = WeightedChannel(10, cost=weight)
+        channel.put_nowait(("a", 10))
+        first = asyncio.ensure_future(channel.put(("first", 10)))
+        second = asyncio.ensure_future(channel.put(("second", 10)))
+        await asyncio.sleep(0)
+        channel.get_nowait()
+        first.cancel()
+        await asyncio.sleep(0)
+        self.assertTrue(first.cancelled())
+        await second
+        self.assertEqual(("second", 10), channel.get_nowait())
+
+    async def test_cancelled_putter_is_skipped(self):
+        channel = WeightedChannel(10, cost=weight)
+        channel.put_nowait(("a", 10))
+        first = asyncio.ensure_future(channel.put(("first", 5)))
+        second = asyncio.ensure_future(channel.put(("second", 5)))
+        await asyncio.sleep(0)
+        # cancelled, but not yet taken out of the waiters
+        next(iter(channel._putters)).cancel()
+        channel.get_nowait()
+        await second
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+        self.assertEqual(5, channel.total_cost())
+
+    async def test_put_timeout(self):
+        channel = WeightedChannel(10, cost=weight)
+        channel.put_nowait(("a", 5))
+        with self.assertRaises(ChannelTimeout):
+            await channel.put(("b", 6), timeout=0.01)
+        await channel.put(("c", 5), timeout=0.01)
+
+    async def test_put_closed(self):
+        channel = WeightedChannel(10, cost=weight)
+        channel.put_nowait(("a", 10))
+        putter = asyncio.ensure_future(channel.put(("b", 1)))
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await putter
+        with self.assertRaises(ChannelClosed):
+            await channel.put(("b", 1))
+        channel.get_nowait()
+        with self.assertRaises(ChannelClosed):
+            await channel.put(("b", 1))
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait(("b", 1))
+
+    async def test_put_wakes_getter(self):
+        channel = WeightedChannel(10, cost=weight)
+        getters = [asyncio.ensure_future(channel.get()) for _ in range(2)]
+        await asyncio.sleep(0)
+        await channel.put(("a", 1))
+        channel.put_nowait(("b", 1))
+        self.assertEqual([("a", 1), ("b", 1)], await asyncio.gather(*getters))
+
+    async def test_put_many(self):
+        channel = WeightedChannel(10, cost=weight)
+        putter = asyncio.ensure_future(channel.put_many([("a", 6), ("b", 4), ("c", 6)]))
+        await asyncio.sleep(0)
+        self.assertFalse(putter.done())
+        self.assertEqual(10, channel.total_cost())
+        self.assertEqual(("a", 6), await channel.get())
+        await putter
+        self.assertEqual([("b", 4), ("c", 6)], await channel.get_many(10))
+
+    async def test_put_many_closed(self):
+        channel = WeightedChannel(10, cost=weight)
+        putter = asyncio.ensure_future(channel.put_many([("a", 6), ("b", 6)]))
+        await asyncio.sleep(0)
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            await putter
+        with self.assertRaises(ChannelClosed):
+            await channel.put_many([("c", 1)])
+        self.assertEqual([("a", 6)], [item async for item in channel])
+
+    async def test_put_nowait_many(self):
+        channel = WeightedChannel(10, cost=weight)
+        channel.put_nowait(("a", 4))
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait_many([("b", 3), ("c", 4)])
+        self.assertEqual(4, channel.total_cost())
+        channel.put_nowait_many([])
+        channel.put_nowait_many([("b", 3), ("c", 3)])
+        self.assertEqual(10, channel.total_cost())
+        channel.close()
+        with self.assertRaises(ChannelClosed):
+            channel.put_nowait_many([])
+
+    async def test_put_nowait_many_empty_channel(self):
+        channel = WeightedChannel(10, cost=weight)
+        # only the first item may go over maxsize, like with put_many()
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait_many([("a", 6), ("b", 6)])
+        with self.assertRaises(ChannelFull):
+            channel.put_nowait_many([("a", 100), ("b", 0)])
+        self.assertTrue(channel.empty())
+        channel.put_nowait_many([("a", 100)])
+        self.assertEqual(100, channel.total_cost())
+
+    async def test_get_batch_cancelled(self):
+        channel = WeightedChannel(10, cost=weight)
+        channel.put_nowait_many([("a", 4), ("b", 3)])
+        getter = asyncio.ensure_future(channel.get_batch(5, timeout=1))
+        await asyncio.sleep(0)
+        getter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await getter
+        self.assertEqual(7, channel.total_cost())
+        self.assertEqual([("a", 4), ("b", 3)], channel.get_nowait_many(5))
+        self.assertEqual(0, channel.total_cost())